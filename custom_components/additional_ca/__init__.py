@@ -2,32 +2,124 @@
 
 from __future__ import annotations
 
+import asyncio
+from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
 
 import homeassistant.helpers.config_validation as cv
 import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import Platform
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.helpers.typing import ConfigType
 
-from .const import CONFIG_SUBDIR, DOMAIN, FORCE_ADDITIONAL_CA
-from .exceptions import SerialNumberException
+from .backends import TrustStoreBackend, async_get_backend
+from .bundle import filter_ca_bundle
+from .const import (
+    APPLIED_CONFIG_KEY,
+    AUTO_DISCOVERY,
+    AUTO_DISCOVERY_GLOB,
+    AUTO_DISCOVERY_GLOB_DEFAULT,
+    CA_METADATA_KEY,
+    CONFIG_SUBDIR,
+    DEDUP_SYSTEM,
+    DOMAIN,
+    HOT_RELOAD,
+    MAX_CONCURRENCY,
+    MAX_CONCURRENCY_DEFAULT,
+    MINIMAL_TRUST,
+    MINIMAL_TRUST_ALLOW,
+    RELOAD_TASK_KEY,
+    RUN_STATS_KEY,
+    SERVICE_PLAN,
+    SERVICE_RELOAD,
+    SERVICE_VERIFY,
+    SIGNAL_CA_UPDATED,
+    TRUST_STORE_BACKEND,
+    TRUST_STORE_BACKEND_AUTO,
+    TRUST_STORE_BACKEND_CAPATH,
+    TRUST_STORE_BACKEND_CERTIFI,
+    TRUST_STORE_BACKEND_NATIVE,
+    TRUST_STORE_BACKEND_P11KIT,
+    TRUST_STORE_BACKEND_SUBPROCESS,
+    UPDATE_CA_TIMEOUT,
+    UPDATE_CA_TIMEOUT_DEFAULT,
+    UPDATE_LOCK_KEY,
+    YAML_CONFIG_KEY,
+)
+from .discovery import (
+    async_load_scan_cache,
+    async_save_scan_cache,
+    discover_ca_files,
+    merge_discovered_cas,
+    relative_glob,
+)
+from .exceptions import TrustStoreException
+from .manifest import async_load_manifest, async_save_manifest, file_sha256
+from .remote import (
+    async_fetch_remote_cas,
+    get_ca_src_path,
+    get_remote_cache_path,
+    is_remote_ca,
+)
+from .stats import RunStats
+from .transaction import TrustStoreTransaction
 from .utils import (
     check_hass_ssl_context,
-    copy_ca_to_system,
-    get_issuer_common_name,
-    get_serial_number_from_cert,
+    copy_changed_ca_file,
+    find_duplicate_cas,
+    get_ca_changes,
+    get_ca_config,
+    get_ca_fingerprints,
+    get_ca_names,
+    get_desired_certs,
+    get_hass_ca_bundle,
+    get_minimal_trust_bundle_path,
+    get_trust_policy,
     log,
-    remove_additional_ca,
+    refresh_hass_ssl_contexts,
     remove_unused_certs,
-    update_system_ca,
+    scan_ca_file,
+    split_config,
+    use_minimal_trust_bundle,
 )
+from .watcher import async_start_watcher
+
+PLATFORMS = [Platform.SENSOR]
 
 CONFIG_SCHEMA = vol.Schema(
     {
-        DOMAIN: {cv.string: cv.string}
+        DOMAIN: {
+            vol.Optional(TRUST_STORE_BACKEND): vol.In(
+                [
+                    TRUST_STORE_BACKEND_AUTO,
+                    TRUST_STORE_BACKEND_SUBPROCESS,
+                    TRUST_STORE_BACKEND_NATIVE,
+                    TRUST_STORE_BACKEND_P11KIT,
+                    TRUST_STORE_BACKEND_CERTIFI,
+                    TRUST_STORE_BACKEND_CAPATH,
+                ]
+            ),
+            vol.Optional(UPDATE_CA_TIMEOUT): vol.All(vol.Coerce(float), vol.Range(min=1)),
+            vol.Optional(HOT_RELOAD): cv.boolean,
+            vol.Optional(MAX_CONCURRENCY): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            vol.Optional(AUTO_DISCOVERY): cv.boolean,
+            vol.Optional(AUTO_DISCOVERY_GLOB): vol.All(cv.string, relative_glob),
+            vol.Optional(MINIMAL_TRUST): cv.boolean,
+            vol.Optional(MINIMAL_TRUST_ALLOW): vol.All(cv.ensure_list, [cv.string]),
+            cv.string: cv.string,
+        }
     },
-    extra=vol.ALLOW_EXTRA
+    extra=vol.ALLOW_EXTRA,
 )
 
 
@@ -38,109 +130,685 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
 
     # Handle YAML configuration by creating a config entry
     if DOMAIN in config:
-        hass.async_create_task(
-            hass.config_entries.flow.async_init(
-                DOMAIN, context={"source": "import"}, data=config[DOMAIN]
-            )
-        )
+        hass.async_create_task(hass.config_entries.flow.async_init(DOMAIN, context={"source": "import"}, data=config[DOMAIN]))
 
-    config_path = Path(hass.config.path(CONFIG_SUBDIR))
+    # the CA files managed in the UI, if any, replace the CA files of the YAML config
+    hass.data[YAML_CONFIG_KEY] = config.get(DOMAIN, {})
+    config = get_ca_config(hass)
+
+    stats = RunStats("setup")
+    hass.data[RUN_STATS_KEY] = stats
+
+    with stats.phase("config"):
+        config_path = Path(hass.config.path(CONFIG_SUBDIR))
+        config_path_exists = config_path.exists()
+        config_path_is_dir = config_path.is_dir()
+        options, _ = split_config(config[DOMAIN])
 
-    if not config_path.exists():
+    if not config_path_exists:
         log.error(f"Folder '{CONFIG_SUBDIR}' not found in configuration folder.")
         return False
-    if not config_path.is_dir():
+    if not config_path_is_dir:
         log.error(f"'{CONFIG_SUBDIR}' must be a directory.")
         return False
 
-    try:
-        ca_files = await update_ca_certificates(hass, config)
-    except Exception:
-        log.error("Additional CA setup has been interrupted.")
-        raise
+    # trust the CA of the last run right away, the CA files are checked in the background
+    with stats.phase("fast_path"):
+        ca_files = await async_load_last_applied_cas(hass, config)
+    if ca_files is not None:
+        log.info("System CA trust store is unchanged since the last run, checking CA files in the background.")
+        hass.data[CA_METADATA_KEY] = ca_files
+        hass.data[APPLIED_CONFIG_KEY] = config[DOMAIN]
+        stats.finish()
+        hass.async_create_background_task(async_reload_ca_certificates(hass, config, "background"), f"{DOMAIN} background check")
+    else:
+        try:
+            ca_files = await update_ca_certificates(hass, config, stats)
+        except Exception as err:
+            log.error("Additional CA setup has been interrupted.")
+            stats.finish(err)
+            raise
+        hass.data[CA_METADATA_KEY] = ca_files
+        hass.data[APPLIED_CONFIG_KEY] = config[DOMAIN]
 
-    # finally verifying the SSL context of Home Assistant
-    try:
-        await check_hass_ssl_context(hass, ca_files)
-    except Exception:
-        log.error("Could not check SSL Context.")
-        raise
+        # finally verifying the SSL context of Home Assistant, after loading the new CAs into it
+        try:
+            backend = await async_get_backend(hass, options)
+            await verify_hass_ssl_context(hass, ca_files, stats, get_hass_ca_bundle(hass, options, backend), backend.capath)
+        except Exception as err:
+            log.error("Could not check SSL Context.")
+            stats.finish(err)
+            raise
+        stats.finish()
+
+    async_register_services(hass)
 
     return True
 
 
+@callback
+def async_register_services(hass: HomeAssistant) -> None:
+    """Register the services of Additional CA: reload, verify and plan.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    """
+
+    async def async_handle_reload(_call: ServiceCall) -> None:
+        # calls during a reload wait for the reload in flight instead of starting another one
+        reload_task = hass.data.get(RELOAD_TASK_KEY)
+        if reload_task is None or reload_task.done():
+            reload_task = hass.async_create_task(async_reload_ca_certificates(hass, trigger="service", raise_on_error=True))
+            hass.data[RELOAD_TASK_KEY] = reload_task
+        await asyncio.shield(reload_task)
+
+    async def async_handle_verify(_call: ServiceCall) -> ServiceResponse:
+        ca_files = hass.data.get(CA_METADATA_KEY, {})
+        backend = await async_get_backend(hass, split_config(get_ca_config(hass)[DOMAIN])[0])
+        missing_cas = await check_hass_ssl_context(hass, ca_files, backend.capath)
+        return {"checked": sorted(ca_files), "missing": missing_cas}
+
+    async def async_handle_plan(_call: ServiceCall) -> ServiceResponse:
+        return await plan_ca_certificates(hass, get_ca_config(hass))
+
+    hass.services.async_register(DOMAIN, SERVICE_RELOAD, async_handle_reload)
+    hass.services.async_register(DOMAIN, SERVICE_VERIFY, async_handle_verify, supports_response=SupportsResponse.OPTIONAL)
+    hass.services.async_register(DOMAIN, SERVICE_PLAN, async_handle_plan, supports_response=SupportsResponse.ONLY)
+
+
+async def async_reload_ca_certificates(hass: HomeAssistant, config: ConfigType | None = None, trigger: str = "reload", raise_on_error: bool = False) -> None:
+    """Apply the changes of CA files without restarting Home Assistant.
+    Only changed CA files are copied, and the system CA trust store is rebuilt at most once.
+    Errors are logged, and raised to the caller of an action if asked.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param config: config object from HomeAssistant helpers, the YAML config and the CA files managed in the UI by default
+    :type config: ConfigType | None
+    :param trigger: what triggered the run, for diagnostics
+    :type trigger: str
+    :param raise_on_error: raise the error of a failed reload, for the action 'additional_ca.reload'
+    :type raise_on_error: bool
+    :raises HomeAssistantError: if the reload failed and raise_on_error is set
+    """
+
+    # updates never overlap, the system CA trust store is rebuilt by one run at a time
+    async with hass.data.setdefault(UPDATE_LOCK_KEY, asyncio.Lock()):
+        log.info("Reloading Additional CA")
+        config = config or get_ca_config(hass)
+        stats = RunStats(trigger)
+        hass.data[RUN_STATS_KEY] = stats
+        hass.data[APPLIED_CONFIG_KEY] = config[DOMAIN]
+        try:
+            ca_files = await update_ca_certificates(hass, config, stats)
+            hass.data[CA_METADATA_KEY] = ca_files
+            async_dispatcher_send(hass, SIGNAL_CA_UPDATED)
+            options, _ = split_config(config[DOMAIN])
+            backend = await async_get_backend(hass, options)
+            await verify_hass_ssl_context(hass, ca_files, stats, get_hass_ca_bundle(hass, options, backend), backend.capath)
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            # any error is logged and kept for diagnostics, a failed background check or hot reload must not crash its task
+            log.error(f"Additional CA reload has failed: {str(err)}")
+            stats.finish(err)
+            if raise_on_error:
+                raise HomeAssistantError(f"Additional CA reload has failed: {str(err)}") from err
+        else:
+            stats.finish()
+
+
+def get_cached_cas(hass: HomeAssistant, conf: dict[str, str], scan_cache: dict) -> tuple[dict[str, dict[str, str]], dict[str, list[str]]] | None:
+    """Get the CA files of the config from the scan cache of the last run, without reading them.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param conf: the CA of the config, like {'ca_key': 'ca_value'}
+    :type conf: dict[str, str]
+    :param scan_cache: the scan cache, see async_load_scan_cache()
+    :type scan_cache: dict
+    :return: the CA files like get_ca_names() and the fingerprints of each CA of the config, or None if a CA file is not in the cache
+    :rtype: tuple[dict[str, dict[str, str]], dict[str, list[str]]] | None
+    """
+
+    config_path = Path(hass.config.path(CONFIG_SUBDIR))
+    remote_cache_path = get_remote_cache_path(hass)
+    ca_files = {}
+    ca_fingerprints = {}
+    for ca_key, ca_value in conf.items():
+        cached = scan_cache.get(str(get_ca_src_path(config_path, remote_cache_path, ca_value)))
+        if cached is None:
+            return None
+        ca_files.update(get_ca_names(ca_value, cached["certs"]))
+        ca_fingerprints[ca_key] = [metadata["fingerprint"] for metadata in cached["certs"]]
+    return ca_files, ca_fingerprints
+
+
+async def async_load_last_applied_cas(hass: HomeAssistant, config: ConfigType) -> dict[str, dict[str, str]] | None:
+    """Load the system CA bundle of the last successful run into the SSL Context of Home Assistant,
+    if the bundle is still in place and the config still wants the same CA files.
+    The CA files are not read: their metadata come from the cache of the last run.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param config: config object from HomeAssistant helpers
+    :type config: ConfigType
+    :return: the CA files like {'cert name': {'serial_number': '...', ...}, ...}, see parse_ca_metadata(),
+        or None if the CA files have to be processed first
+    :rtype: dict[str, dict[str, str]] | None
+    """
+
+    options, conf = split_config(config[DOMAIN])
+    # discovered CA files are only known once the config folder is scanned
+    if options.get(AUTO_DISCOVERY, False):
+        return None
+
+    manifest = await async_load_manifest(hass)
+    backend = await async_get_backend(hass, options)
+    trust_policy = get_trust_policy(options, backend)
+    if not manifest["bundle_sha256"] or manifest.get("trust_policy") != trust_policy or await hass.async_add_executor_job(file_sha256, backend.bundle_path) != manifest["bundle_sha256"]:
+        return None
+    minimal_trust_bundle_path = get_minimal_trust_bundle_path(hass) if trust_policy is not None else None
+    if minimal_trust_bundle_path is not None and not await hass.async_add_executor_job(minimal_trust_bundle_path.is_file):
+        return None
+
+    cached_cas = get_cached_cas(hass, conf, await async_load_scan_cache(hass))
+    if cached_cas is None:
+        return None
+    ca_files, ca_fingerprints = cached_cas
+
+    # deduplicated CA files were not installed by the last run, the system CA files are not parsed: the bundle is unchanged since then
+    deduplicated = find_duplicate_cas(ca_fingerprints, set(manifest.get("system_fingerprints", [])))
+    if set(manifest["cas"]) != get_desired_certs({ca_key: ca_value for ca_key, ca_value in conf.items() if ca_key not in deduplicated}):
+        return None
+
+    await hass.async_add_executor_job(use_minimal_trust_bundle, minimal_trust_bundle_path)
+    await refresh_hass_ssl_contexts(hass, ca_files, minimal_trust_bundle_path or backend.bundle_path, backend.capath)
+    return ca_files
+
+
+async def verify_hass_ssl_context(hass: HomeAssistant, ca_files: dict[str, dict[str, str]], stats: RunStats, cafile: Path | None = None, capath: Path | None = None) -> None:
+    """Load the new CA files into the SSL Context of Home Assistant, then check it contains every CA file.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param ca_files: the CA files like {'cert name': {'serial_number': '...', ...}, ...}, see parse_ca_metadata()
+    :type ca_files: dict[str, dict[str, str]]
+    :param stats: the stats of the run
+    :type stats: RunStats
+    :param cafile: the CA bundle of the system CA trust store, see refresh_hass_ssl_contexts()
+    :type cafile: Path | None
+    :param capath: the hashed CApath folder to register instead of the CA bundle, see refresh_hass_ssl_contexts()
+    :type capath: Path | None
+    """
+
+    with stats.phase("refresh_ssl_context"):
+        await refresh_hass_ssl_contexts(hass, ca_files, cafile, capath)
+    with stats.phase("verify_ssl_context"):
+        await check_hass_ssl_context(hass, ca_files, capath)
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Set up the integration from a config entry."""
     # Store entry data
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = entry.data
+
+    # apply the CA files changed in the UI, only the difference with the installed CA is applied
+    config = get_ca_config(hass)
+    if APPLIED_CONFIG_KEY in hass.data and hass.data[APPLIED_CONFIG_KEY] != config[DOMAIN]:
+        await async_reload_ca_certificates(hass, config)
+
+    # the watcher lives as long as the entry, it is started again when the entry is reloaded
+    options, _ = split_config(config[DOMAIN])
+    if options.get(HOT_RELOAD, False):
+        config_path = Path(hass.config.path(CONFIG_SUBDIR))
+        entry.async_on_unload(await async_start_watcher(hass, config_path, partial(async_reload_ca_certificates, hass)))
+
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
     return True
 
 
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Clean up on unload."""
-    hass.data[DOMAIN].pop(entry.entry_id)
-    return True
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unload_ok:
+        hass.data[DOMAIN].pop(entry.entry_id)
+    return unload_ok
 
 
-async def update_ca_certificates(hass: HomeAssistant, config: ConfigType) -> dict[str, str]:
-    """Update system CA trust store by adding custom CA if it is not already present.
+async def async_add_discovered_cas(hass: HomeAssistant, options: dict, conf: dict[str, str], config_path: Path) -> dict[str, str]:
+    """Add the CA files found in the config folder to the CA files of the config, if option 'auto_discovery' is enabled.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param options: the options of the config, see split_config()
+    :type options: dict
+    :param conf: the CA files of the config like {'ca name': 'ca.crt'}
+    :type conf: dict[str, str]
+    :param config_path: the path of the config folder 'additional_ca'
+    :type config_path: Path
+    :return: the CA files to load, see merge_discovered_cas()
+    :rtype: dict[str, str]
+    """
+
+    if not options.get(AUTO_DISCOVERY, False):
+        return conf
+    pattern = options.get(AUTO_DISCOVERY_GLOB, AUTO_DISCOVERY_GLOB_DEFAULT)
+    discovered = await hass.async_add_executor_job(discover_ca_files, config_path, pattern)
+    log.info(f"Discovered {len(discovered)} CA file(s) matching '{pattern}' in {config_path}")
+    return merge_discovered_cas(conf, discovered)
+
+
+async def plan_ca_certificates(hass: HomeAssistant, config: ConfigType) -> dict[str, list[str] | dict[str, str] | bool]:
+    """Compute the changes update_ca_certificates() would apply, without touching the system CA trust store.
 
     :param hass: hass object from HomeAssistant core
     :type hass: HomeAssistant
     :param config: config object from HomeAssistant helpers
     :type config: ConfigType
-    :raises Exception: if unable to check SSL Context for CA
-    :raises Exception: if unable to update system CA
-    :return: a dict like {'cert filename': 'cert serial_number'}
-    :rtype: dict[str, str]
+    :return: a dict like {'add': ['myca_ca.crt'], 'update': [], 'unchanged': [...], 'missing': [], 'deduplicated': {'ca name': 'system'},
+        'remove': [...], 'rebuild': True}, see find_duplicate_cas()
+    :rtype: dict[str, list[str] | dict[str, str] | bool]
     """
 
-    conf = config.get(DOMAIN)
+    options, conf = split_config(config[DOMAIN])
     config_path = Path(hass.config.path(CONFIG_SUBDIR))
+    conf = await async_add_discovered_cas(hass, options, conf, config_path)
 
-    # Ignore deprecated option 'force_additional_ca' (boolean) from config
-    conf.pop(FORCE_ADDITIONAL_CA, None)
+    backend = await async_get_backend(hass, options)
+    manifest = await async_load_manifest(hass)
+    remote_cache_path = get_remote_cache_path(hass)
+    ca_src_paths = {ca_key: get_ca_src_path(config_path, remote_cache_path, ca_value) for ca_key, ca_value in conf.items()}
+    ca_fingerprints = await hass.async_add_executor_job(get_ca_fingerprints, ca_src_paths, await async_load_scan_cache(hass))
+    system_fingerprints = await hass.async_add_executor_job(backend.get_system_fingerprints)
+    deduplicated = find_duplicate_cas(ca_fingerprints, system_fingerprints)
+    conf = {ca_key: ca_value for ca_key, ca_value in conf.items() if ca_key not in deduplicated}
 
-    await remove_unused_certs(hass, conf)
+    plan = await hass.async_add_executor_job(get_ca_changes, conf, config_path, remote_cache_path, backend.ca_path)
+    plan["deduplicated"] = deduplicated
+    plan["remove"] = sorted(set(manifest["owned"]) - get_desired_certs(conf))
+    bundle_sha256 = await hass.async_add_executor_job(file_sha256, backend.bundle_path)
+    plan["rebuild"] = bool(plan["add"] or plan["update"] or plan["remove"]) or set(plan["unchanged"]) != set(manifest["cas"]) or bundle_sha256 != manifest["bundle_sha256"]
+    return plan
 
-    ca_files_dict = {}
-    for ca_key, ca_value in conf.items():
+
+async def async_apply_trust_policy(hass: HomeAssistant, backend: TrustStoreBackend, trust_policy: dict | None, ca_files: dict[str, dict[str, str]], stats: RunStats) -> None:
+    """Write the CA bundle of option 'minimal_trust' from the system CA bundle, and make the client SSL Contexts of HA load it.
+    Without trust policy, the client SSL Contexts of HA load the system CA bundle again. The system CA bundle is never reduced.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param backend: the backend of the system CA trust store
+    :type backend: TrustStoreBackend
+    :param trust_policy: the trust policy of the config, see get_trust_policy()
+    :type trust_policy: dict | None
+    :param ca_files: the loaded CA files, deduplicated ones included, see update_ca_certificates()
+    :type ca_files: dict[str, dict[str, str]]
+    :param stats: the stats of the run
+    :type stats: RunStats
+    """
+
+    minimal_trust_bundle_path = get_minimal_trust_bundle_path(hass)
+    if trust_policy is None:
+        await hass.async_add_executor_job(use_minimal_trust_bundle, None)
+        await hass.async_add_executor_job(partial(minimal_trust_bundle_path.unlink, missing_ok=True))
+        return
+
+    # written on each run, the loaded CA may be trusted by the system CA bundle without a rebuild
+    with stats.phase("minimal_trust"):
+        await hass.async_add_executor_job(partial(minimal_trust_bundle_path.parent.mkdir, parents=True, exist_ok=True))
+        fingerprints = {metadata["fingerprint"] for metadata in ca_files.values()}
+        await hass.async_add_executor_job(filter_ca_bundle, backend.bundle_path, minimal_trust_bundle_path, fingerprints, trust_policy["allow"])
+        await hass.async_add_executor_job(use_minimal_trust_bundle, minimal_trust_bundle_path)
+
+
+@dataclass
+class CaSources:
+    """The CA files of the config processed by a run: the CA of the config like {'ca_key': 'ca_value'}, the source path of each CA,
+    and the semaphore bounding the concurrent jobs.
+    """
+
+    conf: dict[str, str]
+    src_paths: dict[str, Path]
+    semaphore: asyncio.Semaphore
+
+
+async def async_scan_cas(hass: HomeAssistant, sources: CaSources, stats: RunStats) -> tuple[dict, dict]:
+    """Scan the CA files concurrently, the results are handled in config order.
+    Files no longer loaded are dropped from the scan cache.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param sources: the CA files of the config
+    :type sources: CaSources
+    :param stats: the stats of the run
+    :type stats: RunStats
+    :raises BaseException: the first error raised while scanning a CA file
+    :return: the loaded CA like get_ca_names(), and the scan result of each CA file
+    :rtype: tuple[dict, dict]
+    """
+
+    with stats.phase("load_manifest"):
+        scan_cache = await async_load_scan_cache(hass)
+
+    for ca_key, ca_value in sources.conf.items():
         log.info(f"Processing CA: {ca_key} ({ca_value})")
-        additional_ca_fullpath = Path(config_path, ca_value)
+    with stats.phase("scan"):
+        jobs = [scan_ca_file(hass, sources.semaphore, ca_key, sources.src_paths[ca_key], stats=stats, scan_cache=scan_cache) for ca_key in sources.conf]
+        results = await asyncio.gather(*jobs, return_exceptions=True)
 
-        if not additional_ca_fullpath.exists():
-            log.warning(f"{ca_key}: {ca_value} not found.")
-            continue
-        if not additional_ca_fullpath.is_file():
-            log.warning(f"'{additional_ca_fullpath}' is not a file.")
+    ca_files_dict = {}
+    scanned_cas = {}
+    new_scan_cache = {}
+    for (ca_key, ca_value), result in zip(sources.conf.items(), results):
+        if isinstance(result, BaseException):
+            raise result
+        if result is None:
             continue
 
-        common_name = await get_issuer_common_name(additional_ca_fullpath)
-        log.info(f"{ca_key} ({ca_value}) Issuer Common Name: {common_name}")
+        # add each CA of the file to be checked in the global SSL Context at the end
+        for ca_name, metadata in get_ca_names(ca_value, result["certs"]).items():
+            log.info(f"{ca_key} ({ca_name}) Issuer Common Name: {metadata['common_name']}")
+            ca_files_dict[ca_name] = metadata
+
+        scanned_cas[ca_key] = result
+        new_scan_cache[str(sources.src_paths[ca_key])] = {"stat": result["stat"], "sha256": result["sha256"], "certs": result["certs"]}
+
+    if new_scan_cache != scan_cache:
+        await async_save_scan_cache(hass, new_scan_cache)
+    return ca_files_dict, scanned_cas
+
+
+async def async_dedup_cas(hass: HomeAssistant, backend: TrustStoreBackend, conf: dict, scanned_cas: dict, stats: RunStats) -> set[str]:
+    """Skip the CA files already trusted by the system, or by a CA file earlier in the config, they are not installed at all.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param backend: the backend of the system CA trust store
+    :type backend: TrustStoreBackend
+    :param conf: the CA of the config, like {'ca_key': 'ca_value'}
+    :type conf: dict
+    :param scanned_cas: the scan result of each CA file, the duplicate ones are removed from it
+    :type scanned_cas: dict
+    :param stats: the stats of the run, the duplicate CA files are recorded in it
+    :type stats: RunStats
+    :return: the fingerprints of the loaded CA shipped by the system
+    :rtype: set[str]
+    """
+
+    with stats.phase("dedup"):
+        system_fingerprints = await hass.async_add_executor_job(backend.get_system_fingerprints)
+        stats.deduplicated = find_duplicate_cas({ca_key: [metadata["fingerprint"] for metadata in result["certs"]] for ca_key, result in scanned_cas.items()}, system_fingerprints)
+        system_cas = {metadata["fingerprint"] for result in scanned_cas.values() for metadata in result["certs"]} & system_fingerprints
+    for ca_key, duplicate_of in stats.deduplicated.items():
+        log.info(f"{ca_key} ({conf[ca_key]}) -> CA already trusted by {'the system' if duplicate_of == DEDUP_SYSTEM else duplicate_of}, skipped.")
+        del scanned_cas[ca_key]
+    return system_cas
+
+
+async def async_stage_cas(hass: HomeAssistant, sources: CaSources, scanned_cas: dict, transaction: TrustStoreTransaction, stats: RunStats) -> dict:
+    """Stage the new and changed CA files concurrently, the unchanged ones are left in place.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param sources: the CA files of the config
+    :type sources: CaSources
+    :param scanned_cas: the scan result of each CA file to install
+    :type scanned_cas: dict
+    :param transaction: the transaction of the update, CA files are staged in it
+    :type transaction: TrustStoreTransaction
+    :param stats: the stats of the run
+    :type stats: RunStats
+    :raises BaseException: the first error raised while staging a CA file
+    :return: a dict like {'cas': {'ca_id': {'source': ..., 'sha256': ...}}, 'staged': {'ca_id': ('ca_key', 'ca_value')}, 'fingerprints': {'fingerprint': 'ca_value'}}
+    :rtype: dict
+    """
+
+    jobs = [
+        copy_changed_ca_file(hass, sources.semaphore, ca_key, sources.src_paths[ca_key], result, stats=stats, staging_path=transaction.staging_path, ca_path=transaction.ca_path)
+        for ca_key, result in scanned_cas.items()
+    ]
+    with stats.phase("stage"):
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+
+    staged = {"cas": {}, "staged": {}, "fingerprints": {}}
+    for ca_key, result in zip(scanned_cas, results):
+        if isinstance(result, BaseException):
+            raise result
+        ca_value = sources.conf[ca_key]
+        staged["cas"][result["ca_id"]] = {"source": ca_value, "sha256": result["sha256"]}
+        if result["staged"]:
+            staged["staged"][result["ca_id"]] = (ca_key, ca_value)
+            staged["fingerprints"].update({metadata["fingerprint"]: ca_value for metadata in result["certs"]})
+        else:
+            log.info(f"{ca_key} ({ca_value}) -> CA unchanged.")
+    return staged
+
+
+async def async_plan_cas(hass: HomeAssistant, options: dict, conf: dict, transaction: TrustStoreTransaction, stats: RunStats) -> tuple[dict, dict]:
+    """Scan, deduplicate and stage the CA files of the config, the folder of CA files of the backend is left untouched.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param options: the options of the config, see split_config()
+    :type options: dict
+    :param conf: the CA of the config, like {'ca_key': 'ca_value'}
+    :type conf: dict
+    :param transaction: the transaction of the update, CA files are staged in it
+    :type transaction: TrustStoreTransaction
+    :param stats: the stats of the run
+    :type stats: RunStats
+    :return: the loaded CA like get_ca_names(), and the plan like async_stage_cas() with the installed CA of the config 'conf' and the loaded CA shipped by the system 'system_cas'
+    :rtype: tuple[dict, dict]
+    """
+
+    config_path = Path(hass.config.path(CONFIG_SUBDIR))
+    sources = CaSources(
+        conf=conf,
+        src_paths={ca_key: get_ca_src_path(config_path, get_remote_cache_path(hass), ca_value) for ca_key, ca_value in conf.items()},
+        semaphore=asyncio.Semaphore(options.get(MAX_CONCURRENCY, MAX_CONCURRENCY_DEFAULT)),
+    )
+
+    ca_files_dict, scanned_cas = await async_scan_cas(hass, sources, stats)
+    system_cas = await async_dedup_cas(hass, transaction.backend, conf, scanned_cas, stats)
+    plan = await async_stage_cas(hass, sources, scanned_cas, transaction, stats)
+    plan["conf"] = {ca_key: ca_value for ca_key, ca_value in conf.items() if ca_key not in stats.deduplicated}
+    plan["system_cas"] = system_cas
+    return ca_files_dict, plan
 
-        try:
-            serial_number = await get_serial_number_from_cert(hass, additional_ca_fullpath)
-        except SerialNumberException:
-            # let's process the next custom CA if CA does not contain a serial number
-            continue
-        except Exception:
-            raise
 
-        # add CA to be checked in the global SSL Context at the end
-        ca_files_dict[ca_value] = {}
-        ca_files_dict[ca_value]["serial_number"] = serial_number
-        ca_files_dict[ca_value]["common_name"] = common_name
+async def find_invalid_cas(hass: HomeAssistant, transaction: TrustStoreTransaction, ca_ids: list[str], timeout: float) -> list[str]:
+    """Bisect the swapped CA files rejected by the rebuild of the system CA trust store to find the invalid ones, within the transaction.
+    Costs about k * log2(N) rebuilds for k invalid CA files out of N swapped.
 
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param transaction: the transaction of the update, the CA files are swapped in it
+    :type transaction: TrustStoreTransaction
+    :param ca_ids: the names of the swapped CA files, rejected all together
+    :type ca_ids: list[str]
+    :param timeout: the maximum duration of each rebuild, in seconds
+    :type timeout: float
+    :raises Exception: if the rebuild fails without any of the swapped CA files
+    :return: the names of the invalid CA files
+    :rtype: list[str]
+    """
 
-        ca_id = await copy_ca_to_system(hass, ca_key, additional_ca_fullpath)
+    await hass.async_add_executor_job(transaction.hold, ca_ids)
+
+    # a rebuild failing without the new CA files, like on a timeout, is not caused by them
+    await hass.async_add_executor_job(transaction.select, [])
+    await transaction.backend.async_rebuild(hass, timeout)
+
+    async def rebuilds_with(selected_ids: list[str]) -> bool:
+        await hass.async_add_executor_job(transaction.select, selected_ids)
         try:
-            update_system_ca()
-        except Exception:
-            log.error(f"Unable to load CA '{ca_value}'.")
-            remove_additional_ca(ca_id)
-            update_system_ca()
+            await transaction.backend.async_rebuild(hass, timeout)
+        except Exception:  # pylint: disable=broad-exception-caught
+            return False
+        return True
+
+    async def bisect(candidate_ids: list[str], valid_ids: list[str]) -> list[str]:
+        # the rebuild fails with the candidates on top of the valid CA files
+        if len(candidate_ids) == 1:
+            return candidate_ids
+        middle = len(candidate_ids) // 2
+        invalid_ids = []
+        for half in (candidate_ids[:middle], candidate_ids[middle:]):
+            if await rebuilds_with([*valid_ids, *half]):
+                valid_ids = [*valid_ids, *half]
+                continue
+            half_invalid_ids = await bisect(half, valid_ids)
+            invalid_ids += half_invalid_ids
+            valid_ids = [*valid_ids, *(ca_id for ca_id in half if ca_id not in half_invalid_ids)]
+        return invalid_ids
+
+    return await bisect(ca_ids, [])
+
+
+async def async_rebuild_cas(hass: HomeAssistant, options: dict, transaction: TrustStoreTransaction, plan: dict, stats: RunStats) -> None:
+    """Rebuild the system CA trust store. If the swapped CA files are rejected, the invalid ones are found
+    and left out of the plan into 'invalid', and the system CA trust store is rebuilt with the valid ones.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param options: the options of the config, see split_config()
+    :type options: dict
+    :param transaction: the transaction of the update, the CA files are swapped in it
+    :type transaction: TrustStoreTransaction
+    :param plan: the plan of the update, see async_plan_cas()
+    :type plan: dict
+    :param stats: the stats of the run
+    :type stats: RunStats
+    :raises Exception: if the system CA trust store could not be rebuilt, even without the invalid CA files
+    """
+
+    timeout = options.get(UPDATE_CA_TIMEOUT, UPDATE_CA_TIMEOUT_DEFAULT)
+    plan["invalid"] = {}
+    try:
+        with stats.phase("update_system_ca"):
+            await transaction.backend.async_rebuild(hass, timeout)
+        return
+    except Exception as err:  # pylint: disable=broad-exception-caught
+        if not plan["staged"]:
             raise
+        log.error(f"Unable to load {len(plan['staged'])} new CA(s), looking for the invalid one(s): {str(err)}")
+
+    with stats.phase("find_invalid_cas"):
+        invalid_ids = await find_invalid_cas(hass, transaction, list(plan["staged"]), timeout)
+        await hass.async_add_executor_job(transaction.select, [ca_id for ca_id in plan["staged"] if ca_id not in invalid_ids])
+        await transaction.backend.async_rebuild(hass, timeout)
+
+    for ca_id in invalid_ids:
+        ca_key, ca_value = plan["staged"].pop(ca_id)
+        log.error(f"{ca_key} ({ca_value}) -> invalid CA file, not loaded.")
+        plan["invalid"][ca_id] = ca_value
+        # the previous version is kept if any, it is staged again by the next run
+        del plan["cas"][ca_id]
+        plan["fingerprints"] = {fingerprint: value for fingerprint, value in plan["fingerprints"].items() if value != ca_value}
+
+
+async def async_verify_cas(hass: HomeAssistant, backend: TrustStoreBackend, plan: dict, stats: RunStats) -> None:
+    """Check the staged CA are in the system CA bundle after the rebuild.
+    A backend may skip a CA file silently, like update-ca-certificates does with files not named '*.crt'.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param backend: the backend of the system CA trust store
+    :type backend: TrustStoreBackend
+    :param plan: the plan of the update, see async_plan_cas()
+    :type plan: dict
+    :param stats: the stats of the run
+    :type stats: RunStats
+    """
+
+    with stats.phase("verify_bundle"):
+        missing_fingerprints = await hass.async_add_executor_job(backend.verify, list(plan["fingerprints"]))
+    for fingerprint in missing_fingerprints:
+        log.error(f"CA '{plan['fingerprints'][fingerprint]}' is missing in '{backend.bundle_path}' after the rebuild of the system CA trust store.")
 
+    for ca_key, ca_value in plan["staged"].values():
         log.info(f"{ca_key} ({ca_value}) -> new CA loaded.")
 
+
+async def update_ca_certificates(hass: HomeAssistant, config: ConfigType, stats: RunStats | None = None) -> dict[str, dict[str, str]]:
+    """Update system CA trust store by adding custom CA if it is not already present.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param config: config object from HomeAssistant helpers
+    :type config: ConfigType
+    :param stats: the stats of the run, to time its phases
+    :type stats: RunStats | None
+    :raises Exception: if unable to check SSL Context for CA
+    :raises TrustStoreException: if unable to load some CA files, once the valid ones are loaded
+    :raises Exception: if unable to update system CA
+    :return: a dict like {'cert filename': {'serial_number': '...', 'common_name': '...', ...}}, see parse_ca_metadata()
+    :rtype: dict[str, dict[str, str]]
+    """
+
+    stats = stats or RunStats()
+    options, conf = split_config(config.get(DOMAIN))
+    backend = await async_get_backend(hass, options)
+
+    if options.get(AUTO_DISCOVERY, False):
+        with stats.phase("discover"):
+            conf = await async_add_discovered_cas(hass, options, conf, Path(hass.config.path(CONFIG_SUBDIR)))
+
+    # CA given by URL are loaded from their cached copy, revalidated first, the cached copies of removed URLs are cleaned up
+    with stats.phase("fetch"):
+        await async_fetch_remote_cas(hass, {ca_key: ca_value for ca_key, ca_value in conf.items() if is_remote_ca(ca_value)}, options.get(MAX_CONCURRENCY, MAX_CONCURRENCY_DEFAULT), stats)
+
+    with stats.phase("load_manifest"):
+        manifest = await async_load_manifest(hass)
+    owned_certs = set(manifest["owned"])
+    trust_policy = get_trust_policy(options, backend)
+    if trust_policy is None and options.get(MINIMAL_TRUST, False):
+        log.warning(f"Option '{MINIMAL_TRUST}' is ignored with trust store backend '{backend.name}'.")
+
+    # changes are staged, then swapped into the folder of CA files of the backend and rolled back if the rebuild fails
+    transaction = TrustStoreTransaction(backend)
+    await hass.async_add_executor_job(transaction.begin)
+    try:
+        ca_files_dict, plan = await async_plan_cas(hass, options, conf, transaction, stats)
+        unused_certs = owned_certs - get_desired_certs(plan["conf"])
+        new_owned_certs = (owned_certs - unused_certs) | set(plan["cas"])
+        if not plan["staged"] and not unused_certs and plan["cas"] == manifest["cas"] and await hass.async_add_executor_job(file_sha256, backend.bundle_path) == manifest["bundle_sha256"]:
+            log.info("System CA trust store is up to date.")
+            stats.cache_hit("trust_store")
+            await hass.async_add_executor_job(transaction.commit)
+            await async_apply_trust_policy(hass, backend, trust_policy, ca_files_dict, stats)
+            if new_owned_certs != owned_certs or set(manifest.get("system_fingerprints", [])) != plan["system_cas"] or trust_policy != manifest.get("trust_policy"):
+                await async_save_manifest(hass, manifest["cas"], manifest["bundle_sha256"], owned=new_owned_certs, trust_policy=trust_policy, system_fingerprints=plan["system_cas"])
+            return ca_files_dict
+        stats.cache_miss("trust_store")
+
+        with stats.phase("apply"):
+            await hass.async_add_executor_job(transaction.snapshot, [*plan["staged"], *unused_certs])
+            await hass.async_add_executor_job(transaction.swap)
+            removed_certs = await remove_unused_certs(hass, plan["conf"], owned_certs, backend)
+        await async_rebuild_cas(hass, options, transaction, plan, stats)
+    except BaseException:
+        # restore the previous CA files and system CA bundle, without rebuilding
+        with stats.phase("rollback"):
+            await hass.async_add_executor_job(transaction.rollback)
+        raise
+    await hass.async_add_executor_job(transaction.commit)
+    await async_apply_trust_policy(hass, backend, trust_policy, ca_files_dict, stats)
+    await async_verify_cas(hass, backend, plan, stats)
+    if removed_certs:
+        log.warning("Removed CA stay trusted by Home Assistant until it is restarted.")
+
+    with stats.phase("save_manifest"):
+        await async_save_manifest(
+            hass, plan["cas"], await hass.async_add_executor_job(file_sha256, backend.bundle_path), owned=new_owned_certs, trust_policy=trust_policy, system_fingerprints=plan["system_cas"]
+        )
+
+    # the valid CA files are loaded, the run still fails for the invalid ones
+    if plan["invalid"]:
+        raise TrustStoreException(f"Unable to load CA(s): {', '.join(plan['invalid'].values())}")
     return ca_files_dict
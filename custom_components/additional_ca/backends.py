@@ -0,0 +1,343 @@
+"""Backends of the system CA trust store for Additional CA: how CA files are installed, removed, rebuilt into a CA bundle and verified."""
+
+import logging
+import os
+import shutil
+from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from pathlib import Path
+
+import certifi
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import STORAGE_DIR
+
+from .bundle import (
+    build_system_ca_bundle,
+    get_distro_ca_files,
+    get_pem_fingerprints,
+    write_file_atomically,
+)
+from .capath import get_capath_fingerprints, rehash_capath
+from .const import (
+    BACKEND_KEY,
+    CA_BUNDLE_PATH,
+    CA_SYSPATH,
+    CAPATH_DIRNAME,
+    CAPATH_INDEX_FILENAME,
+    CERTIFI_CA_DIRNAME,
+    DOMAIN,
+    P11KIT_BUNDLE_PATH,
+    P11KIT_CA_PATH,
+    P11KIT_SYSCMD,
+    P11KIT_SYSCMD_OPTIONS,
+    TRUST_STORE_BACKEND,
+    TRUST_STORE_BACKEND_AUTO,
+    TRUST_STORE_BACKEND_CAPATH,
+    TRUST_STORE_BACKEND_CERTIFI,
+    TRUST_STORE_BACKEND_NATIVE,
+    TRUST_STORE_BACKEND_P11KIT,
+    TRUST_STORE_BACKEND_SUBPROCESS,
+    UPDATE_CA_SYSCMD,
+)
+from .discovery import get_file_identity
+from .utils import remove_ca_files, run_trust_store_command, update_system_ca
+
+log = logging.getLogger(DOMAIN)
+
+
+class TrustStoreBackend(ABC):
+    """A system CA trust store made of a folder of CA files, rebuilt into a CA bundle.
+    Sync methods do blocking I/O, to be run in an executor.
+    """
+
+    name = ""
+    # the folder registered as CApath of the SSL Contexts of HA instead of the CA bundle, if any
+    capath: Path | None = None
+
+    def __init__(self, ca_path: Path | None, bundle_path: Path | None) -> None:
+        self.ca_path = ca_path
+        self.bundle_path = bundle_path
+        self._system_fingerprints: tuple[list, set[str]] | None = None
+
+    @classmethod
+    def create(cls, hass: HomeAssistant) -> "TrustStoreBackend":  # pylint: disable=unused-argument
+        """Create the backend with the paths of its platform.
+
+        :param hass: hass object from HomeAssistant core
+        :type hass: HomeAssistant
+        :return: the backend
+        :rtype: TrustStoreBackend
+        """
+
+        return cls(Path(CA_SYSPATH), Path(CA_BUNDLE_PATH))
+
+    @staticmethod
+    def is_available() -> bool:
+        """Check if the backend can run on this system, to be run in an executor.
+
+        :return: True if the backend can run
+        :rtype: bool
+        """
+
+        return Path(CA_SYSPATH).is_dir() and Path(CA_BUNDLE_PATH).is_file()
+
+    def install(self, ca_id: str, src_path: Path) -> None:
+        """Install a staged CA file, moving it into the folder of CA files atomically.
+
+        :param ca_id: the name of the installed CA file like 'myca_ca.crt'
+        :type ca_id: str
+        :param src_path: the staged CA file
+        :type src_path: Path
+        """
+
+        os.replace(src_path, Path(self.ca_path, ca_id))
+
+    def remove(self, ca_ids: Iterable[str]) -> list[str]:
+        """Remove installed CA files.
+
+        :param ca_ids: the names of the installed CA files
+        :type ca_ids: Iterable[str]
+        :return: the names of the removed CA files
+        :rtype: list[str]
+        """
+
+        return remove_ca_files(ca_ids, self.ca_path)
+
+    @abstractmethod
+    async def async_rebuild(self, hass: HomeAssistant, timeout: float) -> None:
+        """Rebuild the CA bundle from the installed CA files.
+
+        :param hass: hass object from HomeAssistant core
+        :type hass: HomeAssistant
+        :param timeout: the maximum duration of a system command, in seconds
+        :type timeout: float
+        :raises Exception: if the CA bundle could not be rebuilt
+        """
+
+    def read_bundle(self) -> bytes:
+        """Read the CA bundle.
+
+        :return: the PEM content of the CA bundle, empty if there is no bundle
+        :rtype: bytes
+        """
+
+        try:
+            return self.bundle_path.read_bytes()
+        except FileNotFoundError:
+            return b""
+
+    def verify(self, fingerprints: Iterable[str]) -> list[str]:
+        """Check the CA bundle contains CA certificates.
+
+        :param fingerprints: the SHA-256 fingerprints of the CA certificates, see parse_ca_metadata()
+        :type fingerprints: Iterable[str]
+        :return: the fingerprints missing in the CA bundle
+        :rtype: list[str]
+        """
+
+        bundle_fingerprints = get_pem_fingerprints(self.read_bundle())
+        return [fingerprint for fingerprint in fingerprints if fingerprint not in bundle_fingerprints]
+
+    def get_system_ca_files(self) -> list[Path]:
+        """List the CA files shipped by the system, without the CA files of Additional CA.
+
+        :return: the paths of the CA files of the system
+        :rtype: list[Path]
+        """
+
+        return get_distro_ca_files()
+
+    def get_system_fingerprints(self) -> set[str]:
+        """Get the SHA-256 fingerprints of the CA shipped by the system, read again only when its CA files change.
+
+        :return: the fingerprints of the CA of the system
+        :rtype: set[str]
+        """
+
+        ca_files = self.get_system_ca_files()
+        identity = []
+        for ca_file in ca_files:
+            try:
+                identity.append((str(ca_file), *get_file_identity(ca_file.stat())))
+            except OSError:
+                continue
+        if self._system_fingerprints is not None and self._system_fingerprints[0] == identity:
+            return self._system_fingerprints[1]
+
+        fingerprints = set()
+        for ca_file in ca_files:
+            try:
+                fingerprints |= get_pem_fingerprints(ca_file.read_bytes())
+            except OSError:
+                continue
+        self._system_fingerprints = (identity, fingerprints)
+        return fingerprints
+
+
+class UpdateCaCertificatesBackend(TrustStoreBackend):
+    """Debian and Alpine: CA files of /usr/local/share/ca-certificates, rebuilt by update-ca-certificates,
+    which also updates the hashed symlinks of /etc/ssl/certs and runs the hooks of the system.
+    """
+
+    name = TRUST_STORE_BACKEND_SUBPROCESS
+
+    @staticmethod
+    def is_available() -> bool:
+        return shutil.which(UPDATE_CA_SYSCMD) is not None and Path(CA_SYSPATH).is_dir()
+
+    async def async_rebuild(self, hass: HomeAssistant, timeout: float) -> None:
+        await update_system_ca(timeout)
+
+
+class NativeBackend(TrustStoreBackend):
+    """Debian and Alpine layout, with the CA bundle built in-process: no subprocess,
+    but no hashed symlinks nor hooks of update-ca-certificates either.
+    """
+
+    name = TRUST_STORE_BACKEND_NATIVE
+
+    async def async_rebuild(self, hass: HomeAssistant, timeout: float) -> None:
+        await hass.async_add_executor_job(build_system_ca_bundle, self.ca_path, self.bundle_path)
+
+
+class P11KitBackend(TrustStoreBackend):
+    """Fedora and RHEL: CA files of /etc/pki/ca-trust/source/anchors, extracted by p11-kit into the CA bundles of the system."""
+
+    name = TRUST_STORE_BACKEND_P11KIT
+
+    @classmethod
+    def create(cls, hass: HomeAssistant) -> "TrustStoreBackend":
+        return cls(Path(P11KIT_CA_PATH), Path(P11KIT_BUNDLE_PATH))
+
+    @staticmethod
+    def is_available() -> bool:
+        return shutil.which(P11KIT_SYSCMD) is not None and Path(P11KIT_CA_PATH).is_dir()
+
+    async def async_rebuild(self, hass: HomeAssistant, timeout: float) -> None:
+        await run_trust_store_command([P11KIT_SYSCMD, P11KIT_SYSCMD_OPTIONS], timeout)
+
+    def get_system_ca_files(self) -> list[Path]:
+        # the CA of the system are stored in the p11-kit format, not deduplicated
+        return []
+
+
+class CertifiBackend(TrustStoreBackend):
+    """No system CA trust store: CA files of the HA storage folder, appended to the cacert.pem bundle of certifi.
+    The original bundle of certifi is kept next to it, so removed CA files are dropped on the next rebuild.
+    It is kept per version of certifi: an upgrade of certifi replaces cacert.pem, which is snapshotted again.
+    """
+
+    name = TRUST_STORE_BACKEND_CERTIFI
+
+    @classmethod
+    def create(cls, hass: HomeAssistant) -> "TrustStoreBackend":
+        return cls(Path(hass.config.path(STORAGE_DIR, CERTIFI_CA_DIRNAME)), Path(certifi.where()))
+
+    @staticmethod
+    def is_available() -> bool:
+        return True
+
+    @property
+    def original_bundle_path(self) -> Path:
+        """The original bundle of the installed version of certifi, without the CA files of Additional CA."""
+
+        return self.bundle_path.with_name(f".{self.bundle_path.name}.{DOMAIN}-original-{certifi.__version__}")
+
+    def build_bundle(self) -> None:
+        """Build the certifi bundle: the original bundle followed by the installed CA files."""
+
+        self.ca_path.mkdir(parents=True, exist_ok=True)
+        if not self.original_bundle_path.exists():
+            write_file_atomically(self.original_bundle_path, self.read_bundle())
+        # the original bundles of the previous versions of certifi
+        for original_bundle_path in self.bundle_path.parent.glob(f".{self.bundle_path.name}.{DOMAIN}-original*"):
+            if original_bundle_path != self.original_bundle_path:
+                original_bundle_path.unlink(missing_ok=True)
+        build_system_ca_bundle(self.ca_path, self.bundle_path, [self.original_bundle_path])
+
+    async def async_rebuild(self, hass: HomeAssistant, timeout: float) -> None:
+        await hass.async_add_executor_job(self.build_bundle)
+
+    def get_system_ca_files(self) -> list[Path]:
+        # the certifi bundle is the original one until the first rebuild
+        if self.original_bundle_path.exists():
+            return [self.original_bundle_path]
+        return [self.bundle_path]
+
+
+class CapathBackend(TrustStoreBackend):
+    """No system CA trust store: CA files of the HA storage folder, linked by subject hash like c_rehash does,
+    and registered as CApath of the SSL Contexts of HA, so OpenSSL loads a CA only when a handshake needs it.
+    The system CA bundle is left untouched, the bundle of this backend is the index of the hashed links.
+    """
+
+    name = TRUST_STORE_BACKEND_CAPATH
+
+    def __init__(self, ca_path: Path | None, bundle_path: Path | None) -> None:
+        super().__init__(ca_path, bundle_path)
+        self.capath = ca_path
+
+    @classmethod
+    def create(cls, hass: HomeAssistant) -> "TrustStoreBackend":
+        capath = Path(hass.config.path(STORAGE_DIR, CAPATH_DIRNAME))
+        return cls(capath, capath / CAPATH_INDEX_FILENAME)
+
+    @staticmethod
+    def is_available() -> bool:
+        return True
+
+    async def async_rebuild(self, hass: HomeAssistant, timeout: float) -> None:
+        await hass.async_add_executor_job(rehash_capath, self.ca_path)
+
+    def verify(self, fingerprints: Iterable[str]) -> list[str]:
+        # follow the hashed links like OpenSSL does, rather than trusting the index
+        capath_fingerprints = get_capath_fingerprints(self.ca_path)
+        return [fingerprint for fingerprint in fingerprints if fingerprint not in capath_fingerprints]
+
+    def get_system_ca_files(self) -> list[Path]:
+        # the CA bundle loaded by the SSL Contexts of HA
+        return [Path(os.environ.get("REQUESTS_CA_BUNDLE", certifi.where()))]
+
+
+BACKENDS: dict[str, type[TrustStoreBackend]] = {backend.name: backend for backend in (UpdateCaCertificatesBackend, NativeBackend, P11KitBackend, CertifiBackend, CapathBackend)}
+
+# the first available backend is used: the command of the system first, as it also runs the hooks of the system.
+# CapathBackend is only used if chosen, other programs than HA do not trust its CA files
+DETECTION_ORDER = (UpdateCaCertificatesBackend, P11KitBackend, NativeBackend, CertifiBackend)
+
+
+def detect_backend() -> type[TrustStoreBackend]:
+    """Detect the backend of the system CA trust store of this system, to be run in an executor.
+
+    :return: the class of the first available backend
+    :rtype: type[TrustStoreBackend]
+    """
+
+    return next(backend for backend in DETECTION_ORDER if backend.is_available())
+
+
+async def async_get_backend(hass: HomeAssistant, options: dict) -> TrustStoreBackend:
+    """Get the backend of the system CA trust store chosen by option 'trust_store_backend',
+    detected once if the option is 'auto' or not set.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param options: the options of the config, see split_config()
+    :type options: dict
+    :return: the backend
+    :rtype: TrustStoreBackend
+    """
+
+    name = options.get(TRUST_STORE_BACKEND, TRUST_STORE_BACKEND_AUTO)
+    cached = hass.data.get(BACKEND_KEY)
+    if cached is not None and cached[0] == name:
+        return cached[1]
+
+    if name == TRUST_STORE_BACKEND_AUTO:
+        backend_class = await hass.async_add_executor_job(detect_backend)
+        log.info(f"Using trust store backend '{backend_class.name}'.")
+    else:
+        backend_class = BACKENDS[name]
+    backend = backend_class.create(hass)
+    hass.data[BACKEND_KEY] = (name, backend)
+    return backend
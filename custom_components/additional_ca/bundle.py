@@ -0,0 +1,319 @@
+"""Python functions to build the system CA bundle in-process for Additional CA."""
+
+import base64
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from cryptography import x509
+from cryptography.hazmat.primitives.serialization import Encoding
+from cryptography.x509.oid import NameOID
+
+from .const import (
+    CA_BUNDLE_PATH,
+    CA_DISTRO_CONF,
+    CA_DISTRO_PATH,
+    CA_SYSPATH,
+    DOMAIN,
+    TRANSACTION_DIRNAME,
+)
+from .exceptions import TrustStoreException
+
+log = logging.getLogger(DOMAIN)
+
+PEM_CERT_BEGIN = b"-----BEGIN CERTIFICATE-----"
+PEM_CERT_END = b"-----END CERTIFICATE-----"
+
+
+def split_pem_certificates(data: bytes) -> list[bytes]:
+    """Split PEM data into its certificate blocks, any text outside the blocks is ignored.
+
+    :param data: the PEM data
+    :type data: bytes
+    :return: the certificate blocks, from BEGIN to END marker
+    :rtype: list[bytes]
+    """
+
+    blocks = []
+    start = data.find(PEM_CERT_BEGIN)
+    while start != -1:
+        end = data.find(PEM_CERT_END, start)
+        if end == -1:
+            break
+        end += len(PEM_CERT_END)
+        blocks.append(data[start:end])
+        start = data.find(PEM_CERT_BEGIN, end)
+    return blocks
+
+
+def iter_pem_certificates(path: Path) -> Iterator[bytes]:
+    """Read the certificate blocks of a PEM file one by one, without loading the whole file in memory.
+
+    :param path: the path of the PEM file
+    :type path: Path
+    :return: an iterator over the certificate blocks, from BEGIN to END marker
+    :rtype: Iterator[bytes]
+    """
+
+    with open(path, "rb") as pem_file:
+        block = None
+        for line in pem_file:
+            line = line.strip()
+            if block is None:
+                if line.startswith(PEM_CERT_BEGIN):
+                    block = [line]
+                continue
+            block.append(line)
+            if line.startswith(PEM_CERT_END):
+                yield b"\n".join(block) + b"\n"
+                block = None
+
+
+def pem_to_der(pem_block: bytes) -> bytes:
+    """Decode a PEM certificate block without parsing the certificate.
+
+    :param pem_block: the certificate block, from BEGIN to END marker
+    :type pem_block: bytes
+    :return: the DER encoded certificate
+    :rtype: bytes
+    """
+
+    body = pem_block.strip()[len(PEM_CERT_BEGIN) : -len(PEM_CERT_END)]
+    return base64.b64decode(b"".join(body.split()), validate=True)
+
+
+def get_pem_fingerprints(data: bytes) -> set[str]:
+    """Compute the SHA-256 fingerprints of the certificates of PEM data, without parsing the certificates.
+
+    :param data: the PEM data
+    :type data: bytes
+    :return: the hex fingerprints, invalid blocks are skipped
+    :rtype: set[str]
+    """
+
+    fingerprints = set()
+    for block in split_pem_certificates(data):
+        try:
+            fingerprints.add(hashlib.sha256(pem_to_der(block)).hexdigest())
+        except ValueError:
+            continue
+    return fingerprints
+
+
+def get_distro_ca_files() -> list[Path]:
+    """List the CA files shipped by the distribution, like update-ca-certificates does:
+    files enabled in CA_DISTRO_CONF, or every '.crt' file of CA_DISTRO_PATH if there is no configuration.
+
+    :return: the paths of the distribution CA files
+    :rtype: list[Path]
+    """
+
+    conf_path = Path(CA_DISTRO_CONF)
+    if not conf_path.is_file() or conf_path.stat().st_size == 0:
+        return sorted(Path(CA_DISTRO_PATH).rglob("*.crt"), key=str)
+
+    ca_files = []
+    for line in conf_path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith(("#", "!")):
+            continue
+        ca_file = Path(CA_DISTRO_PATH, line)
+        if not ca_file.is_file():
+            log.warning(f"{ca_file} not found, but listed in {CA_DISTRO_CONF}.")
+            continue
+        ca_files.append(ca_file)
+    return ca_files
+
+
+def get_local_ca_files(ca_path: Path | None = None) -> list[Path]:
+    """List the '.crt' files of CA_SYSPATH, sorted like update-ca-certificates does, without the files of a transaction.
+    Like update-ca-certificates, files with another extension are ignored.
+
+    :param ca_path: the folder of the local CA files, CA_SYSPATH by default
+    :type ca_path: Path | None
+    :return: the paths of the local CA files
+    :rtype: list[Path]
+    """
+
+    ca_syspath = Path(ca_path or CA_SYSPATH)
+    if not ca_syspath.is_dir():
+        return []
+    transaction_path = Path(ca_syspath, TRANSACTION_DIRNAME)
+    return sorted((f for f in ca_syspath.rglob("*.crt") if f.is_file() and transaction_path not in f.parents), key=str)
+
+
+def write_file_atomically(path: Path, data: bytes, mode: int = 0o644) -> None:
+    """Write a file through a temporary file in the same directory,
+    so readers see either the old or the new content, never a partial one.
+
+    :param path: the path of the file to write
+    :type path: Path
+    :param data: the content of the file
+    :type data: bytes
+    :param mode: the permissions of the file
+    :type mode: int
+    """
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def build_system_ca_bundle(ca_path: Path | None = None, bundle_path: Path | None = None, base_ca_files: list[Path] | None = None) -> dict[str, int | list[str]]:
+    """Build the system CA bundle CA_BUNDLE_PATH in-process, without running update-ca-certificates:
+    the distribution CAs followed by the CAs of CA_SYSPATH, each file with a trailing newline.
+    Hashed symlinks and update-ca-certificates hooks are not handled.
+
+    :param ca_path: the folder of the local CA files, CA_SYSPATH by default
+    :type ca_path: Path | None
+    :param bundle_path: the CA bundle to write, CA_BUNDLE_PATH by default
+    :type bundle_path: Path | None
+    :param base_ca_files: the CA files to start the bundle with, the distribution CA files by default
+    :type base_ca_files: list[Path] | None
+    :raises TrustStoreException: if a file of CA_SYSPATH does not contain a valid certificate
+    :return: a report like {'distro': 140, 'local': 2, 'duplicates': ['ca.crt']}
+    :rtype: dict[str, int | list[str]]
+    """
+
+    bundle = bytearray()
+    known_certs = set()
+    report = {"distro": 0, "local": 0, "duplicates": []}
+
+    for ca_file in get_distro_ca_files() if base_ca_files is None else base_ca_files:
+        data = ca_file.read_bytes()
+        for block in split_pem_certificates(data):
+            try:
+                known_certs.add(pem_to_der(block))
+            except ValueError:
+                log.warning(f"Invalid certificate found in distribution CA file '{ca_file}'.")
+        bundle += data if data.endswith(b"\n") or not data else data + b"\n"
+        report["distro"] += 1
+
+    invalid_files = []
+    for ca_file in get_local_ca_files(ca_path):
+        data = ca_file.read_bytes()
+        try:
+            blocks = split_pem_certificates(data)
+            if not blocks:
+                raise ValueError("no certificate found")
+            certs = [x509.load_pem_x509_certificate(block).public_bytes(Encoding.DER) for block in blocks]
+        except ValueError as err:
+            log.error(f"Invalid certificate file '{ca_file.name}': {str(err)}")
+            invalid_files.append(ca_file.name)
+            continue
+
+        if all(cert in known_certs for cert in certs):
+            log.info(f"Skipping duplicate certificate {ca_file.name}")
+            report["duplicates"].append(ca_file.name)
+            continue
+        known_certs.update(certs)
+        bundle += data if data.endswith(b"\n") else data + b"\n"
+        report["local"] += 1
+
+    if invalid_files:
+        raise TrustStoreException(f"Invalid certificate file(s) in '{ca_path or CA_SYSPATH}': {', '.join(invalid_files)}")
+
+    write_file_atomically(Path(bundle_path or CA_BUNDLE_PATH), bytes(bundle))
+    log.info(f"System CA bundle built with {report['distro']} distribution and {report['local']} additional CA file(s).")
+    return report
+
+
+def parse_trust_allow_list(entries: Iterable[str]) -> tuple[set[str], set[str]]:
+    """Split the entries of option 'minimal_trust_allow' into SHA-256 fingerprints and subjects.
+
+    :param entries: the entries like ['AB:CD:...', 'CN=ISRG Root X1,O=Internet Security Research Group,C=US', 'ISRG Root X2']
+    :type entries: Iterable[str]
+    :return: the fingerprints in lowercase hex without colons, and the subjects or Common Names in casefold
+    :rtype: tuple[set[str], set[str]]
+    """
+
+    fingerprints = set()
+    subjects = set()
+    for entry in entries:
+        fingerprint = entry.replace(":", "").strip().lower()
+        if re.fullmatch(r"[0-9a-f]{64}", fingerprint):
+            fingerprints.add(fingerprint)
+        else:
+            subjects.add(entry.strip().casefold())
+    return fingerprints, subjects
+
+
+def get_subject_names(der: bytes) -> set[str]:
+    """Get the names a CA can be allowed by in option 'minimal_trust_allow': its subject, and its Common Names.
+
+    :param der: the certificate in DER format
+    :type der: bytes
+    :return: the casefolded names, empty if the certificate cannot be parsed
+    :rtype: set[str]
+    """
+
+    try:
+        subject = x509.load_der_x509_certificate(der).subject
+    except ValueError:
+        return set()
+    names = {subject.rfc4514_string().casefold()}
+    names.update(str(attribute.value).casefold() for attribute in subject.get_attributes_for_oid(NameOID.COMMON_NAME))
+    return names
+
+
+def filter_ca_bundle(bundle_path: Path, dest_path: Path, fingerprints: set[str], allow_entries: Iterable[str]) -> dict[str, int | list[str]]:
+    """Write a copy of a CA bundle reduced to the CA of some fingerprints and the CA allowed by option 'minimal_trust_allow', to be run in an executor.
+    Certificates are only parsed if some CA are allowed by subject.
+
+    :param bundle_path: the CA bundle to reduce, left untouched
+    :type bundle_path: Path
+    :param dest_path: the reduced CA bundle to write
+    :type dest_path: Path
+    :param fingerprints: the SHA-256 fingerprints of the CA to keep, like the loaded CA
+    :type fingerprints: set[str]
+    :param allow_entries: the entries of option 'minimal_trust_allow', see parse_trust_allow_list()
+    :type allow_entries: Iterable[str]
+    :return: a report like {'kept': 3, 'dropped': 140, 'unmatched': ['Unknown Root']}
+    :rtype: dict[str, int | list[str]]
+    """
+
+    allow_entries = list(allow_entries)
+    allowed_fingerprints, allowed_subjects = parse_trust_allow_list(allow_entries)
+    matched = set()
+    bundle = bytearray()
+    report = {"kept": 0, "dropped": 0, "unmatched": []}
+
+    for block in split_pem_certificates(bundle_path.read_bytes()):
+        try:
+            der = pem_to_der(block)
+        except ValueError:
+            report["dropped"] += 1
+            continue
+        fingerprint = hashlib.sha256(der).hexdigest()
+        matched.add(fingerprint)
+        keep = fingerprint in fingerprints or fingerprint in allowed_fingerprints
+        if allowed_subjects:
+            names = get_subject_names(der)
+            matched.update(names)
+            keep = keep or bool(names & allowed_subjects)
+        if keep:
+            bundle += block + b"\n"
+            report["kept"] += 1
+        else:
+            report["dropped"] += 1
+
+    for entry in allow_entries:
+        if not {entry.replace(":", "").strip().lower(), entry.strip().casefold()} & matched:
+            log.warning(f"CA '{entry}' of option 'minimal_trust_allow' is not in '{bundle_path}'.")
+            report["unmatched"].append(entry)
+
+    write_file_atomically(dest_path, bytes(bundle))
+    log.info(f"CA bundle '{bundle_path}' reduced to {report['kept']} CA into '{dest_path}', {report['dropped']} CA dropped.")
+    return report
@@ -0,0 +1,256 @@
+"""Python functions to keep CA files in an OpenSSL hashed CApath folder, like c_rehash does, for Additional CA."""
+
+import hashlib
+import logging
+import os
+import re
+import struct
+from pathlib import Path
+
+from cryptography import x509
+
+from .bundle import (
+    get_pem_fingerprints,
+    pem_to_der,
+    split_pem_certificates,
+    write_file_atomically,
+)
+from .const import CAPATH_INDEX_FILENAME, DOMAIN
+from .exceptions import TrustStoreException
+
+log = logging.getLogger(DOMAIN)
+
+# Name of a hashed link: the subject hash of a certificate and a number to tell apart certificates with the same subject hash
+HASH_LINK_RE = re.compile(r"[0-9a-f]{8}\.\d+")
+
+# ASN.1 tags of the string types canonicalized by OpenSSL, with their encoding
+ASN1_UTF8STRING = 0x0C
+ASN1_STRING_ENCODINGS = {
+    ASN1_UTF8STRING: "utf-8",
+    0x13: "latin-1",  # PrintableString
+    0x14: "latin-1",  # T61String, handled as Latin-1 by OpenSSL
+    0x16: "latin-1",  # IA5String
+    0x1A: "latin-1",  # VisibleString
+    0x1C: "utf-32-be",  # UniversalString
+    0x1E: "utf-16-be",  # BMPString
+}
+ASN1_SPACES = b" \t\n\v\f\r"
+
+
+def read_der(data: bytes, offset: int = 0) -> tuple[int, bytes, int]:
+    """Read a DER element.
+
+    :param data: the DER data
+    :type data: bytes
+    :param offset: the position of the element
+    :type offset: int
+    :raises ValueError: if the element is truncated
+    :return: the tag, the value and the position of the next element
+    :rtype: tuple[int, bytes, int]
+    """
+
+    tag = data[offset]
+    length = data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        size = length & 0x7F
+        length = int.from_bytes(data[offset : offset + size], "big")
+        offset += size
+    if offset + length > len(data):
+        raise ValueError("truncated DER element")
+    return tag, data[offset : offset + length], offset + length
+
+
+def write_der(tag: int, value: bytes) -> bytes:
+    """Encode a DER element.
+
+    :param tag: the tag of the element
+    :type tag: int
+    :param value: the value of the element
+    :type value: bytes
+    :return: the DER element
+    :rtype: bytes
+    """
+
+    length = len(value)
+    if length < 0x80:
+        return bytes([tag, length]) + value
+    size = (length.bit_length() + 7) // 8
+    return bytes([tag, 0x80 | size]) + length.to_bytes(size, "big") + value
+
+
+def canonicalize_string(value: bytes) -> bytes:
+    """Canonicalize a UTF-8 value of a name like OpenSSL does: spaces trimmed and collapsed, ASCII letters lowercased.
+
+    :param value: the UTF-8 value
+    :type value: bytes
+    :return: the canonical value
+    :rtype: bytes
+    """
+
+    value = value.strip(ASN1_SPACES)
+    canonical = bytearray()
+    previous_space = False
+    for byte in value:
+        if byte in ASN1_SPACES:
+            if not previous_space:
+                canonical.append(0x20)
+            previous_space = True
+            continue
+        previous_space = False
+        canonical.append(byte + 0x20 if 0x41 <= byte <= 0x5A else byte)
+    return bytes(canonical)
+
+
+def get_subject_hash(name_der: bytes) -> str:
+    """Compute the OpenSSL subject hash of a name, the one of 'openssl x509 -hash' and c_rehash:
+    the first 4 bytes of the SHA-1 digest of the canonical encoding of the name, little-endian.
+
+    :param name_der: the DER encoded name
+    :type name_der: bytes
+    :raises ValueError: if the name is not valid DER
+    :return: the hash like '9d66eef0'
+    :rtype: str
+    """
+
+    _, rdns, _ = read_der(name_der)
+    canonical = bytearray()
+    offset = 0
+    while offset < len(rdns):
+        _, rdn, offset = read_der(rdns, offset)
+        entries = []
+        entry_offset = 0
+        while entry_offset < len(rdn):
+            _, entry, entry_offset = read_der(rdn, entry_offset)
+            _, _, value_offset = read_der(entry)
+            oid = entry[:value_offset]
+            tag, value, _ = read_der(entry, value_offset)
+            if tag in ASN1_STRING_ENCODINGS:
+                utf8_value = value.decode(ASN1_STRING_ENCODINGS[tag]).encode("utf-8")
+                entries.append(write_der(0x30, oid + write_der(ASN1_UTF8STRING, canonicalize_string(utf8_value))))
+            else:
+                entries.append(write_der(0x30, entry))
+        # the entries of a SET OF are sorted by their encoding
+        canonical += write_der(0x31, b"".join(sorted(entries)))
+
+    digest = hashlib.sha1(bytes(canonical)).digest()
+    return f"{struct.unpack('<I', digest[:4])[0]:08x}"
+
+
+def get_capath_ca_files(capath: Path) -> list[Path]:
+    """List the CA files of a CApath folder, without the hashed links, the index and the hidden files of a transaction.
+
+    :param capath: the CApath folder
+    :type capath: Path
+    :return: the paths of the CA files
+    :rtype: list[Path]
+    """
+
+    if not capath.is_dir():
+        return []
+    return sorted(
+        (f for f in capath.iterdir() if not f.name.startswith(".") and not HASH_LINK_RE.fullmatch(f.name) and f.name != CAPATH_INDEX_FILENAME and f.is_file() and not f.is_symlink()),
+        key=str,
+    )
+
+
+def get_capath_links(capath: Path) -> tuple[dict[str, str], list[str]]:
+    """Name the link of each certificate of the CA files of a CApath folder by its subject hash, to be run in an executor.
+    A certificate found in several CA files is linked once, to its first CA file.
+
+    :param capath: the CApath folder
+    :type capath: Path
+    :raises TrustStoreException: if a CA file does not contain a valid certificate
+    :return: the links like {'9d66eef0.0': 'myca_ca.crt'}, and the lines of their index like '9d66eef0.0 myca_ca.crt fingerprint'
+    :rtype: tuple[dict[str, str], list[str]]
+    """
+
+    links = {}
+    index = []
+    known_certs = set()
+    hash_counts: dict[str, int] = {}
+    invalid_files = []
+    for ca_file in get_capath_ca_files(capath):
+        try:
+            blocks = split_pem_certificates(ca_file.read_bytes())
+            if not blocks:
+                raise ValueError("no certificate found")
+            certs = [pem_to_der(block) for block in blocks]
+            subject_hashes = [get_subject_hash(x509.load_der_x509_certificate(cert).subject.public_bytes()) for cert in certs]
+        except ValueError as err:
+            log.error(f"Invalid certificate file '{ca_file.name}': {str(err)}")
+            invalid_files.append(ca_file.name)
+            continue
+
+        # a file of several certificates is linked once per certificate, OpenSSL loads the whole file on lookup
+        for cert, subject_hash in zip(certs, subject_hashes):
+            fingerprint = hashlib.sha256(cert).hexdigest()
+            if fingerprint in known_certs:
+                continue
+            known_certs.add(fingerprint)
+            link = f"{subject_hash}.{hash_counts.get(subject_hash, 0)}"
+            hash_counts[subject_hash] = hash_counts.get(subject_hash, 0) + 1
+            links[link] = ca_file.name
+            index.append(f"{link} {ca_file.name} {fingerprint}\n")
+
+    if invalid_files:
+        raise TrustStoreException(f"Invalid certificate file(s) in '{capath}': {', '.join(invalid_files)}")
+    return links, index
+
+
+def rehash_capath(capath: Path) -> dict[str, str]:
+    """Link each certificate of the CA files of a CApath folder by its subject hash, like c_rehash does, to be run in an executor.
+    Links are replaced atomically, stale links are removed, and the index of the links is written last.
+
+    :param capath: the CApath folder
+    :type capath: Path
+    :raises TrustStoreException: if a CA file does not contain a valid certificate
+    :return: the links like {'9d66eef0.0': 'myca_ca.crt'}
+    :rtype: dict[str, str]
+    """
+
+    capath.mkdir(parents=True, exist_ok=True)
+    links, index = get_capath_links(capath)
+
+    for path in capath.iterdir():
+        if HASH_LINK_RE.fullmatch(path.name) and (path.name not in links or not path.is_symlink() or os.readlink(path) != links[path.name]):
+            path.unlink()
+    for link, ca_filename in links.items():
+        link_path = Path(capath, link)
+        if link_path.is_symlink():
+            continue
+        tmp_path = Path(capath, f".{link}.tmp")
+        tmp_path.unlink(missing_ok=True)
+        os.symlink(ca_filename, tmp_path)
+        os.replace(tmp_path, link_path)
+
+    write_file_atomically(Path(capath, CAPATH_INDEX_FILENAME), "".join(index).encode())
+    log.info(f"CApath '{capath}' rehashed with {len(links)} certificate(s).")
+    return links
+
+
+def get_capath_fingerprints(capath: Path) -> set[str]:
+    """Get the SHA-256 fingerprints of the certificates OpenSSL finds through the hashed links of a CApath folder, to be run in an executor.
+
+    :param capath: the CApath folder
+    :type capath: Path
+    :return: the fingerprints of the linked certificates
+    :rtype: set[str]
+    """
+
+    if not capath.is_dir():
+        return set()
+    fingerprints = set()
+    read_files = set()
+    for path in capath.iterdir():
+        if not HASH_LINK_RE.fullmatch(path.name):
+            continue
+        try:
+            target = path.resolve(strict=True)
+            if target in read_files:
+                continue
+            read_files.add(target)
+            fingerprints |= get_pem_fingerprints(target.read_bytes())
+        except OSError:
+            continue
+    return fingerprints
@@ -1,9 +1,29 @@
 """The Config Flow for Additional CA integration."""
 
+from pathlib import Path
+
+import homeassistant.helpers.config_validation as cv
+import voluptuous as vol
 from homeassistant import config_entries
-from .const import DOMAIN
+from homeassistant.core import callback
+
+from .const import (
+    CONF_CA_NAME,
+    CONF_CA_NAMES,
+    CONF_CA_PATH,
+    CONF_CAS,
+    CONFIG_OPTIONS,
+    CONFIG_SUBDIR,
+    DOMAIN,
+    FORCE_ADDITIONAL_CA,
+)
+from .remote import is_remote_ca, is_secure_remote_ca
+from .utils import get_ca_config, split_config
+
 
 class AdditionalCaFlow(config_entries.ConfigFlow, domain=DOMAIN):
+    """Config flow of Additional CA: a single entry imported from the YAML config, its CA files are managed in the options flow."""
+
     VERSION = 1
     MINOR_VERSION = 1
 
@@ -12,7 +32,106 @@ class AdditionalCaFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if self._async_current_entries():
             return self.async_abort(reason="single_instance_allowed")
 
-        return self.async_create_entry(
-            title="Additional CA",
-            data=import_config or {}
+        return self.async_create_entry(title="Additional CA", data=import_config or {})
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Get the options flow to manage the CA files in the UI."""
+        return AdditionalCaOptionsFlow(config_entry)
+
+
+def validate_ca_path(config_path: Path, ca_path: str) -> str | None:
+    """Check the path of a CA file, relative to the config folder 'additional_ca'. To be run in an executor.
+    A URL is accepted if it is HTTPS or pinned, it is fetched on the next reload.
+
+    :param config_path: the path of the config folder 'additional_ca'
+    :type config_path: Path
+    :param ca_path: the path of the CA file, relative to the config folder
+    :type ca_path: str
+    :return: the error key, or None if the CA file exists in the config folder
+    :rtype: str | None
+    """
+
+    if is_remote_ca(ca_path):
+        return None if is_secure_remote_ca(ca_path) else "insecure_url"
+    full_path = Path(config_path, ca_path).resolve()
+    if not full_path.is_relative_to(config_path.resolve()):
+        return "invalid_path"
+    if not full_path.is_file():
+        return "file_not_found"
+    return None
+
+
+class AdditionalCaOptionsFlow(config_entries.OptionsFlow):
+    """Add, remove or re-point the CA files in the UI. Once saved, they replace the CA files of the YAML config."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        self._entry = config_entry
+        self._cas: dict[str, str] = {}
+
+    async def async_step_init(self, user_input=None):  # pylint: disable=unused-argument
+        """Choose the change to make to the CA files."""
+        _, self._cas = split_config(get_ca_config(self.hass)[DOMAIN])
+        return self.async_show_menu(step_id="init", menu_options=["add_ca", "repoint_ca", "remove_ca"])
+
+    async def async_step_add_ca(self, user_input=None):
+        """Add a CA file."""
+        errors = {}
+        if user_input is not None:
+            ca_name = user_input[CONF_CA_NAME].strip()
+            if ca_name in CONFIG_OPTIONS or ca_name == FORCE_ADDITIONAL_CA:
+                errors[CONF_CA_NAME] = "reserved_name"
+            elif ca_name in self._cas:
+                errors[CONF_CA_NAME] = "name_exists"
+            elif error := await self._async_validate_ca_path(user_input[CONF_CA_PATH]):
+                errors[CONF_CA_PATH] = error
+            else:
+                return self._async_save_cas({**self._cas, ca_name: user_input[CONF_CA_PATH]})
+
+        return self.async_show_form(
+            step_id="add_ca",
+            data_schema=vol.Schema({vol.Required(CONF_CA_NAME): cv.string, vol.Required(CONF_CA_PATH): cv.string}),
+            errors=errors,
+        )
+
+    async def async_step_repoint_ca(self, user_input=None):
+        """Change the file of a CA."""
+        if not self._cas:
+            return self.async_abort(reason="no_ca")
+
+        errors = {}
+        if user_input is not None:
+            if error := await self._async_validate_ca_path(user_input[CONF_CA_PATH]):
+                errors[CONF_CA_PATH] = error
+            else:
+                return self._async_save_cas({**self._cas, user_input[CONF_CA_NAME]: user_input[CONF_CA_PATH]})
+
+        return self.async_show_form(
+            step_id="repoint_ca",
+            data_schema=vol.Schema({vol.Required(CONF_CA_NAME): vol.In(list(self._cas)), vol.Required(CONF_CA_PATH): cv.string}),
+            errors=errors,
         )
+
+    async def async_step_remove_ca(self, user_input=None):
+        """Remove CA files."""
+        if not self._cas:
+            return self.async_abort(reason="no_ca")
+
+        if user_input is not None:
+            removed = set(user_input[CONF_CA_NAMES])
+            return self._async_save_cas({ca_name: ca_path for ca_name, ca_path in self._cas.items() if ca_name not in removed})
+
+        return self.async_show_form(
+            step_id="remove_ca",
+            data_schema=vol.Schema({vol.Required(CONF_CA_NAMES): cv.multi_select({k: f"{k} ({v})" for k, v in self._cas.items()})}),
+        )
+
+    async def _async_validate_ca_path(self, ca_path: str) -> str | None:
+        config_path = Path(self.hass.config.path(CONFIG_SUBDIR))
+        return await self.hass.async_add_executor_job(validate_ca_path, config_path, ca_path)
+
+    @callback
+    def _async_save_cas(self, cas: dict[str, str]):
+        # the entry is reloaded by its update listener, applying only the difference with the installed CA
+        return self.async_create_entry(title="", data={CONF_CAS: cas})
@@ -10,7 +10,167 @@ UPDATE_CA_SYSCMD = "update-ca-certificates"
 
 UPDATE_CA_SYSCMD_OPTIONS = "--fresh"
 
+# Option 'update_ca_timeout' to limit the duration of update-ca-certificates, in seconds
+UPDATE_CA_TIMEOUT = "update_ca_timeout"
+
+UPDATE_CA_TIMEOUT_DEFAULT = 120
+
+CA_BUNDLE_PATH = "/etc/ssl/certs/ca-certificates.crt"
+
+CA_DISTRO_PATH = "/usr/share/ca-certificates"
+
+CA_DISTRO_CONF = "/etc/ca-certificates.conf"
+
+# Hidden folder of CA_SYSPATH where CA files are staged and snapshotted during an update of the system CA trust store
+TRANSACTION_DIRNAME = ".additional_ca-transaction"
+
+# Option 'trust_store_backend' to choose how the system CA trust store is rebuilt, detected at startup by default
+TRUST_STORE_BACKEND = "trust_store_backend"
+
+TRUST_STORE_BACKEND_AUTO = "auto"
+
+TRUST_STORE_BACKEND_SUBPROCESS = "update-ca-certificates"
+
+TRUST_STORE_BACKEND_NATIVE = "native"
+
+TRUST_STORE_BACKEND_P11KIT = "p11-kit"
+
+TRUST_STORE_BACKEND_CERTIFI = "certifi"
+
+TRUST_STORE_BACKEND_CAPATH = "capath"
+
+# Key in hass.data of the backend of the system CA trust store
+BACKEND_KEY = f"{DOMAIN}_backend"
+
+# Layout of the system CA trust store managed by p11-kit (Fedora, RHEL...)
+P11KIT_CA_PATH = "/etc/pki/ca-trust/source/anchors"
+
+P11KIT_BUNDLE_PATH = "/etc/pki/tls/certs/ca-bundle.crt"
+
+P11KIT_SYSCMD = "trust"
+
+P11KIT_SYSCMD_OPTIONS = "extract-compat"
+
+# Folder of the HA storage folder holding the CA files added to the certifi bundle
+CERTIFI_CA_DIRNAME = f"{DOMAIN}.certifi"
+
+# Folder of the HA storage folder holding the CA files linked by subject hash, registered as CApath of the SSL Contexts of HA
+CAPATH_DIRNAME = f"{DOMAIN}.capath"
+
+# Index of the hashed links of the CApath folder, with the fingerprint of each linked certificate
+CAPATH_INDEX_FILENAME = "capath.index"
+
+# Option 'hot_reload' to apply the changes of CONFIG_SUBDIR without restarting Home Assistant
+HOT_RELOAD = "hot_reload"
+
+# Delay to wait for a burst of changes to settle before reloading, in seconds
+HOT_RELOAD_COOLDOWN = 5
+
+HOT_RELOAD_POLL_INTERVAL = 30
+
+# Option 'max_concurrency', the number of CA files processed at the same time
+MAX_CONCURRENCY = "max_concurrency"
+
+MAX_CONCURRENCY_DEFAULT = 8
+
+# Option 'minimal_trust' to make the client SSL Contexts of HA load a CA bundle reduced to the loaded CA and the public CA of option 'minimal_trust_allow',
+# each given by SHA-256 fingerprint, subject or Common Name. The system CA bundle is left untouched
+MINIMAL_TRUST = "minimal_trust"
+
+MINIMAL_TRUST_ALLOW = "minimal_trust_allow"
+
+# the reduced CA bundle, in the HA storage folder
+MINIMAL_TRUST_BUNDLE_FILENAME = f"{DOMAIN}.minimal_trust.crt"
+
+# Option 'auto_discovery' to load every CA file of CONFIG_SUBDIR, optionally filtered by the glob of option 'auto_discovery_glob'
+AUTO_DISCOVERY = "auto_discovery"
+
+AUTO_DISCOVERY_GLOB = "auto_discovery_glob"
+
+AUTO_DISCOVERY_GLOB_DEFAULT = "**/*"
+
+AUTO_DISCOVERY_SUFFIXES = (".pem", ".crt")
+
+# Cache of the CA files parsed by the last run, keyed by (inode, mtime_ns, size)
+SCAN_CACHE_STORAGE_KEY = f"{DOMAIN}.scan_cache"
+
+# to be bumped when the format of an entry changes, like the metadata of parse_ca_metadata(): a cache of another version is discarded
+SCAN_CACHE_STORAGE_VERSION = 1
+
+# CA files can be fetched from a URL, cached on disk and revalidated with ETag/Last-Modified conditional requests
+REMOTE_CA_SCHEMES = ("http", "https")
+
+# an HTTP URL must pin the SHA-256 fingerprints of its certificates in its fragment, like 'http://pki.example.com/root.crt#sha256=9d66...'
+REMOTE_CA_SECURE_SCHEMES = ("https",)
+
+REMOTE_CA_PIN_PREFIX = "sha256="
+
+REMOTE_CA_TIMEOUT = 30
+
+# Maximum size of a CA fetched from a URL, in bytes
+REMOTE_CA_MAX_SIZE = 1024 * 1024
+
+# Folder of the HA storage folder where the fetched CA files are cached
+REMOTE_CACHE_DIRNAME = f"{DOMAIN}.remote"
+
+REMOTE_CACHE_STORAGE_KEY = f"{DOMAIN}.remote_cache"
+
+REMOTE_CACHE_STORAGE_VERSION = 1
+
+# CA files whose certificates are all shipped by the system CA trust store are not installed, reported as deduplicated by the system
+DEDUP_SYSTEM = "system"
+
+# Key in hass.data of the stats of the last run, for diagnostics
+RUN_STATS_KEY = f"{DOMAIN}_run_stats"
+
+# Options are reserved keys of the config, not CA names
+CONFIG_OPTIONS = (
+    TRUST_STORE_BACKEND,
+    UPDATE_CA_TIMEOUT,
+    HOT_RELOAD,
+    MAX_CONCURRENCY,
+    AUTO_DISCOVERY,
+    AUTO_DISCOVERY_GLOB,
+    MINIMAL_TRUST,
+    MINIMAL_TRUST_ALLOW,
+)
+
 # Deprecated option 'force_additional_ca' (boolean), to be removed from code in future
 FORCE_ADDITIONAL_CA = "force_additional_ca"
 
+MANIFEST_STORAGE_KEY = f"{DOMAIN}.manifest"
+
+MANIFEST_STORAGE_VERSION = 1
+
 NEEDS_RESTART_NOTIF_ID = "hass-additional-ca-needs-restart"
+
+EXPIRY_NOTIF_ID = "hass-additional-ca-expiry"
+
+# Days before the expiry of a CA to warn with a persistent notification
+EXPIRY_WARNING_DAYS = (30, 7, 1)
+
+# Key in hass.data of the metadata of the loaded CA, for the sensors
+CA_METADATA_KEY = f"{DOMAIN}_ca_metadata"
+
+# Dispatcher signal sent when the loaded CA change
+SIGNAL_CA_UPDATED = f"{DOMAIN}_ca_updated"
+
+# Option of the config entry with the CA files managed in the UI, replacing the CA files of the YAML config
+CONF_CAS = "cas"
+
+# Keys in hass.data of the YAML config, and of the CA files applied by the last run
+YAML_CONFIG_KEY = f"{DOMAIN}_yaml_config"
+APPLIED_CONFIG_KEY = f"{DOMAIN}_applied_config"
+
+# Lock in hass.data preventing overlapping updates of the system CA trust store, and the reload in flight
+UPDATE_LOCK_KEY = f"{DOMAIN}_update_lock"
+RELOAD_TASK_KEY = f"{DOMAIN}_reload_task"
+
+SERVICE_RELOAD = "reload"
+SERVICE_VERIFY = "verify"
+SERVICE_PLAN = "plan"
+
+# Fields of the options flow
+CONF_CA_NAME = "ca_name"
+CONF_CA_NAMES = "ca_names"
+CONF_CA_PATH = "ca_path"
@@ -0,0 +1,180 @@
+"""Python functions for the auto-discovery of CA files, and the cache of the parsed CA files."""
+
+import logging
+import os
+import re
+import stat
+from pathlib import Path, PurePath
+
+import voluptuous as vol
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    AUTO_DISCOVERY_SUFFIXES,
+    CONFIG_OPTIONS,
+    DOMAIN,
+    SCAN_CACHE_STORAGE_KEY,
+    SCAN_CACHE_STORAGE_VERSION,
+)
+
+log = logging.getLogger(DOMAIN)
+
+
+def is_relative_glob(pattern: str) -> bool:
+    """Check a glob pattern matches files of the folder it is relative to only: not absolute, without '..'.
+
+    :param pattern: the glob pattern
+    :type pattern: str
+    :return: True if the glob pattern is relative, without '..'
+    :rtype: bool
+    """
+
+    return bool(pattern) and not PurePath(pattern).is_absolute() and ".." not in PurePath(pattern).parts
+
+
+def relative_glob(value: str) -> str:
+    """Validate the glob pattern of option 'auto_discovery_glob', relative to the config folder 'additional_ca'.
+
+    :param value: the glob pattern
+    :type value: str
+    :raises vol.Invalid: if the glob pattern is absolute or contains '..'
+    :return: the glob pattern
+    :rtype: str
+    """
+
+    if not is_relative_glob(value):
+        raise vol.Invalid(f"Glob pattern '{value}' must be relative to the config folder 'additional_ca', without '..'")
+    return value
+
+
+def discover_ca_files(config_path: Path, pattern: str) -> list[str]:
+    """List the CA files of the config folder matching the glob pattern, to be run in an executor.
+    Only files with a PEM/CRT extension are kept, files out of the config folder are skipped, like the ones reached through a symlink.
+
+    :param config_path: the path of the config folder 'additional_ca'
+    :type config_path: Path
+    :param pattern: the glob pattern, relative to the config folder, like '**/*' or 'corp/*.crt'
+    :type pattern: str
+    :return: the sorted relative paths like ['ca.crt', 'some_folder/ca2.pem']
+    :rtype: list[str]
+    """
+
+    if not is_relative_glob(pattern):
+        log.error(f"Auto-discovery skipped, glob pattern '{pattern}' must be relative to the config folder, without '..'.")
+        return []
+
+    discovered = []
+    resolved_config_path = config_path.resolve()
+    for path in config_path.glob(pattern):
+        if path.suffix.lower() not in AUTO_DISCOVERY_SUFFIXES:
+            continue
+        if not path.resolve().is_relative_to(resolved_config_path):
+            log.warning(f"Discovered CA '{path}' skipped, it is out of the config folder.")
+            continue
+        try:
+            path_stat = path.stat()
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        if stat.S_ISREG(path_stat.st_mode):
+            discovered.append(path.relative_to(config_path).as_posix())
+    return sorted(discovered)
+
+
+def get_discovered_ca_key(ca_path: str) -> str:
+    """Derive the name of a discovered CA from its relative path.
+
+    :param ca_path: the relative path of the CA file, like 'some_folder/ca2.pem'
+    :type ca_path: str
+    :return: the name of the CA, like 'some_folder_ca2'
+    :rtype: str
+    """
+
+    return re.sub(r"\W+", "_", Path(ca_path).with_suffix("").as_posix()).strip("_")
+
+
+def merge_discovered_cas(ca_files: dict[str, str], discovered: list[str]) -> dict[str, str]:
+    """Add the discovered CA files to the CA files of the config.
+    The CA files of the config keep their name, discovered files already in the config are skipped.
+
+    :param ca_files: the CA files of the config like {'ca name': 'ca.crt'}
+    :type ca_files: dict[str, str]
+    :param discovered: the relative paths of the discovered CA files, see discover_ca_files()
+    :type discovered: list[str]
+    :return: the CA files of the config, followed by the discovered CA files
+    :rtype: dict[str, str]
+    """
+
+    merged = dict(ca_files)
+    configured_paths = {os.path.normpath(ca_value) for ca_value in ca_files.values()}
+    for ca_path in discovered:
+        if os.path.normpath(ca_path) in configured_paths:
+            continue
+        ca_key = get_discovered_ca_key(ca_path)
+        if ca_key in merged or ca_key in CONFIG_OPTIONS:
+            log.warning(f"Discovered CA '{ca_path}' skipped, its name '{ca_key}' is already used.")
+            continue
+        merged[ca_key] = ca_path
+    return merged
+
+
+def get_file_identity(path_stat: os.stat_result) -> list[int]:
+    """Identify a version of a file by its stat, to know if it changed without reading it.
+
+    :param path_stat: the stat of the file
+    :type path_stat: os.stat_result
+    :return: [inode, mtime_ns, size]
+    :rtype: list[int]
+    """
+
+    return [path_stat.st_ino, path_stat.st_mtime_ns, path_stat.st_size]
+
+
+def is_scan_cache_entry(entry: object) -> bool:
+    """Check an entry of the cache of the parsed CA files is well-formed, so a damaged entry is parsed again instead of failing the run.
+
+    :param entry: the entry, see async_load_scan_cache()
+    :type entry: object
+    :return: True if the entry can be used
+    :rtype: bool
+    """
+
+    return (
+        isinstance(entry, dict)
+        and isinstance(entry.get("stat"), list)
+        and len(entry["stat"]) == 3
+        and isinstance(entry.get("sha256"), str)
+        and isinstance(entry.get("certs"), list)
+        and all(isinstance(metadata, dict) and "fingerprint" in metadata for metadata in entry["certs"])
+    )
+
+
+async def async_load_scan_cache(hass: HomeAssistant) -> dict[str, dict]:
+    """Load the cache of the CA files parsed by the last run from HA storage.
+    The cache is discarded if it was saved with another format version, and damaged entries are left out.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :return: a dict like {'/config/additional_ca/ca.crt': {'stat': [inode, mtime_ns, size], 'sha256': '...', 'certs': [{...}]}}
+    :rtype: dict[str, dict]
+    """
+
+    try:
+        data = await Store(hass, SCAN_CACHE_STORAGE_VERSION, SCAN_CACHE_STORAGE_KEY).async_load() or {}
+    except NotImplementedError:
+        # saved with another format version, CA files are parsed again and the cache is overwritten by the next save
+        log.info("Cache of the parsed CA files has an outdated format, it is discarded.")
+        return {}
+    return {path: entry for path, entry in data.items() if is_scan_cache_entry(entry)}
+
+
+async def async_save_scan_cache(hass: HomeAssistant, scan_cache: dict[str, dict]) -> None:
+    """Save the cache of the parsed CA files into HA storage.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param scan_cache: the cache, see async_load_scan_cache()
+    :type scan_cache: dict[str, dict]
+    """
+
+    await Store(hass, SCAN_CACHE_STORAGE_VERSION, SCAN_CACHE_STORAGE_KEY).async_save(scan_cache)
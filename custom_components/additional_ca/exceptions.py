@@ -3,3 +3,11 @@
 
 class SerialNumberException(Exception):
     """An exception in case of error on serial number of certificate."""
+
+
+class TrustStoreException(Exception):
+    """An exception in case of error while rebuilding the system CA trust store."""
+
+
+class RemoteCaException(Exception):
+    """An exception in case of error on a CA fetched from a URL."""
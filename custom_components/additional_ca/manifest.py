@@ -0,0 +1,79 @@
+"""Python functions for the manifest of CA installed by Additional CA."""
+
+import hashlib
+from collections.abc import Iterable
+from pathlib import Path
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import MANIFEST_STORAGE_KEY, MANIFEST_STORAGE_VERSION
+
+
+def file_sha256(path: Path) -> str | None:
+    """Compute the SHA-256 digest of a file.
+
+    :param path: the path of the file
+    :type path: Path
+    :return: the hex digest, or None if the file does not exist
+    :rtype: str | None
+    """
+
+    try:
+        with open(path, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+async def async_load_manifest(hass: HomeAssistant) -> dict:
+    """Load the manifest of the last successful update of the system CA trust store from HA storage.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :return: a dict like {'cas': {'unique ca name': {'source': 'ca.crt', 'sha256': '...'}}, 'bundle_sha256': '...', 'owned': ['unique ca name']},
+        with the 'trust_policy' of a reduced system CA bundle and the 'system_fingerprints' of the configured CA trusted by the system
+    :rtype: dict
+    """
+
+    data = await Store(hass, MANIFEST_STORAGE_VERSION, MANIFEST_STORAGE_KEY).async_load()
+    if not data:
+        return {"cas": {}, "bundle_sha256": None, "owned": []}
+    # manifests saved before ownership tracking own their installed CA
+    data.setdefault("owned", list(data["cas"]))
+    return data
+
+
+# the optional fields of the manifest are keyword-only
+async def async_save_manifest(  # pylint: disable=too-many-arguments
+    hass: HomeAssistant,
+    cas: dict[str, dict[str, str]],
+    bundle_sha256: str | None,
+    *,
+    owned: Iterable[str] | None = None,
+    trust_policy: dict | None = None,
+    system_fingerprints: Iterable[str] | None = None,
+) -> None:
+    """Save the manifest of the system CA trust store into HA storage.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param cas: the installed CA like {'unique ca name': {'source': 'ca.crt', 'sha256': '...'}, ...}
+    :type cas: dict[str, dict[str, str]]
+    :param bundle_sha256: the SHA-256 digest of the system CA bundle built with these CA
+    :type bundle_sha256: str | None
+    :param owned: the files of CA_SYSPATH installed by Additional CA, the installed CA by default
+    :type owned: Iterable[str] | None
+    :param trust_policy: the policy the system CA bundle was reduced with, see get_trust_policy(), None if not reduced
+    :type trust_policy: dict | None
+    :param system_fingerprints: the fingerprints of the configured CA already trusted by the system, so the system CA files are not parsed on startup
+    :type system_fingerprints: Iterable[str] | None
+    """
+
+    owned = sorted(cas if owned is None else owned)
+    data = {"cas": cas, "bundle_sha256": bundle_sha256, "owned": owned}
+    if trust_policy is not None:
+        data["trust_policy"] = trust_policy
+    if system_fingerprints is not None:
+        data["system_fingerprints"] = sorted(system_fingerprints)
+    await Store(hass, MANIFEST_STORAGE_VERSION, MANIFEST_STORAGE_KEY).async_save(data)
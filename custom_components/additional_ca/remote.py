@@ -0,0 +1,326 @@
+"""Python functions to fetch CA files from a URL, with an on-disk cache revalidated by conditional requests."""
+
+import asyncio
+import hashlib
+import logging
+import re
+import shutil
+from collections.abc import Iterable
+from pathlib import Path, PurePosixPath
+from urllib.parse import unquote, urldefrag, urlparse
+
+import aiohttp
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import STORAGE_DIR, Store
+
+from .bundle import get_pem_fingerprints, write_file_atomically
+from .const import (
+    DOMAIN,
+    REMOTE_CA_MAX_SIZE,
+    REMOTE_CA_PIN_PREFIX,
+    REMOTE_CA_SCHEMES,
+    REMOTE_CA_SECURE_SCHEMES,
+    REMOTE_CA_TIMEOUT,
+    REMOTE_CACHE_DIRNAME,
+    REMOTE_CACHE_STORAGE_KEY,
+    REMOTE_CACHE_STORAGE_VERSION,
+)
+from .exceptions import RemoteCaException
+from .stats import RunStats
+
+log = logging.getLogger(DOMAIN)
+
+
+def is_remote_ca(ca_value: str) -> bool:
+    """Check if a CA of the config is a URL, rather than a file of the config folder.
+
+    :param ca_value: the CA of the config, like 'ca.crt' or 'https://pki.example.com/root.crt'
+    :type ca_value: str
+    :return: True if the CA is fetched from a URL
+    :rtype: bool
+    """
+
+    return urlparse(ca_value).scheme in REMOTE_CA_SCHEMES
+
+
+def get_remote_ca_pins(url: str) -> set[str]:
+    """Get the SHA-256 fingerprints pinned in the fragment of a URL, like 'http://pki.example.com/root.crt#sha256=9d66...,4f2a...'.
+
+    :param url: the URL of the CA
+    :type url: str
+    :return: the pinned fingerprints, lowercase without colons, empty if a pin is not a SHA-256 fingerprint
+    :rtype: set[str]
+    """
+
+    fragment = urlparse(url).fragment
+    if not fragment.startswith(REMOTE_CA_PIN_PREFIX):
+        return set()
+    pins = {pin.strip().replace(":", "").lower() for pin in fragment[len(REMOTE_CA_PIN_PREFIX) :].split(",")}
+    if not all(re.fullmatch(r"[0-9a-f]{64}", pin) for pin in pins):
+        return set()
+    return pins
+
+
+def get_ca_display_name(ca_value: str) -> str:
+    """Get the name of a CA of the config shown to the user: a URL without the pins of its fragment.
+
+    :param ca_value: the CA of the config, like 'ca.crt' or 'http://pki.example.com/root.crt#sha256=9d66...'
+    :type ca_value: str
+    :return: the name like 'ca.crt' or 'http://pki.example.com/root.crt'
+    :rtype: str
+    """
+
+    return urldefrag(ca_value).url if is_remote_ca(ca_value) else ca_value
+
+
+def is_secure_remote_ca(url: str) -> bool:
+    """Check if a CA given by URL can be trusted: fetched over HTTPS, or pinned by fingerprint.
+    Anyone on the network path of an HTTP URL could serve their own CA.
+
+    :param url: the URL of the CA
+    :type url: str
+    :return: True if the URL is HTTPS or pins the fingerprints of its certificates
+    :rtype: bool
+    """
+
+    return urlparse(url).scheme in REMOTE_CA_SECURE_SCHEMES or bool(get_remote_ca_pins(url))
+
+
+def get_ca_filename(ca_value: str) -> str:
+    """Get the file name of a CA of the config: the last segment of a URL,
+    or 'ca.crt' if the URL does not end with a PEM/CRT file name.
+
+    :param ca_value: the CA of the config, like 'ca.crt' or 'https://pki.example.com/root.crt'
+    :type ca_value: str
+    :return: the file name like 'root.crt'
+    :rtype: str
+    """
+
+    if not is_remote_ca(ca_value):
+        return Path(ca_value).name
+    filename = PurePosixPath(unquote(urlparse(ca_value).path)).name
+    if re.fullmatch(r"[\w.-]+\.(crt|pem)", filename, re.IGNORECASE):
+        return filename
+    return "ca.crt"
+
+
+def get_remote_cache_path(hass: HomeAssistant) -> Path:
+    """Get the folder where the fetched CA files are cached.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :return: the path like /config/.storage/additional_ca.remote
+    :rtype: Path
+    """
+
+    return Path(hass.config.path(STORAGE_DIR, REMOTE_CACHE_DIRNAME))
+
+
+def get_remote_ca_path(remote_cache_path: Path, url: str) -> Path:
+    """Get the path of the cached copy of a CA fetched from a URL, one subfolder per URL.
+
+    :param remote_cache_path: the folder of the cached CA files, see get_remote_cache_path()
+    :type remote_cache_path: Path
+    :param url: the URL of the CA
+    :type url: str
+    :return: the path like /config/.storage/additional_ca.remote/<URL digest>/root.crt
+    :rtype: Path
+    """
+
+    return Path(remote_cache_path, hashlib.sha256(url.encode()).hexdigest()[:16], get_ca_filename(url))
+
+
+def get_ca_src_path(config_path: Path, remote_cache_path: Path, ca_value: str) -> Path:
+    """Get the path of the file to load for a CA of the config: a file of the config folder, or the cached copy of a URL.
+
+    :param config_path: the path of the config folder 'additional_ca'
+    :type config_path: Path
+    :param remote_cache_path: the folder of the cached CA files, see get_remote_cache_path()
+    :type remote_cache_path: Path
+    :param ca_value: the CA of the config, like 'ca.crt' or 'https://pki.example.com/root.crt'
+    :type ca_value: str
+    :return: the path of the CA file
+    :rtype: Path
+    """
+
+    if is_remote_ca(ca_value):
+        return get_remote_ca_path(remote_cache_path, ca_value)
+    return Path(config_path, ca_value)
+
+
+# the cached copy and its validators are required to revalidate the CA
+async def async_fetch_remote_ca(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    hass: HomeAssistant,
+    session: aiohttp.ClientSession,
+    url: str,
+    ca_path: Path,
+    validators: dict[str, str] | None,
+    stats: RunStats,
+) -> dict[str, str] | None:
+    """Fetch a CA from a URL into its cached copy, with a conditional request if the CA was fetched before.
+    The cached copy is only rewritten when the content changed, so an unchanged CA is not parsed again.
+    A CA larger than REMOTE_CA_MAX_SIZE, or not matching the fingerprints pinned in the URL, is rejected like an unreachable one.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param session: the HTTP client session
+    :type session: aiohttp.ClientSession
+    :param url: the URL of the CA
+    :type url: str
+    :param ca_path: the path of the cached copy, see get_remote_ca_path()
+    :type ca_path: Path
+    :param validators: the validators of the cached copy like {'etag': '"abc"', 'last_modified': '...'}
+    :type validators: dict[str, str] | None
+    :param stats: the stats of the run, to count the revalidated CA
+    :type stats: RunStats
+    :return: the validators of the cached copy, or None if the CA was never fetched
+    :rtype: dict[str, str] | None
+    """
+
+    cached = await hass.async_add_executor_job(ca_path.is_file)
+    headers = {}
+    if cached and validators:
+        if validators.get("etag"):
+            headers[aiohttp.hdrs.IF_NONE_MATCH] = validators["etag"]
+        if validators.get("last_modified"):
+            headers[aiohttp.hdrs.IF_MODIFIED_SINCE] = validators["last_modified"]
+
+    try:
+        async with session.get(get_ca_display_name(url), headers=headers, timeout=aiohttp.ClientTimeout(total=REMOTE_CA_TIMEOUT)) as response:
+            if response.status == 304:
+                log.info(f"CA '{url}' is unchanged.")
+                stats.cache_hit("remote")
+                return validators
+            response.raise_for_status()
+            content = await read_remote_ca(response)
+            new_validators = {
+                "etag": response.headers.get(aiohttp.hdrs.ETAG),
+                "last_modified": response.headers.get(aiohttp.hdrs.LAST_MODIFIED),
+            }
+        check_remote_ca_pins(url, content)
+    except (aiohttp.ClientError, asyncio.TimeoutError, RemoteCaException) as err:
+        if cached:
+            log.warning(f"Unable to fetch CA '{url}', using the cached copy: {str(err) or type(err).__name__}")
+            return validators
+        log.error(f"Unable to fetch CA '{url}': {str(err) or type(err).__name__}")
+        return None
+
+    stats.cache_miss("remote")
+    await hass.async_add_executor_job(write_remote_ca, ca_path, content)
+    return new_validators
+
+
+async def read_remote_ca(response: aiohttp.ClientResponse) -> bytes:
+    """Read the body of a response, up to REMOTE_CA_MAX_SIZE bytes.
+
+    :param response: the response of the URL of the CA
+    :type response: aiohttp.ClientResponse
+    :raises RemoteCaException: if the body is larger than REMOTE_CA_MAX_SIZE
+    :return: the body
+    :rtype: bytes
+    """
+
+    too_large = RemoteCaException(f"CA is larger than {REMOTE_CA_MAX_SIZE} bytes")
+    if response.content_length is not None and response.content_length > REMOTE_CA_MAX_SIZE:
+        raise too_large
+    content = bytearray()
+    async for chunk in response.content.iter_chunked(64 * 1024):
+        content += chunk
+        if len(content) > REMOTE_CA_MAX_SIZE:
+            raise too_large
+    return bytes(content)
+
+
+def check_remote_ca_pins(url: str, content: bytes) -> None:
+    """Check the certificates of a CA fetched from a URL are the ones pinned in the URL, if any.
+
+    :param url: the URL of the CA
+    :type url: str
+    :param content: the fetched content
+    :type content: bytes
+    :raises RemoteCaException: if a certificate is not pinned, or there is no certificate
+    """
+
+    pins = get_remote_ca_pins(url)
+    if not pins:
+        return
+    fingerprints = get_pem_fingerprints(content)
+    if not fingerprints or not fingerprints <= pins:
+        raise RemoteCaException("CA does not match the SHA-256 fingerprint(s) pinned in its URL")
+
+
+def write_remote_ca(ca_path: Path, content: bytes) -> None:
+    """Write the cached copy of a CA fetched from a URL, unless it already has this content. To be run in an executor.
+
+    :param ca_path: the path of the cached copy
+    :type ca_path: Path
+    :param content: the fetched content
+    :type content: bytes
+    """
+
+    if ca_path.is_file() and ca_path.read_bytes() == content:
+        return
+    ca_path.parent.mkdir(parents=True, exist_ok=True)
+    write_file_atomically(ca_path, content)
+
+
+def remove_stale_remote_cas(remote_cache_path: Path, urls: Iterable[str]) -> None:
+    """Remove the cached copies of the URLs no longer in the config. To be run in an executor.
+
+    :param remote_cache_path: the folder of the cached CA files, see get_remote_cache_path()
+    :type remote_cache_path: Path
+    :param urls: the URLs of the config
+    :type urls: Iterable[str]
+    """
+
+    if not remote_cache_path.is_dir():
+        return
+    wanted = {get_remote_ca_path(remote_cache_path, url).parent for url in urls}
+    if not wanted:
+        shutil.rmtree(remote_cache_path, ignore_errors=True)
+        return
+    for path in remote_cache_path.iterdir():
+        if path not in wanted:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+async def async_fetch_remote_cas(hass: HomeAssistant, remote_cas: dict[str, str], max_concurrency: int, stats: RunStats) -> None:
+    """Fetch the CA of the config given by URL into the on-disk cache, concurrently, with HA's shared client session.
+    The cached copies of the URLs no longer in the config are removed, and so are the ones of HTTP URLs without a pin, which are not fetched.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param remote_cas: the CA of the config given by URL like {'ca name': 'https://pki.example.com/root.crt'}
+    :type remote_cas: dict[str, str]
+    :param max_concurrency: the maximum number of CA fetched at the same time
+    :type max_concurrency: int
+    :param stats: the stats of the run
+    :type stats: RunStats
+    """
+
+    remote_cache_path = get_remote_cache_path(hass)
+    if not remote_cas and not await hass.async_add_executor_job(remote_cache_path.is_dir):
+        return
+
+    for ca_key, url in remote_cas.items():
+        if not is_secure_remote_ca(url):
+            log.error(f"{ca_key}: CA '{url}' is not loaded, a CA given by URL must be served over HTTPS, or pinned like 'http://...#sha256=<fingerprint>'.")
+    remote_cas = {ca_key: url for ca_key, url in remote_cas.items() if is_secure_remote_ca(url)}
+
+    session = async_get_clientsession(hass)
+    store = Store(hass, REMOTE_CACHE_STORAGE_VERSION, REMOTE_CACHE_STORAGE_KEY)
+    validators = await store.async_load() or {}
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch(ca_key: str, url: str) -> dict[str, str] | None:
+        async with semaphore:
+            with stats.phase("fetch_ca", ca_key):
+                return await async_fetch_remote_ca(hass, session, url, get_remote_ca_path(remote_cache_path, url), validators.get(url), stats)
+
+    urls = list(remote_cas.values())
+    results = await asyncio.gather(*(fetch(ca_key, url) for ca_key, url in remote_cas.items()))
+    new_validators = {url: result for url, result in zip(urls, results) if result is not None}
+    await hass.async_add_executor_job(remove_stale_remote_cas, remote_cache_path, urls)
+    if new_validators != validators:
+        await store.async_save(new_validators)
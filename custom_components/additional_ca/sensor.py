@@ -0,0 +1,267 @@
+"""Sensor platform for Additional CA: the expiry of each CA."""
+
+from __future__ import annotations
+
+import heapq
+import math
+from datetime import datetime, timedelta
+
+from homeassistant.components import persistent_notification
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import UnitOfTime
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_point_in_time
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CA_METADATA_KEY,
+    DOMAIN,
+    EXPIRY_NOTIF_ID,
+    EXPIRY_WARNING_DAYS,
+    SIGNAL_CA_UPDATED,
+)
+from .utils import log
+
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback) -> None:
+    """Set up an expiry sensor for each CA loaded by Additional CA, from the metadata parsed at setup.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param entry: the config entry of Additional CA
+    :type entry: ConfigEntry
+    :param async_add_entities: the callback to add entities
+    :type async_add_entities: AddEntitiesCallback
+    """
+
+    scheduler = ExpiryScheduler(hass)
+    entities: dict[str, CaExpirySensor] = {}
+
+    @callback
+    def async_update_entities() -> None:
+        ca_files = hass.data.get(CA_METADATA_KEY, {})
+        new_entities = {}
+        for ca_name, metadata in ca_files.items():
+            unique_id = f"{DOMAIN}_{metadata['fingerprint']}"
+            if unique_id in entities:
+                entities[unique_id].async_update_metadata(ca_name, metadata)
+            elif unique_id not in new_entities:
+                new_entities[unique_id] = CaExpirySensor(scheduler, unique_id, ca_name, metadata)
+
+        # remove the sensors of CA no longer loaded
+        unique_ids = {f"{DOMAIN}_{metadata['fingerprint']}" for metadata in ca_files.values()}
+        registry = er.async_get(hass)
+        for unique_id in set(entities) - unique_ids:
+            entity = entities.pop(unique_id)
+            if entity_id := registry.async_get_entity_id("sensor", DOMAIN, unique_id):
+                registry.async_remove(entity_id)
+            else:
+                hass.async_create_task(entity.async_remove())
+
+        entities.update(new_entities)
+        if new_entities:
+            async_add_entities(new_entities.values())
+
+    async_update_entities()
+
+    # remove the sensors of CA removed while the entry was not loaded
+    registry = er.async_get(hass)
+    for registry_entry in er.async_entries_for_config_entry(registry, entry.entry_id):
+        if registry_entry.domain == "sensor" and registry_entry.unique_id not in entities:
+            registry.async_remove(registry_entry.entity_id)
+
+    entry.async_on_unload(async_dispatcher_connect(hass, SIGNAL_CA_UPDATED, async_update_entities))
+    entry.async_on_unload(scheduler.async_stop)
+
+
+class ExpiryScheduler:
+    """Refresh the expiry sensors at their next deadline.
+    Deadlines are kept in a min-heap, and a single timer is armed at the earliest one, whatever the number of CA.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._heap: list[tuple[datetime, str]] = []
+        self._sensors: dict[str, CaExpirySensor] = {}
+        self._timer_deadline: datetime | None = None
+        self._unsub_timer: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_schedule(self, sensor: CaExpirySensor) -> None:
+        """Add or move the deadline of a sensor.
+
+        :param sensor: the sensor to refresh at its next deadline
+        :type sensor: CaExpirySensor
+        """
+
+        self._sensors[sensor.unique_id] = sensor
+        # previous deadlines of the sensor are left in the heap, and skipped once popped
+        heapq.heappush(self._heap, (sensor.next_deadline, sensor.unique_id))
+        self._async_arm_timer()
+
+    @callback
+    def async_unschedule(self, sensor: CaExpirySensor) -> None:
+        """Stop refreshing a sensor.
+
+        :param sensor: the sensor
+        :type sensor: CaExpirySensor
+        """
+
+        self._sensors.pop(sensor.unique_id, None)
+
+    @callback
+    def async_stop(self) -> None:
+        """Cancel the timer and forget every deadline."""
+
+        if self._unsub_timer:
+            self._unsub_timer()
+        self._unsub_timer = None
+        self._timer_deadline = None
+        self._heap.clear()
+        self._sensors.clear()
+
+    @callback
+    def _async_arm_timer(self) -> None:
+        """Arm the timer at the earliest deadline, if not already."""
+
+        if not self._heap:
+            return
+        deadline = self._heap[0][0]
+        if self._timer_deadline is not None and self._timer_deadline <= deadline:
+            return
+        if self._unsub_timer:
+            self._unsub_timer()
+        self._timer_deadline = deadline
+        self._unsub_timer = async_track_point_in_time(self.hass, self._async_handle_deadline, deadline)
+
+    @callback
+    def _async_handle_deadline(self, now: datetime) -> None:
+        """Refresh the sensors whose deadline has passed, and arm the timer at the next deadline.
+
+        :param now: the time the timer fired
+        :type now: datetime
+        """
+
+        self._unsub_timer = None
+        self._timer_deadline = None
+        while self._heap and self._heap[0][0] <= now:
+            deadline, unique_id = heapq.heappop(self._heap)
+            sensor = self._sensors.get(unique_id)
+            if sensor is None or sensor.next_deadline != deadline:
+                continue
+            sensor.async_handle_deadline(now)
+            heapq.heappush(self._heap, (sensor.next_deadline, unique_id))
+        self._async_arm_timer()
+
+
+# the _attr_ attributes of the entity are the ones expected by Home Assistant
+class CaExpirySensor(SensorEntity):  # pylint: disable=too-many-instance-attributes
+    """Days to expiry of a CA loaded by Additional CA."""
+
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.DAYS
+    _attr_icon = "mdi:certificate"
+    _attr_should_poll = False
+
+    def __init__(self, scheduler: ExpiryScheduler, unique_id: str, ca_name: str, metadata: dict[str, str]) -> None:
+        self._scheduler = scheduler
+        self._attr_unique_id = unique_id
+        self._ca_name = ca_name
+        self._metadata = metadata
+        self._not_after = datetime.fromisoformat(metadata["not_after"])
+        self._attr_name = f"Additional CA {ca_name} expiry"
+        self.next_deadline = self._not_after
+        self._async_compute(dt_util.utcnow())
+
+    @property
+    def extra_state_attributes(self) -> dict[str, str]:
+        return {
+            "ca_name": self._ca_name,
+            "issuer_common_name": self._metadata["common_name"],
+            "fingerprint": self._metadata["fingerprint"],
+            "serial_number": self._metadata["serial_number"],
+            "not_after": self._metadata["not_after"],
+        }
+
+    async def async_added_to_hass(self) -> None:
+        self._async_notify_expiry(initial=True)
+        self._scheduler.async_schedule(self)
+
+    async def async_will_remove_from_hass(self) -> None:
+        self._scheduler.async_unschedule(self)
+
+    @callback
+    def async_update_metadata(self, ca_name: str, metadata: dict[str, str]) -> None:
+        """Update the CA name and metadata of the sensor after a reload, the certificate being the same.
+
+        :param ca_name: the name of the CA file
+        :type ca_name: str
+        :param metadata: the metadata of the CA, see parse_ca_metadata()
+        :type metadata: dict[str, str]
+        """
+
+        self._ca_name = ca_name
+        self._metadata = metadata
+        if self.hass is not None:
+            self.async_write_ha_state()
+
+    @callback
+    def async_handle_deadline(self, now: datetime) -> None:
+        """Refresh the days to expiry once the deadline has passed.
+
+        :param now: the current time
+        :type now: datetime
+        """
+
+        self._async_compute(now)
+        self._async_notify_expiry(initial=False)
+        self.async_write_ha_state()
+
+    @callback
+    def _async_compute(self, now: datetime) -> None:
+        """Compute the days to expiry, and the next deadline: the time the days to expiry decrease.
+
+        :param now: the current time
+        :type now: datetime
+        """
+
+        days = math.floor((self._not_after - now) / timedelta(days=1))
+        self._attr_native_value = days
+        next_deadline = self._not_after - timedelta(days=days)
+        if next_deadline <= now:
+            next_deadline += timedelta(days=1)
+        self.next_deadline = next_deadline
+
+    @callback
+    def _async_notify_expiry(self, initial: bool) -> None:
+        """Create a persistent notification when the CA reaches a warning threshold or expires,
+        or at startup if it is already within the largest threshold.
+
+        :param initial: True at startup
+        :type initial: bool
+        """
+
+        days = self._attr_native_value
+        if initial:
+            notify = days <= max(EXPIRY_WARNING_DAYS)
+        else:
+            notify = days in EXPIRY_WARNING_DAYS or days == -1
+        if not notify:
+            return
+
+        common_name = self._metadata["common_name"]
+        if days < 0:
+            msg = f"CA '{self._ca_name}' with Common Name '{common_name}' has expired."
+        else:
+            msg = f"CA '{self._ca_name}' with Common Name '{common_name}' expires in {days} day(s)."
+        log.warning(msg)
+        persistent_notification.async_create(
+            self.hass,
+            message=msg,
+            title="Additional CA (custom integration)",
+            notification_id=f"{self._metadata['fingerprint']}_{EXPIRY_NOTIF_ID}",
+        )
@@ -0,0 +1,101 @@
+"""Timing of the phases of an Additional CA run."""
+
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from .const import DOMAIN
+
+log = logging.getLogger(DOMAIN)
+
+
+# every attribute is exported by as_dict() for diagnostics
+class RunStats:  # pylint: disable=too-many-instance-attributes
+    """Durations of the phases of a run, in total and per CA, with the cache hits and misses and the deduplicated CA files.
+    Concurrent per-CA durations are summed into their phase, so phases may add up to more than the run.
+    """
+
+    def __init__(self, trigger: str = "setup") -> None:
+        self.trigger = trigger
+        self.started_at = datetime.now(timezone.utc)
+        self.phases: dict[str, float] = {}
+        self.cas: dict[str, dict[str, float]] = {}
+        self.cache: dict[str, dict[str, int]] = {}
+        self.deduplicated: dict[str, str] = {}
+        self.error: str | None = None
+        self._start = time.perf_counter()
+        self._duration: float | None = None
+
+    @contextmanager
+    def phase(self, name: str, ca_key: str | None = None) -> Iterator[None]:
+        """Time a phase of the run, or of the processing of a CA if ca_key is given.
+
+        :param name: the name of the phase, like 'parse'
+        :type name: str
+        :param ca_key: the name of the CA in the config
+        :type ca_key: str | None
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + duration
+            if ca_key is None:
+                log.debug(f"timing phase={name} duration_ms={duration * 1000:.1f}")
+            else:
+                ca_phases = self.cas.setdefault(ca_key, {})
+                ca_phases[name] = ca_phases.get(name, 0.0) + duration
+                log.debug(f"timing phase={name} ca={ca_key} duration_ms={duration * 1000:.1f}")
+
+    def cache_hit(self, name: str) -> None:
+        """Count a hit of a cache, like an unchanged CA file not copied again.
+
+        :param name: the name of the cache
+        :type name: str
+        """
+
+        self.cache.setdefault(name, {"hits": 0, "misses": 0})["hits"] += 1
+
+    def cache_miss(self, name: str) -> None:
+        """Count a miss of a cache.
+
+        :param name: the name of the cache
+        :type name: str
+        """
+
+        self.cache.setdefault(name, {"hits": 0, "misses": 0})["misses"] += 1
+
+    def finish(self, error: Exception | None = None) -> None:
+        """End the run, and log its duration.
+
+        :param error: the error interrupting the run, if any
+        :type error: Exception | None
+        """
+
+        self._duration = time.perf_counter() - self._start
+        self.error = str(error) if error else None
+        log.debug(f"timing run={self.trigger} duration_ms={self._duration * 1000:.1f} cache={self.cache}")
+
+    def as_dict(self) -> dict:
+        """Export the stats, durations in milliseconds.
+
+        :return: a dict like {'trigger': 'setup', 'duration_ms': 12.3, 'phases_ms': {'parse': 1.2, ...}, 'cas_ms': {...}, 'cache': {...},
+            'deduplicated': {...}}
+        :rtype: dict
+        """
+
+        duration = self._duration if self._duration is not None else time.perf_counter() - self._start
+        return {
+            "trigger": self.trigger,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(duration * 1000, 3),
+            "error": self.error,
+            "phases_ms": {name: round(value * 1000, 3) for name, value in self.phases.items()},
+            "cas_ms": {ca_key: {name: round(value * 1000, 3) for name, value in phases.items()} for ca_key, phases in self.cas.items()},
+            "cache": self.cache,
+            "deduplicated": self.deduplicated,
+        }
@@ -0,0 +1,152 @@
+"""Transactional updates of the system CA trust store for Additional CA."""
+
+import json
+import logging
+import os
+import shutil
+from collections.abc import Iterable
+from pathlib import Path
+
+from .backends import TrustStoreBackend
+from .bundle import write_file_atomically
+from .const import DOMAIN, TRANSACTION_DIRNAME
+
+log = logging.getLogger(DOMAIN)
+
+
+# the paths of the transaction are computed once, they are used by every step and by the rollback after a crash
+class TrustStoreTransaction:  # pylint: disable=too-many-instance-attributes
+    """Apply the changes of the folder of CA files of a backend and the rebuild of its CA bundle all or nothing.
+    CA files are staged into a hidden folder of the folder of CA files, so they are moved into place atomically,
+    and the replaced CA files and the bundle are snapshotted, so a failed rebuild is undone by renaming them back.
+    A journal is written before anything is swapped: a transaction interrupted by a crash is rolled back by the next one.
+    Methods do blocking I/O, to be run in an executor.
+    """
+
+    def __init__(self, backend: TrustStoreBackend) -> None:
+        self.backend = backend
+        self.ca_path = Path(backend.ca_path)
+        self.bundle_path = Path(backend.bundle_path)
+        self.path = self.ca_path / TRANSACTION_DIRNAME
+        self.staging_path = self.path / "staged"
+        self.snapshot_path = self.path / "snapshot"
+        self.held_path = self.path / "held"
+        self.journal_path = self.path / "journal.json"
+        # next to the bundle, to be renamed back atomically
+        self.bundle_snapshot_path = self.bundle_path.with_name(f".{self.bundle_path.name}.{DOMAIN}-snapshot")
+
+    def begin(self) -> None:
+        """Start the transaction, after rolling back a transaction interrupted by a crash."""
+
+        if self.path.exists() or self.bundle_snapshot_path.exists():
+            if self.journal_path.exists():
+                log.warning("Rolling back an interrupted update of the system CA trust store.")
+            self.rollback()
+        self.staging_path.mkdir(parents=True)
+        self.snapshot_path.mkdir()
+
+    def snapshot(self, ca_ids: Iterable[str]) -> None:
+        """Snapshot the CA files about to be replaced or removed, and the system CA bundle.
+
+        :param ca_ids: the names of the CA files about to change
+        :type ca_ids: Iterable[str]
+        """
+
+        targets = {ca_id: Path(self.ca_path, ca_id).exists() for ca_id in sorted(ca_ids)}
+        write_file_atomically(self.journal_path, json.dumps({"targets": targets}).encode())
+
+        for ca_id, existed in targets.items():
+            if existed:
+                snapshot_file(Path(self.ca_path, ca_id), self.snapshot_path / f"{ca_id}.snapshot")
+        if self.bundle_path.exists():
+            # copied, update-ca-certificates may rewrite the bundle in place
+            write_file_atomically(self.bundle_snapshot_path, self.bundle_path.read_bytes())
+
+    def swap(self) -> list[str]:
+        """Install the staged CA files with the backend, replacing the previous versions atomically.
+
+        :return: the names of the moved CA files
+        :rtype: list[str]
+        """
+
+        swapped = []
+        for staged_file in sorted(self.staging_path.iterdir()):
+            self.backend.install(staged_file.name, staged_file)
+            swapped.append(staged_file.name)
+        return swapped
+
+    def hold(self, ca_ids: Iterable[str]) -> None:
+        """Keep the new versions of swapped CA files aside, to install some of them again while looking for the invalid ones.
+
+        :param ca_ids: the names of the swapped CA files
+        :type ca_ids: Iterable[str]
+        """
+
+        self.held_path.mkdir(exist_ok=True)
+        for ca_id in ca_ids:
+            # not named '*.crt', update-ca-certificates does not pick them up
+            snapshot_file(Path(self.ca_path, ca_id), self.held_path / f"{ca_id}.held")
+
+    def select(self, ca_ids: Iterable[str]) -> None:
+        """Install the new version of some held CA files, and the previous version of the other held CA files, see hold().
+        The held CA files and the snapshots are kept, for the next selection or the rollback.
+
+        :param ca_ids: the names of the held CA files to install the new version of
+        :type ca_ids: Iterable[str]
+        """
+
+        ca_ids = set(ca_ids)
+        for held_file in sorted(self.held_path.iterdir()):
+            ca_id = held_file.name.removesuffix(".held")
+            version = held_file if ca_id in ca_ids else self.snapshot_path / f"{ca_id}.snapshot"
+            if not version.exists():
+                Path(self.ca_path, ca_id).unlink(missing_ok=True)
+                continue
+            snapshot_file(version, self.staging_path / ca_id)
+            self.backend.install(ca_id, self.staging_path / ca_id)
+
+    def rollback(self) -> None:
+        """Restore the CA files and the CA bundle as they were before the swap, and end the transaction."""
+
+        if self.journal_path.exists():
+            journal = json.loads(self.journal_path.read_bytes())
+            for ca_id, existed in journal["targets"].items():
+                snapshot = self.snapshot_path / f"{ca_id}.snapshot"
+                if snapshot.exists():
+                    os.replace(snapshot, Path(self.ca_path, ca_id))
+                elif not existed:
+                    Path(self.ca_path, ca_id).unlink(missing_ok=True)
+            if self.bundle_snapshot_path.exists():
+                os.replace(self.bundle_snapshot_path, self.bundle_path)
+            log.info("System CA trust store rolled back.")
+        self._cleanup()
+
+    def commit(self) -> None:
+        """End the transaction, keeping the changes."""
+
+        self._cleanup()
+
+    def _cleanup(self) -> None:
+        """Remove the staged CA files, the snapshots and the journal."""
+
+        # the journal first: without journal, an interrupted cleanup rolls nothing back
+        self.journal_path.unlink(missing_ok=True)
+        self.bundle_snapshot_path.unlink(missing_ok=True)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def snapshot_file(path: Path, snapshot_path: Path) -> None:
+    """Keep the current content of a file: hard link it, or copy it if hard links are not supported.
+    CA files are only ever replaced by a rename, never rewritten in place, so the hard link keeps the previous content.
+
+    :param path: the path of the file
+    :type path: Path
+    :param snapshot_path: the path of the snapshot
+    :type snapshot_path: Path
+    """
+
+    snapshot_path.unlink(missing_ok=True)
+    try:
+        os.link(path, snapshot_path)
+    except OSError:
+        write_file_atomically(snapshot_path, path.read_bytes())
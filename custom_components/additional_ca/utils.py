@@ -1,73 +1,260 @@
 """Python functions for Additional CA."""
 
+import asyncio
+import hashlib
 import logging
+import os
 import shutil
+import signal
 import ssl
 import subprocess
+import weakref
+from collections.abc import Iterable
+from functools import cache, partial
 from pathlib import Path
+from stat import S_ISREG
+from typing import TYPE_CHECKING
 
-import aiofiles
+import certifi
 from cryptography import x509
-from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import dsa, ec, ed448, ed25519, rsa
+from cryptography.hazmat.primitives.asymmetric.types import CertificatePublicKeyTypes
 from homeassistant.components import persistent_notification
 from homeassistant.core import HomeAssistant
-from homeassistant.util.ssl import client_context
+from homeassistant.helpers.storage import STORAGE_DIR
+from homeassistant.helpers.typing import ConfigType
+from homeassistant.util import ssl as ssl_util
+from homeassistant.util.ssl import SSLCipherList, client_context, get_default_context
 
+from .bundle import iter_pem_certificates
+from .capath import get_capath_fingerprints
 from .const import (
     CA_SYSPATH,
+    CONF_CAS,
+    CONFIG_OPTIONS,
+    DEDUP_SYSTEM,
     DOMAIN,
+    FORCE_ADDITIONAL_CA,
+    MINIMAL_TRUST,
+    MINIMAL_TRUST_ALLOW,
+    MINIMAL_TRUST_BUNDLE_FILENAME,
     NEEDS_RESTART_NOTIF_ID,
     UPDATE_CA_SYSCMD,
     UPDATE_CA_SYSCMD_OPTIONS,
+    UPDATE_CA_TIMEOUT_DEFAULT,
+    YAML_CONFIG_KEY,
 )
-from .exceptions import SerialNumberException
+from .discovery import get_file_identity
+from .exceptions import SerialNumberException, TrustStoreException
+from .manifest import file_sha256
+from .remote import get_ca_display_name, get_ca_filename, get_ca_src_path
+from .stats import RunStats
+
+if TYPE_CHECKING:
+    from .backends import TrustStoreBackend
 
 log = logging.getLogger(DOMAIN)
 
 
-def remove_additional_ca(ca_filename: str) -> None:
-    """Remove the specified cert file from system CA path.
+def split_config(config: dict) -> tuple[dict, dict[str, str]]:
+    """Split the additional_ca config into options and CA files, without modifying the config.
 
-    :param ca_filename: the file name of the certificate like 'ca.crt'
-    :type ca_filename: str
+    :param config: additional_ca config
+    :type config: dict
+    :return: the options like {'hot_reload': True}, and the CA files like {'ca name': 'ca.crt'}
+    :rtype: tuple[dict, dict[str, str]]
     """
 
-    ca_file = Path(CA_SYSPATH, ca_filename)
-    try:
-        ca_file.unlink()
-    except Exception as err:
-        log.error(f"Unable to remove CA file '{ca_file}': {str(err)}")
-        raise
+    ca_files = dict(config)
+    # Ignore deprecated option 'force_additional_ca' (boolean) from config
+    ca_files.pop(FORCE_ADDITIONAL_CA, None)
+    options = {option: ca_files.pop(option) for option in CONFIG_OPTIONS if option in ca_files}
+    return options, ca_files
+
+
+def get_trust_policy(options: dict, backend: "TrustStoreBackend") -> dict | None:
+    """Get the policy to reduce the CA bundle of HA with, from options 'minimal_trust' and 'minimal_trust_allow'.
+
+    :param options: the options of the config, see split_config()
+    :type options: dict
+    :param backend: the backend of the system CA trust store
+    :type backend: TrustStoreBackend
+    :return: a dict like {'allow': ['ISRG Root X1', ...]}, or None if the CA bundle is not reduced
+    :rtype: dict | None
+    """
+
+    # with a CApath or without a bundle file, there is no CA bundle loaded by HA to reduce
+    if not options.get(MINIMAL_TRUST, False) or backend.capath is not None or backend.bundle_path is None:
+        return None
+    return {"allow": sorted(options.get(MINIMAL_TRUST_ALLOW, []))}
+
+
+def get_minimal_trust_bundle_path(hass: HomeAssistant) -> Path:
+    """Get the CA bundle of option 'minimal_trust', a reduced copy of the system CA bundle.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :return: the path like /config/.storage/additional_ca.minimal_trust.crt
+    :rtype: Path
+    """
+
+    return Path(hass.config.path(STORAGE_DIR, MINIMAL_TRUST_BUNDLE_FILENAME))
+
 
+def get_hass_ca_bundle(hass: HomeAssistant, options: dict, backend: "TrustStoreBackend") -> Path | None:
+    """Get the CA bundle the client SSL Contexts of HA load: the CA bundle of option 'minimal_trust' if enabled, the system CA bundle otherwise.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param options: the options of the config, see split_config()
+    :type options: dict
+    :param backend: the backend of the system CA trust store
+    :type backend: TrustStoreBackend
+    :return: the path of the CA bundle
+    :rtype: Path | None
+    """
+
+    if get_trust_policy(options, backend) is not None:
+        return get_minimal_trust_bundle_path(hass)
+    return backend.bundle_path
 
-async def remove_unused_certs(hass: HomeAssistant, config: dict) -> None:
-    """Remove unused certificates from CA_SYSPATH
+
+def get_ca_config(hass: HomeAssistant) -> ConfigType:
+    """Get the config to apply: the YAML config, with its CA files replaced by the CA files managed in the UI, if any.
 
     :param hass: hass object from HomeAssistant core
     :type hass: HomeAssistant
+    :return: the config like {'additional_ca': {'hot_reload': True, 'ca name': 'ca.crt'}}
+    :rtype: ConfigType
+    """
+
+    yaml_config = hass.data.get(YAML_CONFIG_KEY) or {}
+    entries = hass.config_entries.async_entries(DOMAIN)
+    ui_cas = entries[0].options.get(CONF_CAS) if entries else None
+    if ui_cas is None:
+        return {DOMAIN: yaml_config}
+    options, _ = split_config(yaml_config)
+    return {DOMAIN: {**options, **ui_cas}}
+
+
+def remove_ca_files(ca_filenames: Iterable[str], ca_path: Path | None = None) -> list[str]:
+    """Remove CA files from CA_SYSPATH in one batch, to be run in an executor.
+
+    :param ca_filenames: the names of the certificate files
+    :type ca_filenames: Iterable[str]
+    :param ca_path: the folder of the certificate files, CA_SYSPATH by default
+    :type ca_path: Path | None
+    :raises PermissionError: if a file cannot be removed
+    :return: the names of the removed certificate files
+    :rtype: list[str]
+    """
+
+    removed_certs = []
+    for ca_filename in sorted(ca_filenames):
+        log.info(f"Removing unused certificate: {ca_filename}")
+        try:
+            Path(ca_path or CA_SYSPATH, ca_filename).unlink()
+            removed_certs.append(ca_filename)
+        except FileNotFoundError:
+            log.warning(f"Certificate file {ca_filename} was already removed.")
+        except PermissionError:
+            log.error(f"Permission denied when removing unused certificate file: {ca_filename}")
+            raise
+        except Exception as err:
+            log.error(f"Error removing unused certificate file {ca_filename}: {str(err)}")
+            raise
+
+    return removed_certs
+
+
+def get_ca_names(ca_value: str, ca_certs: list[dict[str, str]]) -> dict[str, dict[str, str]]:
+    """Name each certificate of a CA file, numbered if the file contains several certificates.
+
+    :param ca_value: the path or URL of the CA file in the config, like 'ca.crt'
+    :type ca_value: str
+    :param ca_certs: the metadata of the certificates of the file, see get_ca_metadata()
+    :type ca_certs: list[dict[str, str]]
+    :return: a dict like {'ca.crt #1': {...}, 'ca.crt #2': {...}}, or {'ca.crt': {...}} for a single certificate
+    :rtype: dict[str, dict[str, str]]
+    """
+
+    ca_name = get_ca_display_name(ca_value)
+    if len(ca_certs) == 1:
+        return {ca_name: ca_certs[0]}
+    return {f"{ca_name} #{position}": metadata for position, metadata in enumerate(ca_certs, start=1)}
+
+
+def get_desired_certs(config: dict) -> set[str]:
+    """Get the names of the files of CA_SYSPATH wanted by the config.
+
     :param config: additional_ca config
     :type config: dict
+    :return: the names of the certificate files like {'myca_ca.crt', ...}
+    :rtype: set[str]
     """
 
-    conf_ca_list = [f"{k}_{Path(v).name}" for k, v in config.items()]
-    system_ca_list = [f for f in await hass.async_add_executor_job(Path(CA_SYSPATH).iterdir) if f.is_file()]
+    return {f"{k}_{get_ca_filename(v)}" for k, v in config.items()}
 
-    for cert in system_ca_list:
-        if cert.name not in conf_ca_list:
-            log.info(f"Removing unused certificate: {cert.name}")
-            try:
-                cert.unlink()
-            except FileNotFoundError:
-                log.warning(f"Certificate file {cert.name} was already removed.")
-            except PermissionError:
-                log.error(f"Permission denied when removing unused certificate file: {cert.name}")
-                raise
-            except Exception as err:
-                log.error(f"Error removing unused certificate file {cert.name}: {str(err)}")
-                raise
-
-
-async def copy_ca_to_system(hass: HomeAssistant, ca_name: str, ca_src_path: Path) -> str:
+
+async def remove_unused_certs(hass: HomeAssistant, config: dict, owned_certs: set[str], backend: "TrustStoreBackend | None" = None) -> list[str]:
+    """Remove the certificates of CA_SYSPATH installed by Additional CA and no longer in the config.
+    Files placed in CA_SYSPATH by other tools are left untouched.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param config: additional_ca config
+    :type config: dict
+    :param owned_certs: the names of the files of CA_SYSPATH installed by Additional CA, see async_load_manifest()
+    :type owned_certs: set[str]
+    :param backend: the backend of the system CA trust store to remove the files from, CA_SYSPATH by default
+    :type backend: TrustStoreBackend | None
+    :return: the names of the removed certificate files
+    :rtype: list[str]
+    """
+
+    stale_certs = owned_certs - get_desired_certs(config)
+    if not stale_certs:
+        return []
+    if backend is not None:
+        return await hass.async_add_executor_job(backend.remove, stale_certs)
+    return await hass.async_add_executor_job(remove_ca_files, stale_certs)
+
+
+def get_ca_changes(config: dict, config_path: Path, remote_cache_path: Path, ca_path: Path | None = None) -> dict[str, list[str]]:
+    """Compare the CA files of the config with the CA files installed in CA_SYSPATH, without changing anything, to be run in an executor.
+    CA given by URL are compared as last fetched, they are not fetched again.
+
+    :param config: additional_ca config, the CA files only
+    :type config: dict
+    :param config_path: the path of the config folder 'additional_ca'
+    :type config_path: Path
+    :param remote_cache_path: the folder of the CA files fetched from a URL, see get_remote_cache_path()
+    :type remote_cache_path: Path
+    :param ca_path: the folder of the installed CA files, CA_SYSPATH by default
+    :type ca_path: Path | None
+    :return: a dict like {'add': ['myca_ca.crt'], 'update': [...], 'unchanged': [...], 'missing': ['missing.crt']}
+    :rtype: dict[str, list[str]]
+    """
+
+    changes = {"add": [], "update": [], "unchanged": [], "missing": []}
+    for ca_key, ca_value in config.items():
+        ca_src_path = get_ca_src_path(config_path, remote_cache_path, ca_value)
+        if not ca_src_path.is_file():
+            changes["missing"].append(ca_value)
+            continue
+        ca_id = f"{ca_key}_{ca_src_path.name}"
+        installed_sha256 = file_sha256(Path(ca_path or CA_SYSPATH, ca_id))
+        if installed_sha256 is None:
+            changes["add"].append(ca_id)
+        elif installed_sha256 != file_sha256(ca_src_path):
+            changes["update"].append(ca_id)
+        else:
+            changes["unchanged"].append(ca_id)
+    return changes
+
+
+async def copy_ca_to_system(hass: HomeAssistant, ca_name: str, ca_src_path: Path, dest_path: Path | None = None) -> str:
     """Copy cert file into system CA path with a unique name to avoid
     overriding existing CA with the same name.
 
@@ -77,59 +264,290 @@ async def copy_ca_to_system(hass: HomeAssistant, ca_name: str, ca_src_path: Path
     :type ca_name: str
     :param ca_src_path: the path of the certificate file
     :type ca_src_path: Path
+    :param dest_path: the folder to copy the certificate file into, CA_SYSPATH by default
+    :type dest_path: Path | None
     :return: a unique name for the copied certificate file like myca_ca.crt
     :rtype: str
     """
 
     unique_ca_name = f"{ca_name}_{ca_src_path.name}"
     try:
-        await hass.async_add_executor_job(shutil.copy, ca_src_path, Path(CA_SYSPATH, unique_ca_name))
+        await hass.async_add_executor_job(shutil.copy, ca_src_path, Path(dest_path or CA_SYSPATH, unique_ca_name))
     except Exception as err:
         log.error(f"Unable to copy CA file '{ca_src_path.name}' to system CA: {str(err)}")
         raise
     return unique_ca_name
 
 
-def update_system_ca() -> None:
-    """Update the system CA trust store by running the command update-ca-certificates.
+# the optional arguments are keyword-only
+async def scan_ca_file(  # pylint: disable=too-many-arguments
+    hass: HomeAssistant,
+    semaphore: asyncio.Semaphore,
+    ca_key: str,
+    ca_src_path: Path,
+    *,
+    stats: RunStats | None = None,
+    scan_cache: dict[str, dict] | None = None,
+) -> dict | None:
+    """Check and parse a CA file, unless it is unchanged since the last run.
+    Several CA files are processed concurrently, up to the limit of the semaphore.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param semaphore: the semaphore bounding the number of CA files processed at the same time
+    :type semaphore: asyncio.Semaphore
+    :param ca_key: the name of the CA in the config
+    :type ca_key: str
+    :param ca_src_path: the path of the certificate file
+    :type ca_src_path: Path
+    :param stats: the stats of the run, to time the stages of the CA
+    :type stats: RunStats | None
+    :param scan_cache: the CA files parsed by the last run, the file is not parsed again if its inode, mtime and size are unchanged
+    :type scan_cache: dict[str, dict] | None
+    :raises Exception: if unable to get metadata from the certificate file
+    :return: a dict like {'certs': [{...}, ...], 'sha256': '...', 'stat': [inode, mtime_ns, size]}, or None if the file is skipped
+    :rtype: dict | None
+    """
 
+    stats = stats or RunStats()
+    async with semaphore:
+        with stats.phase("stat", ca_key):
+            try:
+                ca_stat = await hass.async_add_executor_job(ca_src_path.stat)
+            except (FileNotFoundError, NotADirectoryError):
+                ca_stat = None
+        if ca_stat is None:
+            log.warning(f"{ca_key}: {ca_src_path} not found.")
+            return None
+        if not S_ISREG(ca_stat.st_mode):
+            log.warning(f"'{ca_src_path}' is not a file.")
+            return None
+
+        # skip the parsing if the file is unchanged since the last run
+        ca_identity = get_file_identity(ca_stat)
+        cached = (scan_cache or {}).get(str(ca_src_path))
+        if cached and cached["stat"] == ca_identity:
+            stats.cache_hit("scan")
+            return {"certs": cached["certs"], "sha256": cached["sha256"], "stat": ca_identity}
+
+        stats.cache_miss("scan")
+        try:
+            with stats.phase("parse", ca_key):
+                ca_certs = await get_ca_metadata(hass, ca_src_path)
+        except SerialNumberException:
+            # let's process the next custom CA if CA does not contain a serial number
+            return None
+        with stats.phase("hash", ca_key):
+            ca_sha256 = await hass.async_add_executor_job(file_sha256, ca_src_path)
+
+    return {"certs": ca_certs, "sha256": ca_sha256, "stat": ca_identity}
+
+
+# the optional arguments are keyword-only
+async def copy_changed_ca_file(  # pylint: disable=too-many-arguments
+    hass: HomeAssistant,
+    semaphore: asyncio.Semaphore,
+    ca_key: str,
+    ca_src_path: Path,
+    scanned: dict,
+    *,
+    stats: RunStats | None = None,
+    staging_path: Path | None = None,
+    ca_path: Path | None = None,
+) -> dict:
+    """Copy a scanned CA file into system CA path, if not already installed unchanged by a previous run.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param semaphore: the semaphore bounding the number of CA files processed at the same time
+    :type semaphore: asyncio.Semaphore
+    :param ca_key: the name of the CA in the config
+    :type ca_key: str
+    :param ca_src_path: the path of the certificate file
+    :type ca_src_path: Path
+    :param scanned: the scanned CA file, see scan_ca_file()
+    :type scanned: dict
+    :param stats: the stats of the run, to time the stages of the CA
+    :type stats: RunStats | None
+    :param staging_path: the folder to copy the changed CA file into, to be moved into CA_SYSPATH later, CA_SYSPATH by default
+    :type staging_path: Path | None
+    :param ca_path: the folder of the CA files installed by a previous run, CA_SYSPATH by default
+    :type ca_path: Path | None
+    :raises Exception: if unable to copy the certificate file
+    :return: the scanned CA file with its installed name and whether it was copied,
+        like {'ca_id': 'myca_ca.crt', 'certs': [{...}, ...], 'sha256': '...', 'staged': True, 'stat': [inode, mtime_ns, size]}
+    :rtype: dict
+    """
+
+    stats = stats or RunStats()
+    async with semaphore:
+        # skip the copy if the CA installed by a previous run is unchanged
+        ca_id = f"{ca_key}_{ca_src_path.name}"
+        with stats.phase("hash", ca_key):
+            staged = await hass.async_add_executor_job(file_sha256, Path(ca_path or CA_SYSPATH, ca_id)) != scanned["sha256"]
+        if staged:
+            stats.cache_miss("ca_copy")
+            # stage the copy, the system CA trust store is rebuilt once for all CAs
+            with stats.phase("copy", ca_key):
+                ca_id = await copy_ca_to_system(hass, ca_key, ca_src_path, staging_path)
+        else:
+            stats.cache_hit("ca_copy")
+
+    return {**scanned, "ca_id": ca_id, "staged": staged}
+
+
+def find_duplicate_cas(ca_fingerprints: dict[str, list[str]], system_fingerprints: set[str]) -> dict[str, str]:
+    """Find the CA files of the config whose certificates are all already trusted, by the system CA trust store
+    or by a CA file earlier in the config, so they are not installed at all.
+
+    :param ca_fingerprints: the SHA-256 fingerprints of the certificates of each CA file like {'ca name': ['...', ...]}, in config order
+    :type ca_fingerprints: dict[str, list[str]]
+    :param system_fingerprints: the SHA-256 fingerprints of the CA shipped by the system, see TrustStoreBackend.get_system_fingerprints()
+    :type system_fingerprints: set[str]
+    :return: a dict like {'ca name': 'first ca name'}, or {'ca name': DEDUP_SYSTEM} for a CA shipped by the system
+    :rtype: dict[str, str]
+    """
+
+    duplicates = {}
+    providers = {}
+    for ca_key, fingerprints in ca_fingerprints.items():
+        if not fingerprints:
+            continue
+        if all(fingerprint in system_fingerprints for fingerprint in fingerprints):
+            duplicates[ca_key] = DEDUP_SYSTEM
+        elif all(fingerprint in system_fingerprints or fingerprint in providers for fingerprint in fingerprints):
+            duplicates[ca_key] = next(providers[fingerprint] for fingerprint in fingerprints if fingerprint in providers)
+        else:
+            for fingerprint in fingerprints:
+                providers.setdefault(fingerprint, ca_key)
+    return duplicates
+
+
+def get_ca_fingerprints(ca_src_paths: dict[str, Path], scan_cache: dict[str, dict]) -> dict[str, list[str]]:
+    """Get the SHA-256 fingerprints of the certificates of each CA file, from the scan cache if the file is unchanged, to be run in an executor.
+    Missing and invalid CA files are left out.
+
+    :param ca_src_paths: the path of each CA file like {'ca name': Path('/config/additional_ca/ca.crt')}
+    :type ca_src_paths: dict[str, Path]
+    :param scan_cache: the CA files parsed by the last run, see async_load_scan_cache()
+    :type scan_cache: dict[str, dict]
+    :return: a dict like {'ca name': ['...', ...]}
+    :rtype: dict[str, list[str]]
+    """
+
+    ca_fingerprints = {}
+    for ca_key, ca_src_path in ca_src_paths.items():
+        try:
+            ca_identity = get_file_identity(ca_src_path.stat())
+        except OSError:
+            continue
+        cached = scan_cache.get(str(ca_src_path))
+        if cached and cached["stat"] == ca_identity:
+            ca_certs = cached["certs"]
+        else:
+            try:
+                ca_certs = load_ca_metadata(ca_src_path)
+            except (OSError, ValueError):
+                continue
+        ca_fingerprints[ca_key] = [metadata["fingerprint"] for metadata in ca_certs]
+    return ca_fingerprints
+
+
+async def update_system_ca(timeout: float = UPDATE_CA_TIMEOUT_DEFAULT) -> None:
+    """Update the system CA trust store by running the command update-ca-certificates,
+    without blocking the event loop. The command is killed on timeout or cancellation.
+
+    :param timeout: the maximum duration of the command, in seconds
+    :type timeout: float
+    :raises TimeoutError: if command update-ca-certificates does not complete in time
+    :raises subprocess.CalledProcessError: if command update-ca-certificates exits with an error code
     :raises Exception: if command update-ca-certificates returns an error
     """
 
-    cmd = [UPDATE_CA_SYSCMD, UPDATE_CA_SYSCMD_OPTIONS]
+    await run_trust_store_command([UPDATE_CA_SYSCMD, UPDATE_CA_SYSCMD_OPTIONS], timeout)
+
+
+async def run_trust_store_command(cmd: list[str], timeout: float = UPDATE_CA_TIMEOUT_DEFAULT) -> None:
+    """Run a command rebuilding the system CA trust store, like update-ca-certificates,
+    without blocking the event loop. The command is killed on timeout or cancellation.
+
+    :param cmd: the command and its arguments
+    :type cmd: list[str]
+    :param timeout: the maximum duration of the command, in seconds
+    :type timeout: float
+    :raises TimeoutError: if the command does not complete in time
+    :raises subprocess.CalledProcessError: if the command exits with an error code
+    :raises Exception: if the command returns an error
+    """
+
     try:
-        # status = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=True)
-        status = subprocess.run(cmd, capture_output=True, check=True)
-    except subprocess.CalledProcessError as err:
-        log.error(f"'{UPDATE_CA_SYSCMD}' process returned an error -> {str(err)}")
-        raise
+        # run in its own process group, to kill the command along with its child processes
+        process = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE, start_new_session=True)
     except Exception as err:
-        log.error(f"Unable to update system CA: {str(err)}")
+        log.error(f"Unable to update system CA with '{cmd[0]}': {str(err)}")
+        raise
+
+    stderr_lines = []
+
+    async def read_stderr() -> None:
+        async for line in process.stderr:
+            stderr_lines.append(line.decode().rstrip())
+            log.debug(f"'{cmd[0]}': {stderr_lines[-1]}")
+
+    try:
+        async with asyncio.timeout(timeout):
+            await asyncio.gather(read_stderr(), process.wait())
+    except (TimeoutError, asyncio.CancelledError) as err:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        await process.wait()
+        if isinstance(err, TimeoutError):
+            log.error(f"'{cmd[0]}' process did not complete within {timeout} seconds and was killed.")
         raise
 
-    if status.stderr and "Skipping duplicate certificate" not in status.stderr.decode():
-        raise Exception(f"'{UPDATE_CA_SYSCMD}' status returned an error -> {status.stderr.decode().rstrip()}")
+    stderr = "\n".join(stderr_lines)
+    if process.returncode != 0:
+        err = subprocess.CalledProcessError(process.returncode, cmd, stderr=stderr)
+        log.error(f"'{cmd[0]}' process returned an error -> {str(err)}")
+        raise err
+
+    if stderr and "Skipping duplicate certificate" not in stderr:
+        raise TrustStoreException(f"'{cmd[0]}' status returned an error -> {stderr.rstrip()}")
 
 
-async def check_hass_ssl_context(hass: HomeAssistant, ca_files: dict[str, str]) -> None:
+async def check_hass_ssl_context(hass: HomeAssistant, ca_files: dict[str, dict[str, str]], capath: Path | None = None) -> list[str]:
     """Check if the SSL Context of Home Assistant contains specified CA files.
     If true, logs the cert filename with its identifier (the serial number),
     if false, logs an error message and create a persistent notification in Home Assistant.
-    Returns nothing.
 
     :param hass: hass object from HomeAssistant core
     :type hass: HomeAssistant
-    :param ca_files: the CA files like {'cert name': 'cert serial number', ...}
-    :type ca_files: dict[str, str]
+    :param ca_files: the CA files like {'cert name': {'serial_number': '...', 'fingerprint': '...', ...}, ...}, see parse_ca_metadata()
+    :type ca_files: dict[str, dict[str, str]]
+    :param capath: the hashed CApath folder registered in the SSL Context, CA found through its links count as loaded
+    :type capath: Path | None
+    :return: the names of the CA files missing in the SSL Context
+    :rtype: list[str]
     """
 
     log.info("Finally verifying SSL Context")
 
+    ctx = client_context()
+    ssl_context_index = get_ssl_context_index(ctx)
+    # CA of a CApath folder are only loaded into the SSL Context when a handshake needs them
+    capath_fingerprints = set()
+    if capath is not None and str(capath) in _ssl_context_capaths.get(ctx, ()):
+        capath_fingerprints = await hass.async_add_executor_job(get_capath_fingerprints, capath)
+    missing_cas = []
+
     for ca_filename, identifers in ca_files.items():
         log.info(f"Checking SSL Context for Additional CA: {ca_filename}")
         serial_number = identifers["serial_number"]
         common_name = identifers["common_name"]
-        contains_custom_ca = await check_ssl_context_by_serial_number(ca_filename, serial_number)
+        validate_serial_number(ca_filename, serial_number)
+        contains_custom_ca = identifers.get("fingerprint") in capath_fingerprints or ssl_context_index_contains(ssl_context_index, identifers)
 
         # create persistent notification if needed
         notif_id = f"{serial_number}_{NEEDS_RESTART_NOTIF_ID}"
@@ -139,90 +557,350 @@ async def check_hass_ssl_context(hass: HomeAssistant, ca_files: dict[str, str])
         else:
             msg = f"CA '{ca_filename}' with Common Name '{common_name}' is missing in SSL Context. Home Assistant needs to be restarted."
             log.error(msg)
-            persistent_notification.async_create(
-                hass,
-                message=msg,
-                title="Additional CA (custom integration)",
-                notification_id=notif_id
-            )
+            missing_cas.append(ca_filename)
+            persistent_notification.async_create(hass, message=msg, title="Additional CA (custom integration)", notification_id=notif_id)
 
+    return missing_cas
 
-async def check_ssl_context_by_serial_number(ca_filename: str, serial_number: str) -> bool:
-    """Check if SSL Context of Home Assistant contains the specified serial number.
 
-    :param ca_filename: the name of certificate file, used only for logging
-    :type ca_filename: str
-    :param serial_number: the serial number of certificate
-    :type serial_number: str
-    :return: True or False if SSL Context contains the specified serial number or not
+def get_hass_client_contexts() -> list[ssl.SSLContext]:
+    """List the client SSL Contexts cached by Home Assistant, one per cipher list (and ALPN protocols if supported), to be run in an executor.
+    These are the contexts shared by the aiohttp and httpx client sessions of Home Assistant.
+    HA versions not creating them upfront create them here, loading their CA bundle.
+
+    :return: the distinct client SSL Contexts
+    :rtype: list[ssl.SSLContext]
+    """
+
+    contexts = {id(ctx): ctx for ctx in [get_default_context()]}
+    for args in get_client_context_args():
+        ctx = client_context(*args)
+        contexts.setdefault(id(ctx), ctx)
+    return list(contexts.values())
+
+
+def get_client_context_args() -> list[tuple]:
+    """List the arguments of the client SSL Contexts of Home Assistant: each cipher list, with each ALPN protocols if supported.
+
+    :return: the arguments of client_context()
+    :rtype: list[tuple]
+    """
+
+    alpn_protocols = [value for name, value in vars(ssl_util).items() if name.startswith("SSL_ALPN_") and isinstance(value, tuple) and all(isinstance(protocol, str) for protocol in value)]
+    # the ALPN protocols argument only exists on the Home Assistant versions defining them
+    return [(ssl_cipher_list, protocols) for ssl_cipher_list in SSLCipherList for protocols in alpn_protocols] or [(ssl_cipher_list,) for ssl_cipher_list in SSLCipherList]
+
+
+async def refresh_hass_ssl_contexts(hass: HomeAssistant, ca_files: dict[str, dict[str, str]], cafile: Path | None = None, capath: Path | None = None) -> int:
+    """Load the system CA bundle into the cached client SSL Contexts of Home Assistant missing some of the CA files,
+    so new handshakes trust them without restarting Home Assistant. Open connections are left untouched.
+    A CA cannot be removed from an SSL Context, so removed CA stay trusted until Home Assistant is restarted.
+    With a CApath folder, the folder is registered once per SSL Context instead, OpenSSL looks up its CA on demand.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param ca_files: the CA files like {'cert name': {'serial_number': '...', 'fingerprint': '...', ...}, ...}, see parse_ca_metadata()
+    :type ca_files: dict[str, dict[str, str]]
+    :param cafile: the CA bundle to load, REQUESTS_CA_BUNDLE or the certifi bundle by default
+    :type cafile: Path | None
+    :param capath: the hashed CApath folder to register instead of a CA bundle, see rehash_capath()
+    :type capath: Path | None
+    :return: the number of refreshed SSL Contexts
+    :rtype: int
+    """
+
+    cafile = cafile or os.environ.get("REQUESTS_CA_BUNDLE", certifi.where())
+    location = capath or cafile
+    refreshed = 0
+    for ctx in await hass.async_add_executor_job(get_hass_client_contexts):
+        if capath is not None:
+            if str(capath) in _ssl_context_capaths.get(ctx, ()):
+                continue
+            load_verify_locations = partial(ctx.load_verify_locations, capath=capath)
+        else:
+            ssl_context_index = get_ssl_context_index(ctx)
+            if all(ssl_context_index_contains(ssl_context_index, metadata) for metadata in ca_files.values()):
+                continue
+            load_verify_locations = partial(ctx.load_verify_locations, cafile=cafile)
+        try:
+            await hass.async_add_executor_job(load_verify_locations)
+        except (OSError, ssl.SSLError) as err:
+            log.warning(f"Could not load '{location}' into SSL Context: {str(err)}")
+            continue
+        if capath is not None:
+            _ssl_context_capaths.setdefault(ctx, set()).add(str(capath))
+        refreshed += 1
+
+    if refreshed:
+        log.info(f"Loaded '{location}' into {refreshed} SSL Context(s) of Home Assistant.")
+    return refreshed
+
+
+def create_minimal_trust_context(bundle_path: Path, ssl_cipher_list: SSLCipherList = SSLCipherList.PYTHON_DEFAULT, alpn_protocols: tuple[str, ...] | None = None) -> ssl.SSLContext:
+    """Create a client SSL Context like Home Assistant does, with the CA bundle of option 'minimal_trust', to be run in an executor.
+
+    :param bundle_path: the CA bundle of option 'minimal_trust'
+    :type bundle_path: Path
+    :param ssl_cipher_list: the cipher list of the SSL Context
+    :type ssl_cipher_list: SSLCipherList
+    :param alpn_protocols: the ALPN protocols of the SSL Context, on the Home Assistant versions defining them
+    :type alpn_protocols: tuple[str, ...] | None
+    :return: the SSL Context
+    :rtype: ssl.SSLContext
+    """
+
+    ctx = ssl.create_default_context(purpose=ssl.Purpose.SERVER_AUTH, cafile=bundle_path)
+    if ssl_cipher_list != SSLCipherList.PYTHON_DEFAULT:
+        ctx.set_ciphers(ssl_util.SSL_CIPHER_LISTS[ssl_cipher_list])
+    if alpn_protocols:
+        ctx.set_alpn_protocols(list(alpn_protocols))
+    return ctx
+
+
+def use_minimal_trust_bundle(bundle_path: Path | None) -> bool:
+    """Make the client SSL Contexts of HA load the CA bundle of option 'minimal_trust', to be run in an executor.
+    The SSL Contexts cached by HA are replaced by ones created like HA does with this CA bundle. The environment of the process is left untouched:
+    other libraries and programs, like the installs of requirements by pip, still use the system CA bundle.
+    Client sessions already created keep the SSL Context they were created with until Home Assistant is restarted.
+    This relies on private attributes of homeassistant.util.ssl, the SSL Contexts are left as they are on versions of HA without them.
+
+    :param bundle_path: the CA bundle of option 'minimal_trust', None to restore the SSL Contexts of HA
+    :type bundle_path: Path | None
+    :return: True if the client SSL Contexts were replaced or restored
     :rtype: bool
     """
 
-    validate_serial_number(ca_filename, serial_number)
+    # pylint: disable=protected-access
+    if not callable(getattr(ssl_util, "_client_context", None)) or not isinstance(getattr(ssl_util, "_DEFAULT_SSL_CONTEXT", None), ssl.SSLContext):
+        if bundle_path is not None:
+            log.warning(f"Option '{MINIMAL_TRUST}' is not supported by this version of Home Assistant, its client SSL Contexts are left as they are.")
+        return False
+
+    if bundle_path is None:
+        if "original" not in _minimal_trust:
+            return False
+        ssl_util._client_context, ssl_util._DEFAULT_SSL_CONTEXT = _minimal_trust.pop("original")
+        _minimal_trust.pop("bundle_path")
+        log.info("Client SSL Contexts of Home Assistant restored.")
+        return True
+    if _minimal_trust.get("bundle_path") == bundle_path:
+        return False
+
+    @cache
+    def minimal_trust_client_context(ssl_cipher_list: SSLCipherList = SSLCipherList.PYTHON_DEFAULT, alpn_protocols: tuple[str, ...] | None = None) -> ssl.SSLContext:
+        return create_minimal_trust_context(bundle_path, ssl_cipher_list, alpn_protocols)
+
+    _minimal_trust.setdefault("original", (ssl_util._client_context, ssl_util._DEFAULT_SSL_CONTEXT))
+    _minimal_trust["bundle_path"] = bundle_path
+    ssl_util._client_context = minimal_trust_client_context
+    # created by HA with the default arguments of client_context(), which differ across versions of HA
+    ssl_util._DEFAULT_SSL_CONTEXT = client_context()
+    # created here in the executor, rather than on the event loop when first used
+    get_hass_client_contexts()
+    log.info(f"Client SSL Contexts of Home Assistant created again with '{bundle_path}'.")
+    return True
+
+
+# the client SSL Contexts of HA replaced by use_minimal_trust_bundle() and its CA bundle, if it replaced them
+_minimal_trust: dict = {}
+
+# CApath folders registered in each SSL Context, an SSL Context does not tell its CApath folders
+_ssl_context_capaths: "weakref.WeakKeyDictionary[ssl.SSLContext, set[str]]" = weakref.WeakKeyDictionary()
+
+
+def build_ssl_context_index(ctx: ssl.SSLContext) -> dict:
+    """Index the CA loaded in an SSL Context by SHA-256 fingerprint, from a single DER export of the context.
+    The fallback index by serial number and issuer is only built if a lookup by fingerprint fails.
+
+    :param ctx: the SSL Context
+    :type ctx: ssl.SSLContext
+    :return: a dict like {'fingerprints': {'...', ...}, 'certs': [b'DER', ...], 'serial_numbers': None}
+    :rtype: dict
+    """
+
+    certs = ctx.get_ca_certs(binary_form=True)
+    return {
+        "fingerprints": {hashlib.sha256(cert).hexdigest() for cert in certs},
+        "certs": certs,
+        "serial_numbers": None,
+    }
 
-    certs = client_context().get_ca_certs()
-    for cert in certs:
-        if cert.get("serialNumber") == serial_number:
-            return True
-    return False
 
+# Index of each SSL Context, with the number of CA loaded in the context when it was built
+_ssl_context_indexes: "weakref.WeakKeyDictionary[ssl.SSLContext, tuple[int, dict]]" = weakref.WeakKeyDictionary()
 
-async def get_issuer_common_name(cert_path: Path) -> str:
-    """Get the issuer common name from a certificate.
 
-    :param cert_path: the path of the certificate file
-    :type cert_path: Path
-    :return: the issuer common name
+def get_ssl_context_index(ctx: ssl.SSLContext) -> dict:
+    """Get the index of an SSL Context, built again only if CA were loaded into the context since the last call.
+
+    :param ctx: the SSL Context
+    :type ctx: ssl.SSLContext
+    :return: the index, see build_ssl_context_index()
+    :rtype: dict
+    """
+
+    ca_count = ctx.cert_store_stats()["x509_ca"]
+    cached = _ssl_context_indexes.get(ctx)
+    if cached is not None and cached[0] == ca_count:
+        return cached[1]
+    ssl_context_index = build_ssl_context_index(ctx)
+    _ssl_context_indexes[ctx] = (ca_count, ssl_context_index)
+    return ssl_context_index
+
+
+def ssl_context_index_contains(ssl_context_index: dict, metadata: dict[str, str]) -> bool:
+    """Check if an indexed SSL Context contains a CA, by SHA-256 fingerprint,
+    or by serial number and issuer as fallback.
+
+    :param ssl_context_index: the index built by build_ssl_context_index()
+    :type ssl_context_index: dict
+    :param metadata: the metadata of the CA, see parse_ca_metadata()
+    :type metadata: dict[str, str]
+    :return: True or False if SSL Context contains the CA or not
+    :rtype: bool
+    """
+
+    if metadata.get("fingerprint") in ssl_context_index["fingerprints"]:
+        return True
+
+    if ssl_context_index["serial_numbers"] is None:
+        serial_numbers = set()
+        for cert_data in ssl_context_index["certs"]:
+            try:
+                cert = x509.load_der_x509_certificate(cert_data)
+            except ValueError:
+                continue
+            serial_numbers.add((format_serial_number(cert.serial_number), cert.issuer.rfc4514_string()))
+        ssl_context_index["serial_numbers"] = serial_numbers
+
+    return (metadata["serial_number"], metadata.get("issuer")) in ssl_context_index["serial_numbers"]
+
+
+def format_serial_number(serial_number: int) -> str:
+    """Format a serial number like the 'serialNumber' of ssl.SSLContext.get_ca_certs().
+
+    :param serial_number: the serial number of certificate
+    :type serial_number: int
+    :return: the serial number as uppercase hex string with an even length, like '0ABC'
     :rtype: str
     """
 
-    async with aiofiles.open(cert_path, "rb") as cf:
-        cert_data = await cf.read()
+    serial_hex = f"{serial_number:X}"
+    return serial_hex.zfill(len(serial_hex) + len(serial_hex) % 2)
 
-    common_name = None
-    try:
-        cert = x509.load_pem_x509_certificate(cert_data, default_backend())
-        issuer = cert.issuer
-    except Exception:
-        log.warning(f"Could not get Issuer Common Name from CA '{cert_path.name}'.")
-    else:
-        for attribute in issuer:
-            if attribute.oid == x509.NameOID.COMMON_NAME:
-                common_name = attribute.value
-                break
 
-    return common_name
+def get_key_type(public_key: CertificatePublicKeyTypes) -> str:
+    """Describe the public key of a certificate.
 
+    :param public_key: the public key of certificate
+    :type public_key: CertificatePublicKeyTypes
+    :return: the key type like 'RSA 4096' or 'EC secp384r1'
+    :rtype: str
+    """
 
-async def get_serial_number_from_cert(hass: HomeAssistant, cert_path: Path) -> str:
-    """Get and log the serial number of a certificate.
+    if isinstance(public_key, rsa.RSAPublicKey):
+        return f"RSA {public_key.key_size}"
+    if isinstance(public_key, ec.EllipticCurvePublicKey):
+        return f"EC {public_key.curve.name}"
+    if isinstance(public_key, dsa.DSAPublicKey):
+        return f"DSA {public_key.key_size}"
+    if isinstance(public_key, ed25519.Ed25519PublicKey):
+        return "Ed25519"
+    if isinstance(public_key, ed448.Ed448PublicKey):
+        return "Ed448"
+    return type(public_key).__name__
+
+
+def parse_ca_metadata(cert: x509.Certificate) -> dict[str, str]:
+    """Extract the metadata of a parsed certificate.
+
+    :param cert: the certificate
+    :type cert: x509.Certificate
+    :return: a dict like {'serial_number': '0ABC', 'subject': 'CN=My CA', 'issuer': 'CN=My CA', 'common_name': 'My CA', 'fingerprint': '...',
+        'not_before': '2025-01-01T00:00:00+00:00', 'not_after': '2035-01-01T00:00:00+00:00', 'key_type': 'RSA 4096'}
+    :rtype: dict[str, str]
+    """
+
+    common_name = None
+    for attribute in cert.issuer:
+        if attribute.oid == x509.NameOID.COMMON_NAME:
+            common_name = attribute.value
+            break
+
+    return {
+        "serial_number": format_serial_number(cert.serial_number),
+        "subject": cert.subject.rfc4514_string(),
+        "issuer": cert.issuer.rfc4514_string(),
+        "common_name": common_name,
+        "fingerprint": cert.fingerprint(hashes.SHA256()).hex(),
+        "not_before": cert.not_valid_before_utc.isoformat(),
+        "not_after": cert.not_valid_after_utc.isoformat(),
+        "key_type": get_key_type(cert.public_key()),
+    }
+
+
+def load_ca_metadata(cert_path: Path) -> list[dict[str, str]]:
+    """Read and parse every certificate of a PEM file once, to be run in an executor.
+    Certificates are streamed from the file, only their metadata are kept in memory.
+    Invalid and duplicate certificates of the file are skipped.
+
+    :param cert_path: the path of the certificate file
+    :type cert_path: Path
+    :raises ValueError: if the file does not contain any valid PEM certificate
+    :return: the metadata of each certificate, see parse_ca_metadata()
+    :rtype: list[dict[str, str]]
+    """
+
+    ca_certs = []
+    fingerprints = set()
+    for position, pem_block in enumerate(iter_pem_certificates(cert_path), start=1):
+        try:
+            metadata = parse_ca_metadata(x509.load_pem_x509_certificate(pem_block))
+        except ValueError:
+            log.warning(f"Certificate #{position} of '{cert_path.name}' appears to be an invalid TLS/SSL certificate.")
+            continue
+        if metadata["fingerprint"] in fingerprints:
+            log.info(f"Skipping duplicate certificate #{position} of '{cert_path.name}'.")
+            continue
+        fingerprints.add(metadata["fingerprint"])
+        ca_certs.append(metadata)
+
+    if not ca_certs:
+        raise ValueError(f"No valid certificate found in '{cert_path.name}'.")
+    return ca_certs
+
+
+async def get_ca_metadata(hass: HomeAssistant, cert_path: Path) -> list[dict[str, str]]:
+    """Get the metadata of every certificate of a file: serial number, subject, issuer common name,
+    SHA-256 fingerprint, validity dates and key type.
 
     :param hass: hass object from HomeAssistant core
     :type hass: HomeAssistant
     :param cert_path: the path of the certificate file
     :type cert_path: Path
-    :return: the serial number of the certificate
-    :rtype: str
+    :raises SerialNumberException: if the file has no valid certificate
+    :return: the metadata of each certificate, see parse_ca_metadata()
+    :rtype: list[dict[str, str]]
     """
 
-    serial_number = None
+    ca_certs = []
     try:
-        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-        await hass.async_add_executor_job(ctx.load_verify_locations, cert_path)
-        await hass.async_add_executor_job(ctx.load_default_certs)
-        ca_certs = ctx.get_ca_certs()
-        if ca_certs:
-            cert = ca_certs[0]
-            serial_number = cert.get("serialNumber")
-    except ssl.SSLError:
+        ca_certs = await hass.async_add_executor_job(load_ca_metadata, cert_path)
+    except ValueError:
         log.warning(f"The file '{cert_path.name}' appears to be an invalid TLS/SSL certificate.")
     except Exception:
-        log.error(f"Could not get Serial Number from '{cert_path.name}'.")
+        log.error(f"Could not get metadata from '{cert_path.name}'.")
         raise
 
-    validate_serial_number(cert_path.name, serial_number)
+    if not ca_certs:
+        validate_serial_number(cert_path.name, None)
+
+    for metadata in ca_certs:
+        validate_serial_number(cert_path.name, metadata["serial_number"])
+        if metadata["common_name"] is None:
+            log.warning(f"Could not get Issuer Common Name from CA '{cert_path.name}'.")
 
-    return serial_number
+    return ca_certs
 
 
 def validate_serial_number(ca_filename: str, serial_number: str):
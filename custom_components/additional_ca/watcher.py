@@ -0,0 +1,140 @@
+"""Watcher of the config folder for Additional CA hot reload."""
+
+from collections.abc import Callable, Coroutine
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import HOT_RELOAD_COOLDOWN, HOT_RELOAD_POLL_INTERVAL
+from .utils import log
+
+
+def scan_config_dir(config_path: Path) -> dict[str, tuple[int, int, int]]:
+    """Snapshot the files of the config folder, to be run in an executor.
+
+    :param config_path: the path of the config folder 'additional_ca'
+    :type config_path: Path
+    :return: a dict like {'relative/path.crt': (inode, mtime_ns, size), ...}
+    :rtype: dict[str, tuple[int, int, int]]
+    """
+
+    snapshot = {}
+    for path in config_path.rglob("*"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        if path.is_file():
+            snapshot[str(path.relative_to(config_path))] = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+async def async_start_watcher(hass: HomeAssistant, config_path: Path, on_change: Callable[[], Coroutine[Any, Any, None]]) -> CALLBACK_TYPE:
+    """Watch the config folder and call on_change once a burst of changes has settled.
+    Uses inotify through the optional 'watchdog' package, or polls the folder if it is not installed.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param config_path: the path of the config folder 'additional_ca'
+    :type config_path: Path
+    :param on_change: the coroutine function to call after changes
+    :type on_change: Callable[[], Coroutine[Any, Any, None]]
+    :return: a callback to stop watching
+    :rtype: CALLBACK_TYPE
+    """
+
+    debouncer = Debouncer(hass, log, cooldown=HOT_RELOAD_COOLDOWN, immediate=False, function=on_change)
+
+    try:
+        stop_watching = await async_start_inotify_watcher(hass, config_path, debouncer)
+    except ImportError:
+        log.info(f"Package 'watchdog' not available, polling '{config_path}' every {HOT_RELOAD_POLL_INTERVAL} seconds.")
+        stop_watching = await async_start_polling_watcher(hass, config_path, debouncer)
+
+    @callback
+    def async_stop_on_hass_stop(_event: Event) -> None:
+        stop_watching()
+        debouncer.async_cancel()
+
+    remove_stop_listener = hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, async_stop_on_hass_stop)
+
+    @callback
+    def async_stop() -> None:
+        remove_stop_listener()
+        stop_watching()
+        debouncer.async_cancel()
+
+    return async_stop
+
+
+async def async_start_inotify_watcher(hass: HomeAssistant, config_path: Path, debouncer: Debouncer) -> CALLBACK_TYPE:
+    """Watch the config folder with inotify.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param config_path: the path of the config folder 'additional_ca'
+    :type config_path: Path
+    :param debouncer: the debouncer to call on each change
+    :type debouncer: Debouncer
+    :raises ImportError: if package 'watchdog' is not installed
+    :return: a callback to stop watching
+    :rtype: CALLBACK_TYPE
+    """
+
+    # pylint: disable=import-outside-toplevel,import-error
+    from watchdog.events import FileSystemEvent, FileSystemEventHandler
+    from watchdog.observers import Observer
+
+    # the handler only overrides the callback of watchdog
+    class ConfigDirEventHandler(FileSystemEventHandler):  # pylint: disable=too-few-public-methods
+        """Forward the file system events to the debouncer, from the observer thread."""
+
+        def on_any_event(self, event: FileSystemEvent) -> None:
+            """Schedule a reload on each change, reads of the config folder are ignored."""
+            if event.event_type in ("opened", "closed_no_write"):
+                return
+            log.debug(f"Change detected in config folder: {event.event_type} {event.src_path}")
+            hass.loop.call_soon_threadsafe(debouncer.async_schedule_call)
+
+    observer = Observer()
+    observer.schedule(ConfigDirEventHandler(), str(config_path), recursive=True)
+    await hass.async_add_executor_job(observer.start)
+    log.info(f"Watching '{config_path}' for changes.")
+
+    @callback
+    def async_stop() -> None:
+        observer.stop()
+        hass.async_add_executor_job(observer.join)
+
+    return async_stop
+
+
+async def async_start_polling_watcher(hass: HomeAssistant, config_path: Path, debouncer: Debouncer) -> CALLBACK_TYPE:
+    """Watch the config folder by comparing snapshots of its files.
+
+    :param hass: hass object from HomeAssistant core
+    :type hass: HomeAssistant
+    :param config_path: the path of the config folder 'additional_ca'
+    :type config_path: Path
+    :param debouncer: the debouncer to call on each change
+    :type debouncer: Debouncer
+    :return: a callback to stop watching
+    :rtype: CALLBACK_TYPE
+    """
+
+    snapshot = await hass.async_add_executor_job(scan_config_dir, config_path)
+
+    async def async_poll(_now) -> None:
+        nonlocal snapshot
+        new_snapshot = await hass.async_add_executor_job(scan_config_dir, config_path)
+        if new_snapshot != snapshot:
+            log.debug(f"Change detected in config folder '{config_path}'.")
+            snapshot = new_snapshot
+            debouncer.async_schedule_call()
+
+    return async_track_time_interval(hass, async_poll, timedelta(seconds=HOT_RELOAD_POLL_INTERVAL))
@@ -0,0 +1,382 @@
+"""Benchmark of Additional CA setup and trust store operations at scale.
+
+Generates synthetic CA sets in a temporary config folder and CA_SYSPATH, replaces update-ca-certificates
+with a local stand-in concatenating the CA files, and measures for each operation:
+wall time, event loop block time, number of subprocesses and peak memory.
+
+Usage:
+    python test/benchmark/benchmark.py --sizes 1 10 100 1000 --output bench.json
+    python test/benchmark/benchmark.py --baseline bench.json --threshold 1.5
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import ssl
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import ExitStack
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.serialization import Encoding
+
+# Add the project root to Python path so imports work correctly
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+# pylint: disable=wrong-import-position
+from homeassistant.core import HomeAssistant
+
+import custom_components.additional_ca as additional_ca
+from custom_components.additional_ca import update_ca_certificates
+from custom_components.additional_ca.const import CONFIG_SUBDIR, DOMAIN
+from custom_components.additional_ca.utils import check_hass_ssl_context, get_ca_metadata, load_ca_metadata, remove_unused_certs
+
+DEFAULT_SIZES = [1, 10, 100, 1000]
+
+# Interval of the probe measuring how long the event loop is blocked, in seconds
+LOOP_PROBE_INTERVAL = 0.001
+
+UPDATE_CA_STANDIN = """#!/bin/sh
+# stand-in for update-ca-certificates: concatenate the local CA files into the bundle
+cat "$BENCH_CA_SYSPATH"/* > "$BENCH_CA_BUNDLE" 2>/dev/null
+exit 0
+"""
+
+
+def make_ca_pems(count: int) -> list[bytes]:
+    """Generate self-signed CA certificates in PEM format.
+
+    :param count: the number of certificates
+    :type count: int
+    :return: the certificates
+    :rtype: list[bytes]
+    """
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    pems = []
+    for i in range(count):
+        key = ec.generate_private_key(ec.SECP256R1())
+        name = x509.Name([x509.NameAttribute(x509.NameOID.COMMON_NAME, f"Benchmark CA {i}")])
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=365))
+            .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+            .sign(key, hashes.SHA256())
+        )
+        pems.append(cert.public_bytes(Encoding.PEM))
+    return pems
+
+
+class LoopBlockProbe:
+    """Measure how long the event loop is blocked, from the lateness of a periodic probe."""
+
+    def __init__(self) -> None:
+        self.max_block = 0.0
+        self.total_block = 0.0
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LOOP_PROBE_INTERVAL)
+            late = loop.time() - start - LOOP_PROBE_INTERVAL
+            if late > LOOP_PROBE_INTERVAL:
+                self.max_block = max(self.max_block, late)
+                self.total_block += late
+
+    async def __aenter__(self) -> "LoopBlockProbe":
+        self._task = asyncio.create_task(self._run())
+        await asyncio.sleep(0)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        # let the probe wake up once more, to account for a block just before the exit
+        await asyncio.sleep(LOOP_PROBE_INTERVAL)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+class BenchmarkEnv:
+    """A temporary config folder, CA_SYSPATH and system CA bundle, with the integration patched to use them."""
+
+    def __init__(self, root: Path, pems: list[bytes]) -> None:
+        self.root = root
+        self.config_dir = root / "config"
+        self.ca_syspath = root / "ca-certificates"
+        self.ca_bundle = root / "ca-certificates.crt"
+        self.standin = root / "update-ca-certificates"
+        self.subprocesses = 0
+        self.manifest = None
+        self.scan_cache = {}
+        self.pems = pems
+        self._stack = ExitStack()
+
+        (self.config_dir / CONFIG_SUBDIR).mkdir(parents=True)
+        self.ca_syspath.mkdir()
+        self.standin.write_text(UPDATE_CA_STANDIN)
+        self.standin.chmod(0o755)
+        for i, pem in enumerate(pems):
+            (self.config_dir / CONFIG_SUBDIR / f"ca{i}.crt").write_bytes(pem)
+
+    def config(self, size: int) -> dict:
+        """Return the integration config for the first CA files.
+
+        :param size: the number of CA files
+        :type size: int
+        :return: the config like {'additional_ca': {'ca0': 'ca0.crt', ...}}
+        :rtype: dict
+        """
+
+        return {DOMAIN: {f"ca{i}": f"ca{i}.crt" for i in range(size)}}
+
+    def hass(self) -> HomeAssistant:
+        """Return a hass mock running executor jobs in the default executor of the running loop."""
+
+        hass = MagicMock(spec=HomeAssistant)
+        hass.config = MagicMock()
+        hass.config.path = lambda *args: str(Path(self.config_dir, *args))
+        hass.data = {}
+        hass.async_add_executor_job = lambda func, *args: asyncio.get_running_loop().run_in_executor(None, func, *args)
+        return hass
+
+    def ssl_context(self) -> ssl.SSLContext:
+        """Return an SSL context loaded with the system CA bundle."""
+
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        if self.ca_bundle.exists() and self.ca_bundle.stat().st_size:
+            ctx.load_verify_locations(self.ca_bundle)
+        return ctx
+
+    def reset(self) -> None:
+        """Empty CA_SYSPATH, the system CA bundle and the manifest, like a first start."""
+
+        for cert in self.ca_syspath.iterdir():
+            cert.unlink()
+        self.ca_bundle.unlink(missing_ok=True)
+        self.manifest = None
+        self.scan_cache = {}
+
+    def __enter__(self) -> "BenchmarkEnv":
+        os.environ["BENCH_CA_SYSPATH"] = str(self.ca_syspath)
+        os.environ["BENCH_CA_BUNDLE"] = str(self.ca_bundle)
+
+        original_exec = asyncio.create_subprocess_exec
+
+        async def counting_exec(*args, **kwargs):
+            self.subprocesses += 1
+            return await original_exec(*args, **kwargs)
+
+        async def load_manifest(_hass):
+            return self.manifest or {"cas": {}, "bundle_sha256": None, "owned": []}
+
+        async def save_manifest(_hass, cas, bundle_sha256, *, owned=None, trust_policy=None, system_fingerprints=None):
+            self.manifest = {"cas": cas, "bundle_sha256": bundle_sha256, "owned": sorted(cas if owned is None else owned)}
+            if trust_policy is not None:
+                self.manifest["trust_policy"] = trust_policy
+            if system_fingerprints is not None:
+                self.manifest["system_fingerprints"] = sorted(system_fingerprints)
+
+        async def load_scan_cache(_hass):
+            return self.scan_cache
+
+        async def save_scan_cache(_hass, scan_cache):
+            self.scan_cache = scan_cache
+
+        for target, value in (
+            ("asyncio.create_subprocess_exec", counting_exec),
+            ("custom_components.additional_ca.utils.CA_SYSPATH", str(self.ca_syspath)),
+            ("custom_components.additional_ca.utils.UPDATE_CA_SYSCMD", str(self.standin)),
+            ("custom_components.additional_ca.backends.CA_SYSPATH", str(self.ca_syspath)),
+            ("custom_components.additional_ca.backends.CA_BUNDLE_PATH", str(self.ca_bundle)),
+            ("custom_components.additional_ca.backends.UPDATE_CA_SYSCMD", str(self.standin)),
+            ("custom_components.additional_ca.async_load_manifest", load_manifest),
+            ("custom_components.additional_ca.async_save_manifest", save_manifest),
+            ("custom_components.additional_ca.async_load_scan_cache", load_scan_cache),
+            ("custom_components.additional_ca.async_save_scan_cache", save_scan_cache),
+            ("custom_components.additional_ca.utils.persistent_notification", MagicMock()),
+            ("custom_components.additional_ca.utils.client_context", self.ssl_context),
+        ):
+            self._stack.enter_context(patch(target, value))
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stack.close()
+
+
+async def measure(env: BenchmarkEnv, operation: str, size: int, coro_func) -> dict:
+    """Run an operation once and measure it.
+
+    :param env: the benchmark environment
+    :type env: BenchmarkEnv
+    :param operation: the name of the operation
+    :type operation: str
+    :param size: the number of CA files
+    :type size: int
+    :param coro_func: the coroutine function running the operation
+    :return: the measures of the operation
+    :rtype: dict
+    """
+
+    env.subprocesses = 0
+    tracemalloc.start()
+    async with LoopBlockProbe() as probe:
+        start = time.perf_counter()
+        await coro_func()
+        wall_time = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "operation": operation,
+        "size": size,
+        "wall_time_s": round(wall_time, 6),
+        "loop_block_max_s": round(probe.max_block, 6),
+        "loop_block_total_s": round(probe.total_block, 6),
+        "subprocesses": env.subprocesses,
+        "peak_memory_bytes": peak_memory,
+    }
+    print(
+        f"{operation:<32} {size:>5} CA  {wall_time * 1000:>10.1f} ms  block max {probe.max_block * 1000:>8.1f} ms  "
+        f"{env.subprocesses} subprocess(es)  peak {peak_memory / 1024:>10.0f} KiB",
+        file=sys.stderr,
+    )
+    return result
+
+
+async def run_size(env: BenchmarkEnv, size: int) -> list[dict]:
+    """Run every operation for a CA set.
+
+    :param env: the benchmark environment
+    :type env: BenchmarkEnv
+    :param size: the number of CA files
+    :type size: int
+    :return: the measures of the operations
+    :rtype: list[dict]
+    """
+
+    hass = env.hass()
+    config = env.config(size)
+    ca_paths = [Path(env.config_dir, CONFIG_SUBDIR, ca_file) for ca_file in config[DOMAIN].values()]
+    ca_files = {}
+
+    async def parse_sync():
+        for ca_path in ca_paths:
+            load_ca_metadata(ca_path)
+
+    async def parse_async():
+        for ca_path in ca_paths:
+            await get_ca_metadata(hass, ca_path)
+
+    async def update_cold():
+        env.reset()
+        ca_files.update(await update_ca_certificates(hass, config))
+
+    async def update_warm():
+        await update_ca_certificates(hass, config)
+
+    async def check_ssl_context():
+        await check_hass_ssl_context(hass, ca_files)
+
+    async def remove_half():
+        owned_certs = set(env.manifest["owned"])
+        await remove_unused_certs(hass, env.config((size + 1) // 2)[DOMAIN], owned_certs)
+
+    results = []
+    for operation, coro_func in (
+        ("load_ca_metadata", parse_sync),
+        ("get_ca_metadata", parse_async),
+        ("update_ca_certificates_cold", update_cold),
+        ("update_ca_certificates_warm", update_warm),
+        ("check_hass_ssl_context", check_ssl_context),
+        ("remove_unused_certs", remove_half),
+    ):
+        results.append(await measure(env, operation, size, coro_func))
+    return results
+
+
+def compare(results: list[dict], baseline: list[dict], threshold: float) -> list[str]:
+    """Compare the wall time of the results with a baseline.
+
+    :param results: the measures of the current run
+    :type results: list[dict]
+    :param baseline: the measures of a previous run
+    :type baseline: list[dict]
+    :param threshold: the ratio of wall time above which an operation regressed
+    :type threshold: float
+    :return: the regressions, one message each
+    :rtype: list[str]
+    """
+
+    previous = {(r["operation"], r["size"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        reference = previous.get((result["operation"], result["size"]))
+        if not reference or not reference["wall_time_s"]:
+            continue
+        ratio = result["wall_time_s"] / reference["wall_time_s"]
+        if ratio > threshold:
+            regressions.append(f"{result['operation']} ({result['size']} CA): {ratio:.2f}x slower than baseline")
+    return regressions
+
+
+async def main(argv: list[str] | None = None) -> int:
+    """Run the benchmark and write the results as JSON."""
+
+    parser = argparse.ArgumentParser(description="Benchmark Additional CA at scale.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="the numbers of CA files to benchmark")
+    parser.add_argument("--output", type=Path, help="the JSON file to write, stdout by default")
+    parser.add_argument("--baseline", type=Path, help="a JSON file of a previous run to compare with")
+    parser.add_argument("--threshold", type=float, default=1.5, help="the wall time ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    # keep the integration logs out of the measures
+    additional_ca.log.setLevel("ERROR")
+
+    pems = make_ca_pems(max(args.sizes))
+    results = []
+    with tempfile.TemporaryDirectory(prefix="additional_ca_bench_") as tmp_dir:
+        with BenchmarkEnv(Path(tmp_dir), pems) as env:
+            for size in args.sizes:
+                results.extend(await run_size(env, size))
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text())["results"], args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,8 +1,106 @@
 """Pytest configuration for unit tests."""
 
+import datetime
 import sys
 from pathlib import Path
 
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.serialization import Encoding
+from homeassistant.core import HomeAssistant
+
 # Add the project root to Python path so imports work correctly
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
+
+from custom_components.additional_ca.backends import TrustStoreBackend  # noqa: E402
+from custom_components.additional_ca.bundle import get_pem_fingerprints, write_file_atomically  # noqa: E402
+
+
+class MemoryBackend(TrustStoreBackend):
+    """A trust store in a temporary folder, to test the code using a backend without touching the system.
+    The CA bundle is the base bundle followed by the installed CA files, its system CA are the ones of the base bundle.
+    """
+
+    name = "memory"
+
+    def __init__(self, base_bundle: bytes, path: Path) -> None:
+        super().__init__(path / "ca-certificates", path / "ca-certificates.crt")
+        self.ca_path.mkdir(parents=True, exist_ok=True)
+        self.base_bundle = base_bundle
+        self.rebuilds = 0
+        # the error raised by the next rebuilds, to test the rollback
+        self.rebuild_error: Exception | None = None
+
+    @property
+    def cas(self) -> dict[str, bytes]:
+        """The installed CA files, like {'myca_ca.crt': b'...'}."""
+
+        return {ca_file.name: ca_file.read_bytes() for ca_file in sorted(self.ca_path.iterdir()) if ca_file.is_file()}
+
+    async def async_rebuild(self, hass: HomeAssistant, timeout: float) -> None:
+        self.rebuilds += 1
+        if self.rebuild_error is not None:
+            raise self.rebuild_error
+        write_file_atomically(self.bundle_path, b"".join([self.base_bundle, *self.cas.values()]))
+
+    def get_system_fingerprints(self) -> set[str]:
+        return get_pem_fingerprints(self.base_bundle)
+
+
+@pytest.fixture
+def hass():
+    """Return a hass mock running executor jobs inline."""
+    hass = MagicMock(spec=HomeAssistant)
+    hass.data = {}
+    hass.bus = MagicMock()
+    hass.async_add_executor_job = AsyncMock(side_effect=lambda func, *args: func(*args))
+    return hass
+
+
+@pytest.fixture
+def make_ca_pem():
+    """Return a factory generating self-signed CA certificates in PEM format."""
+
+    def _make_ca_pem(common_name: str = "Test CA", serial_number: int | None = None, days: int = 365) -> bytes:
+        key = ec.generate_private_key(ec.SECP256R1())
+        name = x509.Name([x509.NameAttribute(x509.NameOID.COMMON_NAME, common_name)])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(serial_number or x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=days))
+            .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+            .sign(key, hashes.SHA256())
+        )
+        return cert.public_bytes(Encoding.PEM)
+
+    return _make_ca_pem
+
+
+@pytest.fixture
+def fingerprint():
+    """Return the SHA-256 fingerprint of a PEM certificate."""
+
+    def _fingerprint(pem: bytes) -> str:
+        return x509.load_pem_x509_certificate(pem).fingerprint(hashes.SHA256()).hex()
+
+    return _fingerprint
+
+
+@pytest.fixture
+def make_memory_backend(tmp_path):
+    """Return a factory of memory backends in a temporary folder, trusting the CA of a base bundle as system CA."""
+
+    def _make_memory_backend(base_bundle: bytes = b"") -> MemoryBackend:
+        return MemoryBackend(base_bundle, tmp_path / "store")
+
+    return _make_memory_backend
@@ -0,0 +1,281 @@
+"""Unit tests for backends.py module."""
+
+import certifi
+import pytest
+from unittest.mock import patch
+
+from custom_components.additional_ca.backends import (
+    CapathBackend,
+    CertifiBackend,
+    NativeBackend,
+    P11KitBackend,
+    TrustStoreBackend,
+    UpdateCaCertificatesBackend,
+    async_get_backend,
+    detect_backend,
+)
+from custom_components.additional_ca.bundle import get_pem_fingerprints
+from custom_components.additional_ca.const import TRUST_STORE_BACKEND
+
+
+@pytest.fixture
+def no_distro_cas(tmp_path):
+    """Build bundles without the distribution CA files of the system."""
+    with patch("custom_components.additional_ca.bundle.CA_DISTRO_CONF", str(tmp_path / "none.conf")), patch(
+        "custom_components.additional_ca.bundle.CA_DISTRO_PATH", str(tmp_path / "none")
+    ):
+        yield
+
+
+class TestDetectBackend:
+    """Test cases for detect_backend function."""
+
+    @pytest.fixture
+    def system(self, tmp_path):
+        """Return the folders of a system without any CA trust store, patched into the backends."""
+        paths = {"ca_syspath": tmp_path / "ca-certificates", "bundle": tmp_path / "ca-certificates.crt", "anchors": tmp_path / "anchors"}
+        with patch("custom_components.additional_ca.backends.CA_SYSPATH", str(paths["ca_syspath"])), patch(
+            "custom_components.additional_ca.backends.CA_BUNDLE_PATH", str(paths["bundle"])
+        ), patch("custom_components.additional_ca.backends.P11KIT_CA_PATH", str(paths["anchors"])):
+            yield paths
+
+    @patch("custom_components.additional_ca.backends.shutil.which", return_value="/usr/sbin/update-ca-certificates")
+    def test_detect_update_ca_certificates(self, mock_which, system):
+        """Test update-ca-certificates is preferred when the command and its folder exist."""
+        system["ca_syspath"].mkdir()
+        system["anchors"].mkdir()
+        assert detect_backend() is UpdateCaCertificatesBackend
+
+    @patch("custom_components.additional_ca.backends.shutil.which", side_effect=lambda cmd: "/usr/bin/trust" if cmd == "trust" else None)
+    def test_detect_p11kit(self, mock_which, system):
+        """Test p11-kit is used on systems with its anchors folder."""
+        system["anchors"].mkdir()
+        assert detect_backend() is P11KitBackend
+
+    @patch("custom_components.additional_ca.backends.shutil.which", return_value=None)
+    def test_detect_native(self, mock_which, system):
+        """Test the bundle is built in-process on a Debian-like layout without update-ca-certificates."""
+        system["ca_syspath"].mkdir()
+        system["bundle"].write_bytes(b"")
+        assert detect_backend() is NativeBackend
+
+    @patch("custom_components.additional_ca.backends.shutil.which", return_value=None)
+    def test_detect_certifi(self, mock_which, system):
+        """Test the certifi bundle is used when the system has no known CA trust store."""
+        assert detect_backend() is CertifiBackend
+
+
+class TestAsyncGetBackend:
+    """Test cases for async_get_backend function."""
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.backends.detect_backend", return_value=NativeBackend)
+    async def test_async_get_backend_detected_once(self, mock_detect, hass):
+        """Test the backend is detected once, then reused."""
+        # Act
+        first = await async_get_backend(hass, {})
+        second = await async_get_backend(hass, {TRUST_STORE_BACKEND: "auto"})
+
+        # Assert
+        assert isinstance(first, NativeBackend)
+        assert second is first
+        mock_detect.assert_called_once()
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.backends.detect_backend")
+    async def test_async_get_backend_from_option(self, mock_detect, hass):
+        """Test the backend of the option is used without detection."""
+        # Act
+        backend = await async_get_backend(hass, {TRUST_STORE_BACKEND: "p11-kit"})
+
+        # Assert
+        assert isinstance(backend, P11KitBackend)
+        mock_detect.assert_not_called()
+
+
+class TestTrustStoreBackend:
+    """Test cases for TrustStoreBackend class."""
+
+    def test_rebuild_is_abstract(self):
+        """Test a backend cannot be created without a way to rebuild its CA bundle."""
+        # Act & Assert
+        with pytest.raises(TypeError, match="async_rebuild"):
+            TrustStoreBackend(None, None)
+
+    @pytest.mark.asyncio
+    async def test_install_verify_remove(self, hass, tmp_path, make_ca_pem, fingerprint, make_memory_backend):
+        """Test CA files are installed, rebuilt into the bundle, verified and removed in a temporary folder."""
+        # Arrange
+        backend = make_memory_backend()
+        ca_pem = make_ca_pem("Memory CA")
+        (tmp_path / "ca.crt").write_bytes(ca_pem)
+
+        # Act
+        backend.install("ca_ca.crt", tmp_path / "ca.crt")
+        await backend.async_rebuild(hass, 1)
+        missing_after_install = backend.verify([fingerprint(ca_pem)])
+        removed = backend.remove(["ca_ca.crt", "unknown.crt"])
+        await backend.async_rebuild(hass, 1)
+
+        # Assert
+        assert missing_after_install == []
+        assert removed == ["ca_ca.crt"]
+        assert backend.verify([fingerprint(ca_pem)]) == [fingerprint(ca_pem)]
+        assert backend.rebuilds == 2
+
+
+class TestGetSystemFingerprints:
+    """Test cases for get_system_fingerprints method."""
+
+    def test_get_system_fingerprints_cached(self, tmp_path, make_ca_pem, fingerprint):
+        """Test the distribution CA files are read once, then again only when they change."""
+        # Arrange
+        distro_path = tmp_path / "share"
+        distro_path.mkdir()
+        ca_pem = make_ca_pem("Distro CA")
+        (distro_path / "distro.crt").write_bytes(ca_pem)
+        backend = NativeBackend(tmp_path / "ca-certificates", tmp_path / "ca-certificates.crt")
+
+        with patch("custom_components.additional_ca.bundle.CA_DISTRO_CONF", str(tmp_path / "none.conf")), patch(
+            "custom_components.additional_ca.bundle.CA_DISTRO_PATH", str(distro_path)
+        ), patch("custom_components.additional_ca.backends.get_pem_fingerprints", wraps=get_pem_fingerprints) as mock_fingerprints:
+            # Act
+            first = backend.get_system_fingerprints()
+            second = backend.get_system_fingerprints()
+            new_pem = make_ca_pem("New Distro CA")
+            (distro_path / "new.crt").write_bytes(new_pem)
+            third = backend.get_system_fingerprints()
+
+        # Assert
+        assert first == second == {fingerprint(ca_pem)}
+        assert third == {fingerprint(ca_pem), fingerprint(new_pem)}
+        assert mock_fingerprints.call_count == 3
+
+    def test_get_system_fingerprints_certifi(self, tmp_path, make_ca_pem, fingerprint):
+        """Test the CA of certifi are the ones of its original bundle, without the CA files of Additional CA."""
+        # Arrange
+        public_pem = make_ca_pem("Public CA")
+        bundle = tmp_path / "cacert.pem"
+        bundle.write_bytes(public_pem)
+        backend = CertifiBackend(tmp_path / "anchors", bundle)
+        backend.build_bundle()
+        bundle.write_bytes(public_pem + make_ca_pem("Private CA"))
+
+        # Act
+        result = backend.get_system_fingerprints()
+
+        # Assert
+        assert result == {fingerprint(public_pem)}
+
+
+class TestFileBackends:
+    """Test cases for the backends writing a CA bundle file."""
+
+    @pytest.mark.asyncio
+    async def test_native_backend(self, hass, tmp_path, make_ca_pem, fingerprint, no_distro_cas):
+        """Test the native backend builds the bundle from its folder of CA files."""
+        # Arrange
+        ca_path = tmp_path / "ca-certificates"
+        ca_path.mkdir()
+        backend = NativeBackend(ca_path, tmp_path / "ca-certificates.crt")
+        ca_pem = make_ca_pem("Native CA")
+        (tmp_path / "staged.crt").write_bytes(ca_pem)
+
+        # Act
+        backend.install("ca_ca.crt", tmp_path / "staged.crt")
+        await backend.async_rebuild(hass, 1)
+
+        # Assert
+        assert not (tmp_path / "staged.crt").exists()
+        assert backend.verify([fingerprint(ca_pem), "unknown"]) == ["unknown"]
+
+    @pytest.mark.asyncio
+    async def test_certifi_backend(self, hass, tmp_path, make_ca_pem, fingerprint):
+        """Test the certifi backend appends its CA files to the original certifi bundle, and drops removed ones."""
+        # Arrange
+        public_pem = make_ca_pem("Public CA")
+        ca_pem = make_ca_pem("Private CA")
+        bundle = tmp_path / "certifi" / "cacert.pem"
+        bundle.parent.mkdir()
+        bundle.write_bytes(public_pem)
+        backend = CertifiBackend(tmp_path / "anchors", bundle)
+        (tmp_path / "staged.crt").write_bytes(ca_pem)
+
+        # Act
+        await backend.async_rebuild(hass, 1)
+        backend.install("ca_ca.crt", tmp_path / "staged.crt")
+        await backend.async_rebuild(hass, 1)
+        installed_bundle = bundle.read_bytes()
+        backend.remove(["ca_ca.crt"])
+        await backend.async_rebuild(hass, 1)
+
+        # Assert
+        assert installed_bundle == public_pem + ca_pem
+        assert bundle.read_bytes() == public_pem
+        assert backend.verify([fingerprint(public_pem), fingerprint(ca_pem)]) == [fingerprint(ca_pem)]
+
+    @pytest.mark.asyncio
+    async def test_certifi_backend_upgraded(self, hass, tmp_path, make_ca_pem):
+        """Test an upgrade of certifi replacing its bundle is snapshotted again, rather than rebuilt from the previous version."""
+        # Arrange
+        ca_pem = make_ca_pem("Private CA")
+        new_public_pem = make_ca_pem("New Public CA")
+        bundle = tmp_path / "certifi" / "cacert.pem"
+        bundle.parent.mkdir()
+        bundle.write_bytes(make_ca_pem("Old Public CA"))
+        backend = CertifiBackend(tmp_path / "anchors", bundle)
+        backend.ca_path.mkdir()
+        (tmp_path / "staged.crt").write_bytes(ca_pem)
+        with patch.object(certifi, "__version__", "2024.1.1"):
+            backend.install("ca_ca.crt", tmp_path / "staged.crt")
+            await backend.async_rebuild(hass, 1)
+        bundle.write_bytes(new_public_pem)
+
+        # Act
+        with patch.object(certifi, "__version__", "2025.1.1"):
+            await backend.async_rebuild(hass, 1)
+            system_ca_files = backend.get_system_ca_files()
+
+        # Assert
+        assert bundle.read_bytes() == new_public_pem + ca_pem
+        assert [path.name for path in bundle.parent.iterdir() if path != bundle] == [".cacert.pem.additional_ca-original-2025.1.1"]
+        assert system_ca_files[0].read_bytes() == new_public_pem
+
+    @pytest.mark.asyncio
+    async def test_p11kit_backend(self, hass, tmp_path):
+        """Test the p11-kit backend extracts the CA bundles with the trust command."""
+        # Arrange
+        cmd = tmp_path / "trust"
+        cmd.write_text(f'#!/bin/sh\necho "$@" > {tmp_path}/args\n')
+        cmd.chmod(0o755)
+        backend = P11KitBackend(tmp_path / "anchors", tmp_path / "ca-bundle.crt")
+
+        # Act
+        with patch("custom_components.additional_ca.backends.P11KIT_SYSCMD", str(cmd)):
+            await backend.async_rebuild(hass, 5)
+
+        # Assert
+        assert (tmp_path / "args").read_text().strip() == "extract-compat"
+
+    @pytest.mark.asyncio
+    async def test_capath_backend(self, hass, tmp_path, make_ca_pem, fingerprint):
+        """Test the CApath backend links its CA files by subject hash, and verifies them through the links."""
+        # Arrange
+        capath = tmp_path / "capath"
+        capath.mkdir()
+        backend = CapathBackend(capath, capath / "capath.index")
+        ca_pem = make_ca_pem("Capath CA")
+        (tmp_path / "staged.crt").write_bytes(ca_pem)
+
+        # Act
+        backend.install("ca_ca.crt", tmp_path / "staged.crt")
+        await backend.async_rebuild(hass, 1)
+        missing_after_install = backend.verify([fingerprint(ca_pem)])
+        backend.remove(["ca_ca.crt"])
+        await backend.async_rebuild(hass, 1)
+
+        # Assert
+        assert backend.capath == capath
+        assert missing_after_install == []
+        assert backend.verify([fingerprint(ca_pem)]) == [fingerprint(ca_pem)]
+        assert backend.read_bundle() == b""
@@ -0,0 +1,267 @@
+"""Unit tests for bundle.py module."""
+
+import pytest
+from unittest.mock import patch
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+
+from custom_components.additional_ca.bundle import (
+    build_system_ca_bundle,
+    filter_ca_bundle,
+    get_distro_ca_files,
+    get_pem_fingerprints,
+    iter_pem_certificates,
+    parse_trust_allow_list,
+    split_pem_certificates,
+    write_file_atomically,
+)
+from custom_components.additional_ca.const import TRANSACTION_DIRNAME
+from custom_components.additional_ca.exceptions import TrustStoreException
+
+
+@pytest.fixture
+def trust_store(tmp_path):
+    """Patch the trust store paths to a temporary directory."""
+    distro_path = tmp_path / "share"
+    local_path = tmp_path / "local"
+    bundle_path = tmp_path / "certs" / "ca-certificates.crt"
+    conf_path = tmp_path / "ca-certificates.conf"
+    for path in (distro_path / "mozilla", local_path, bundle_path.parent):
+        path.mkdir(parents=True)
+
+    with patch("custom_components.additional_ca.bundle.CA_DISTRO_PATH", str(distro_path)), \
+            patch("custom_components.additional_ca.bundle.CA_DISTRO_CONF", str(conf_path)), \
+            patch("custom_components.additional_ca.bundle.CA_SYSPATH", str(local_path)), \
+            patch("custom_components.additional_ca.bundle.CA_BUNDLE_PATH", str(bundle_path)):
+        yield {"distro": distro_path, "local": local_path, "bundle": bundle_path, "conf": conf_path}
+
+
+class TestSplitPemCertificates:
+    """Test cases for split_pem_certificates function."""
+
+    def test_split_pem_certificates_multiple(self, make_ca_pem):
+        """Test splitting PEM data with comments and several certificates."""
+        # Arrange
+        cert1 = make_ca_pem("CA 1")
+        cert2 = make_ca_pem("CA 2")
+        data = b"# comment\n" + cert1 + b"some text\n" + cert2
+
+        # Act
+        result = split_pem_certificates(data)
+
+        # Assert
+        assert result == [cert1.strip(), cert2.strip()]
+
+    def test_split_pem_certificates_no_certificate(self):
+        """Test splitting data without any certificate."""
+        assert split_pem_certificates(b"not a certificate") == []
+
+
+class TestIterPemCertificates:
+    """Test cases for iter_pem_certificates function."""
+
+    def test_iter_pem_certificates_multiple(self, tmp_path, make_ca_pem):
+        """Test streaming a PEM file with comments, CRLF line endings and several certificates."""
+        # Arrange
+        cert1 = make_ca_pem("CA 1")
+        cert2 = make_ca_pem("CA 2")
+        path = tmp_path / "bundle.pem"
+        path.write_bytes(b"# comment\n" + cert1.replace(b"\n", b"\r\n") + b"text\n" + cert2 + b"-----BEGIN CERTIFICATE-----\ntruncated\n")
+
+        # Act
+        result = iter_pem_certificates(path)
+
+        # Assert
+        assert next(result) == cert1
+        assert next(result) == cert2
+        assert list(result) == []
+
+
+class TestGetPemFingerprints:
+    """Test cases for get_pem_fingerprints function."""
+
+    def test_get_pem_fingerprints(self, make_ca_pem):
+        """Test the fingerprints are the SHA-256 of the DER certificates, invalid blocks skipped."""
+        # Arrange
+        ca_pem = make_ca_pem("CA")
+        invalid = b"-----BEGIN CERTIFICATE-----\n!!!\n-----END CERTIFICATE-----\n"
+
+        # Act
+        result = get_pem_fingerprints(ca_pem + invalid)
+
+        # Assert
+        assert result == {x509.load_pem_x509_certificate(ca_pem).fingerprint(hashes.SHA256()).hex()}
+
+
+class TestGetDistroCaFiles:
+    """Test cases for get_distro_ca_files function."""
+
+    def test_get_distro_ca_files_from_conf(self, trust_store):
+        """Test that deselected, commented and missing entries are ignored."""
+        # Arrange
+        for name in ("a.crt", "b.crt", "c.crt"):
+            (trust_store["distro"] / "mozilla" / name).write_bytes(b"")
+        trust_store["conf"].write_text("# comment\nmozilla/b.crt\n!mozilla/c.crt\nmozilla/a.crt\nmozilla/missing.crt\n\n")
+
+        # Act
+        result = get_distro_ca_files()
+
+        # Assert
+        assert [f.name for f in result] == ["b.crt", "a.crt"]
+
+    def test_get_distro_ca_files_without_conf(self, trust_store):
+        """Test that every .crt file is used when there is no configuration file."""
+        # Arrange
+        for name in ("b.crt", "a.crt", "readme.txt"):
+            (trust_store["distro"] / "mozilla" / name).write_bytes(b"")
+
+        # Act
+        result = get_distro_ca_files()
+
+        # Assert
+        assert [f.name for f in result] == ["a.crt", "b.crt"]
+
+
+class TestWriteFileAtomically:
+    """Test cases for write_file_atomically function."""
+
+    def test_write_file_atomically_replaces_content(self, tmp_path):
+        """Test that the file is replaced and no temporary file is left."""
+        # Arrange
+        path = tmp_path / "bundle.crt"
+        path.write_bytes(b"old")
+
+        # Act
+        write_file_atomically(path, b"new")
+
+        # Assert
+        assert path.read_bytes() == b"new"
+        assert list(tmp_path.iterdir()) == [path]
+        assert path.stat().st_mode & 0o777 == 0o644
+
+
+class TestBuildSystemCaBundle:
+    """Test cases for build_system_ca_bundle function."""
+
+    def test_build_system_ca_bundle_success(self, trust_store, make_ca_pem):
+        """Test that the bundle contains distro CAs then local CAs."""
+        # Arrange
+        distro_cert = make_ca_pem("Distro CA")
+        local_cert = make_ca_pem("Local CA")
+        (trust_store["distro"] / "mozilla" / "distro.crt").write_bytes(distro_cert.rstrip(b"\n"))
+        trust_store["conf"].write_text("mozilla/distro.crt\n")
+        (trust_store["local"] / "my_ca_ca.crt").write_bytes(local_cert)
+
+        # Act
+        report = build_system_ca_bundle()
+
+        # Assert
+        assert trust_store["bundle"].read_bytes() == distro_cert + local_cert
+        assert report == {"distro": 1, "local": 1, "duplicates": []}
+
+    def test_build_system_ca_bundle_only_crt_files(self, trust_store, make_ca_pem):
+        """Test that local files not named '*.crt' are ignored, like update-ca-certificates does."""
+        # Arrange
+        local_cert = make_ca_pem("Local CA")
+        (trust_store["local"] / "corp").mkdir()
+        (trust_store["local"] / "corp" / "my_ca_ca.crt").write_bytes(local_cert)
+        (trust_store["local"] / "other_ca.pem").write_bytes(make_ca_pem("Other CA"))
+        (trust_store["local"] / "README").write_text("not a certificate")
+
+        # Act
+        report = build_system_ca_bundle()
+
+        # Assert
+        assert trust_store["bundle"].read_bytes() == local_cert
+        assert report == {"distro": 0, "local": 1, "duplicates": []}
+
+    def test_build_system_ca_bundle_duplicate(self, trust_store, make_ca_pem):
+        """Test that a local CA already present in the bundle is skipped."""
+        # Arrange
+        distro_cert = make_ca_pem("Distro CA")
+        (trust_store["distro"] / "mozilla" / "distro.crt").write_bytes(distro_cert)
+        trust_store["conf"].write_text("mozilla/distro.crt\n")
+        (trust_store["local"] / "dup_distro.crt").write_bytes(distro_cert)
+
+        # Act
+        report = build_system_ca_bundle()
+
+        # Assert
+        assert trust_store["bundle"].read_bytes() == distro_cert
+        assert report["duplicates"] == ["dup_distro.crt"]
+
+    def test_build_system_ca_bundle_invalid_file(self, trust_store, make_ca_pem):
+        """Test that an invalid local CA fails without writing the bundle."""
+        # Arrange
+        trust_store["bundle"].write_bytes(b"previous bundle")
+        (trust_store["local"] / "good.crt").write_bytes(make_ca_pem())
+        (trust_store["local"] / "bad.crt").write_bytes(b"not a certificate")
+
+        # Act & Assert
+        with pytest.raises(TrustStoreException, match="bad.crt"):
+            build_system_ca_bundle()
+
+        assert trust_store["bundle"].read_bytes() == b"previous bundle"
+
+    def test_build_system_ca_bundle_skips_transaction(self, trust_store, make_ca_pem):
+        """Test that the staged and snapshotted files of a transaction are not added to the bundle."""
+        # Arrange
+        local_cert = make_ca_pem("Local CA")
+        (trust_store["local"] / "my_ca_ca.crt").write_bytes(local_cert)
+        transaction_path = trust_store["local"] / TRANSACTION_DIRNAME / "snapshot"
+        transaction_path.mkdir(parents=True)
+        (transaction_path / "my_ca_ca.crt.snapshot").write_bytes(b"previous version")
+
+        # Act
+        report = build_system_ca_bundle()
+
+        # Assert
+        assert trust_store["bundle"].read_bytes() == local_cert
+        assert report["local"] == 1
+
+
+class TestFilterCaBundle:
+    """Test cases for parse_trust_allow_list and filter_ca_bundle functions."""
+
+    def test_parse_trust_allow_list(self):
+        """Test entries of 64 hexadecimal digits are fingerprints, the other ones are subjects."""
+        fingerprint = "AB:" * 31 + "CD"
+
+        # Act
+        fingerprints, subjects = parse_trust_allow_list([fingerprint, " ISRG Root X1 "])
+
+        # Assert
+        assert fingerprints == {"ab" * 31 + "cd"}
+        assert subjects == {"isrg root x1"}
+
+    def test_filter_ca_bundle_by_fingerprint(self, tmp_path, make_ca_pem):
+        """Test the reduced bundle keeps the loaded CA and the CA allowed by fingerprint, and the bundle is left untouched."""
+        # Arrange
+        own_pem, public_pem, other_pem = make_ca_pem("Own CA"), make_ca_pem("Public CA"), make_ca_pem("Other CA")
+        bundle = tmp_path / "ca-certificates.crt"
+        bundle.write_bytes(own_pem + public_pem + other_pem)
+        own_fingerprint = x509.load_pem_x509_certificate(own_pem).fingerprint(hashes.SHA256()).hex()
+        public_fingerprint = x509.load_pem_x509_certificate(public_pem).fingerprint(hashes.SHA256()).hex().upper()
+
+        # Act
+        report = filter_ca_bundle(bundle, tmp_path / "minimal.crt", {own_fingerprint}, [public_fingerprint])
+
+        # Assert
+        assert report == {"kept": 2, "dropped": 1, "unmatched": []}
+        assert (tmp_path / "minimal.crt").read_bytes() == own_pem + public_pem
+        assert bundle.read_bytes() == own_pem + public_pem + other_pem
+
+    def test_filter_ca_bundle_by_subject(self, tmp_path, make_ca_pem):
+        """Test CA are allowed by common name, case-insensitive, and unmatched entries are reported."""
+        # Arrange
+        public_pem, other_pem = make_ca_pem("Public Root CA"), make_ca_pem("Other CA")
+        bundle = tmp_path / "ca-certificates.crt"
+        bundle.write_bytes(public_pem + other_pem)
+
+        # Act
+        report = filter_ca_bundle(bundle, tmp_path / "minimal.crt", set(), ["public root ca", "Unknown Root"])
+
+        # Assert
+        assert report == {"kept": 1, "dropped": 1, "unmatched": ["Unknown Root"]}
+        assert (tmp_path / "minimal.crt").read_bytes() == public_pem
@@ -0,0 +1,167 @@
+"""Unit tests for capath.py module."""
+
+import datetime
+import os
+import ssl
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.serialization import Encoding, NoEncryption, PrivateFormat
+from cryptography.x509.oid import NameOID
+
+from custom_components.additional_ca.capath import (
+    canonicalize_string,
+    get_capath_fingerprints,
+    get_subject_hash,
+    rehash_capath,
+)
+from custom_components.additional_ca.const import CAPATH_INDEX_FILENAME
+from custom_components.additional_ca.exceptions import TrustStoreException
+
+
+@pytest.fixture
+def make_pki(tmp_path):
+    """Return a factory generating a CA in PEM format, and the PEM files of a server certificate it signed for 'localhost'."""
+
+    def _make_pki(ca_name: x509.Name) -> tuple[bytes, str, str]:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        ca_key = ec.generate_private_key(ec.SECP256R1())
+        ca_cert = (
+            x509.CertificateBuilder()
+            .subject_name(ca_name)
+            .issuer_name(ca_name)
+            .public_key(ca_key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+            .sign(ca_key, hashes.SHA256())
+        )
+        key = ec.generate_private_key(ec.SECP256R1())
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")]))
+            .issuer_name(ca_name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(x509.SubjectAlternativeName([x509.DNSName("localhost")]), critical=False)
+            .sign(ca_key, hashes.SHA256())
+        )
+        cert_path = tmp_path / "server.crt"
+        key_path = tmp_path / "server.key"
+        cert_path.write_bytes(cert.public_bytes(Encoding.PEM))
+        key_path.write_bytes(key.private_bytes(Encoding.PEM, PrivateFormat.PKCS8, NoEncryption()))
+        return ca_cert.public_bytes(Encoding.PEM), str(cert_path), str(key_path)
+
+    return _make_pki
+
+
+def handshake(client_ctx: ssl.SSLContext, cert_path: str, key_path: str) -> None:
+    """Run a TLS handshake in memory between a client context and a server for 'localhost'."""
+    server_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_ctx.load_cert_chain(cert_path, key_path)
+    client_in, client_out, server_in, server_out = ssl.MemoryBIO(), ssl.MemoryBIO(), ssl.MemoryBIO(), ssl.MemoryBIO()
+    client = client_ctx.wrap_bio(client_in, client_out, server_hostname="localhost")
+    server = server_ctx.wrap_bio(server_in, server_out, server_side=True)
+    done = {client: False, server: False}
+    for _ in range(10):
+        for conn in (client, server):
+            if not done[conn]:
+                try:
+                    conn.do_handshake()
+                    done[conn] = True
+                except ssl.SSLWantReadError:
+                    pass
+        server_in.write(client_out.read())
+        client_in.write(server_out.read())
+        if all(done.values()):
+            return
+    raise AssertionError("handshake did not complete")
+
+
+def name(common_name: str) -> x509.Name:
+    """Return a name with a common name."""
+    return x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, common_name)])
+
+
+class TestGetSubjectHash:
+    """Test cases for canonicalize_string and get_subject_hash functions."""
+
+    def test_canonicalize_string(self):
+        """Test spaces are trimmed and collapsed, and only ASCII letters are lowercased."""
+        assert canonicalize_string(" My \t Private  ROOT É ".encode()) == "my private root É".encode()
+
+    def test_get_subject_hash(self):
+        """Test the hash is the one of 'openssl x509 -hash', for canonicalized and non-UTF-8 string types."""
+        assert get_subject_hash(name("  My   Private\tROOT ca ").public_bytes()) == "781d0d1c"
+        bmp_name = x509.Name(
+            [
+                x509.NameAttribute(NameOID.COMMON_NAME, "B", _type=x509.name._ASN1Type.BMPString),
+                x509.NameAttribute(NameOID.EMAIL_ADDRESS, "Foo@Example.COM"),
+            ]
+        )
+        assert get_subject_hash(bmp_name.public_bytes()) == "a0ac4fc7"
+
+
+class TestRehashCapath:
+    """Test cases for rehash_capath and get_capath_fingerprints functions."""
+
+    def test_rehash_capath_openssl_lookup(self, tmp_path, make_pki):
+        """Test OpenSSL finds the CA through its hashed link, loading it only during the handshake."""
+        # Arrange
+        capath = tmp_path / "capath"
+        capath.mkdir()
+        ca_pem, cert_path, key_path = make_pki(name("  Private   ROOT ca "))
+        (capath / "ca_ca.crt").write_bytes(ca_pem)
+        client_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+
+        # Act
+        links = rehash_capath(capath)
+        client_ctx.load_verify_locations(capath=capath)
+        loaded_before = len(client_ctx.get_ca_certs())
+        handshake(client_ctx, cert_path, key_path)
+
+        # Assert
+        assert links == {f"{get_subject_hash(name('  Private   ROOT ca ').public_bytes())}.0": "ca_ca.crt"}
+        assert loaded_before == 0
+        assert len(client_ctx.get_ca_certs()) == 1
+
+    def test_rehash_capath_links(self, tmp_path, make_ca_pem):
+        """Test certificates with the same subject are numbered, stale links are removed and the index is written."""
+        # Arrange
+        capath = tmp_path / "capath"
+        capath.mkdir()
+        (capath / "ca1_ca.crt").write_bytes(make_ca_pem("Same CA"))
+        (capath / "ca2_ca.crt").write_bytes(make_ca_pem("Same CA"))
+        (capath / "ca3_ca.crt").write_bytes(make_ca_pem("Other CA"))
+        os.symlink("removed.crt", capath / "00000000.0")
+
+        # Act
+        links = rehash_capath(capath)
+        (capath / "ca3_ca.crt").unlink()
+        links_after_remove = rehash_capath(capath)
+
+        # Assert
+        subject_hash = get_subject_hash(name("Same CA").public_bytes())
+        assert links_after_remove == {f"{subject_hash}.0": "ca1_ca.crt", f"{subject_hash}.1": "ca2_ca.crt"}
+        assert len(links) == 3
+        assert sorted(path.name for path in capath.iterdir()) == sorted(["ca1_ca.crt", "ca2_ca.crt", CAPATH_INDEX_FILENAME, *links_after_remove])
+        assert os.readlink(capath / f"{subject_hash}.1") == "ca2_ca.crt"
+        assert len((capath / CAPATH_INDEX_FILENAME).read_text().splitlines()) == 2
+        assert len(get_capath_fingerprints(capath)) == 2
+
+    def test_rehash_capath_invalid_file(self, tmp_path):
+        """Test an invalid CA file fails the rehash, before any link is changed."""
+        # Arrange
+        capath = tmp_path / "capath"
+        capath.mkdir()
+        (capath / "ca_ca.crt").write_text("not a certificate")
+
+        # Act / Assert
+        with pytest.raises(TrustStoreException):
+            rehash_capath(capath)
+        assert not (capath / CAPATH_INDEX_FILENAME).exists()
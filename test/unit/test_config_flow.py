@@ -0,0 +1,148 @@
+"""Unit tests for config_flow.py module."""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+
+from custom_components.additional_ca.config_flow import AdditionalCaOptionsFlow, validate_ca_path
+from custom_components.additional_ca.const import CONF_CA_NAME, CONF_CA_NAMES, CONF_CA_PATH, CONF_CAS, DOMAIN
+
+
+class TestValidateCaPath:
+    """Test cases for validate_ca_path function."""
+
+    def test_validate_ca_path_valid(self, tmp_path):
+        """Test a CA file inside the config folder."""
+        # Arrange
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "ca.crt").write_bytes(b"ca")
+
+        # Act & Assert
+        assert validate_ca_path(tmp_path, "sub/ca.crt") is None
+
+    def test_validate_ca_path_not_found(self, tmp_path):
+        """Test a missing CA file."""
+        assert validate_ca_path(tmp_path, "missing.crt") == "file_not_found"
+
+    def test_validate_ca_path_outside_config_folder(self, tmp_path):
+        """Test a CA file outside the config folder."""
+        # Arrange
+        (tmp_path / "config").mkdir()
+        (tmp_path / "ca.crt").write_bytes(b"ca")
+
+        # Act & Assert
+        assert validate_ca_path(tmp_path / "config", "../ca.crt") == "invalid_path"
+
+    def test_validate_ca_path_url(self, tmp_path):
+        """Test a URL is accepted without checking the config folder."""
+        assert validate_ca_path(tmp_path, "https://pki.example.com/root.crt") is None
+
+    def test_validate_ca_path_insecure_url(self, tmp_path):
+        """Test an HTTP URL is only accepted with a pinned fingerprint."""
+        assert validate_ca_path(tmp_path, "http://pki.example.com/root.crt") == "insecure_url"
+        assert validate_ca_path(tmp_path, f"http://pki.example.com/root.crt#sha256={'ab' * 32}") is None
+
+
+class TestOptionsFlow:
+    """Test cases for AdditionalCaOptionsFlow class."""
+
+    @pytest.fixture
+    def flow(self, tmp_path):
+        """Return an options flow with two CA files configured in YAML."""
+        (tmp_path / "additional_ca").mkdir()
+        (tmp_path / "additional_ca" / "new.crt").write_bytes(b"ca")
+        hass = MagicMock(spec=HomeAssistant)
+        hass.config = MagicMock()
+        hass.config.path = lambda *args: str(tmp_path.joinpath(*args))
+        hass.async_add_executor_job = AsyncMock(side_effect=lambda func, *args: func(*args))
+        flow = AdditionalCaOptionsFlow(MagicMock())
+        flow.hass = hass
+        flow.handler = "entry_id"
+        with patch(
+            "custom_components.additional_ca.config_flow.get_ca_config",
+            return_value={DOMAIN: {"hot_reload": True, "ca1": "ca1.crt", "ca2": "ca2.crt"}},
+        ):
+            yield flow
+
+    @pytest.mark.asyncio
+    async def test_init_menu(self, flow):
+        """Test the init step shows the menu, with the configured CA files loaded."""
+        # Act
+        result = await flow.async_step_init()
+
+        # Assert
+        assert result["type"] == FlowResultType.MENU
+        assert flow._cas == {"ca1": "ca1.crt", "ca2": "ca2.crt"}
+
+    @pytest.mark.asyncio
+    async def test_add_ca(self, flow):
+        """Test adding a CA file saves the whole CA set."""
+        # Arrange
+        await flow.async_step_init()
+
+        # Act
+        result = await flow.async_step_add_ca({CONF_CA_NAME: "new_ca", CONF_CA_PATH: "new.crt"})
+
+        # Assert
+        assert result["type"] == FlowResultType.CREATE_ENTRY
+        assert result["data"] == {CONF_CAS: {"ca1": "ca1.crt", "ca2": "ca2.crt", "new_ca": "new.crt"}}
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "user_input,errors",
+        [
+            ({CONF_CA_NAME: "ca1", CONF_CA_PATH: "new.crt"}, {CONF_CA_NAME: "name_exists"}),
+            ({CONF_CA_NAME: "hot_reload", CONF_CA_PATH: "new.crt"}, {CONF_CA_NAME: "reserved_name"}),
+            ({CONF_CA_NAME: "new_ca", CONF_CA_PATH: "missing.crt"}, {CONF_CA_PATH: "file_not_found"}),
+        ],
+    )
+    async def test_add_ca_errors(self, flow, user_input, errors):
+        """Test invalid CA files are rejected."""
+        # Arrange
+        await flow.async_step_init()
+
+        # Act
+        result = await flow.async_step_add_ca(user_input)
+
+        # Assert
+        assert result["type"] == FlowResultType.FORM
+        assert result["errors"] == errors
+
+    @pytest.mark.asyncio
+    async def test_repoint_ca(self, flow):
+        """Test changing the file of a CA."""
+        # Arrange
+        await flow.async_step_init()
+
+        # Act
+        result = await flow.async_step_repoint_ca({CONF_CA_NAME: "ca2", CONF_CA_PATH: "new.crt"})
+
+        # Assert
+        assert result["data"] == {CONF_CAS: {"ca1": "ca1.crt", "ca2": "new.crt"}}
+
+    @pytest.mark.asyncio
+    async def test_remove_ca(self, flow):
+        """Test removing CA files."""
+        # Arrange
+        await flow.async_step_init()
+
+        # Act
+        result = await flow.async_step_remove_ca({CONF_CA_NAMES: ["ca1"]})
+
+        # Assert
+        assert result["data"] == {CONF_CAS: {"ca2": "ca2.crt"}}
+
+    @pytest.mark.asyncio
+    async def test_remove_ca_without_ca(self, flow):
+        """Test the flow aborts when there is no CA to remove."""
+        # Arrange
+        flow._cas = {}
+
+        # Act
+        result = await flow.async_step_remove_ca()
+
+        # Assert
+        assert result["type"] == FlowResultType.ABORT
+        assert result["reason"] == "no_ca"
@@ -0,0 +1,145 @@
+"""Unit tests for discovery.py module."""
+
+import pytest
+import voluptuous as vol
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.additional_ca.const import SCAN_CACHE_STORAGE_KEY, SCAN_CACHE_STORAGE_VERSION
+from custom_components.additional_ca.discovery import (
+    async_load_scan_cache,
+    discover_ca_files,
+    get_discovered_ca_key,
+    merge_discovered_cas,
+    relative_glob,
+)
+
+
+class TestDiscoverCaFiles:
+    """Test cases for discover_ca_files function."""
+
+    @pytest.fixture
+    def config_path(self, tmp_path):
+        """Return a config folder with CA files in subfolders, and other files."""
+        (tmp_path / "corp").mkdir()
+        (tmp_path / "ca.crt").write_bytes(b"ca")
+        (tmp_path / "corp" / "root.PEM").write_bytes(b"ca")
+        (tmp_path / "corp" / "notes.txt").write_bytes(b"notes")
+        (tmp_path / "folder.crt").mkdir()
+        return tmp_path
+
+    def test_discover_all_ca_files(self, config_path):
+        """Test every PEM/CRT file is discovered, recursively, and other files are ignored."""
+        assert discover_ca_files(config_path, "**/*") == ["ca.crt", "corp/root.PEM"]
+
+    def test_discover_ca_files_filtered_by_glob(self, config_path):
+        """Test the glob pattern filters the discovered files."""
+        assert discover_ca_files(config_path, "corp/*") == ["corp/root.PEM"]
+
+    @pytest.mark.parametrize("pattern", ["/etc/*", "../*", "corp/../../*"])
+    def test_discover_ca_files_out_of_config_folder(self, tmp_path, pattern):
+        """Test an absolute glob pattern, or one with '..', is rejected by the config schema and discovers nothing."""
+        # Arrange
+        config_path = tmp_path / "additional_ca"
+        (config_path / "corp").mkdir(parents=True)
+        (tmp_path / "outside.crt").write_bytes(b"ca")
+
+        # Act & Assert
+        with pytest.raises(vol.Invalid):
+            relative_glob(pattern)
+        assert discover_ca_files(config_path, pattern) == []
+
+    def test_discover_ca_files_symlink_out_of_config_folder(self, tmp_path):
+        """Test a CA file reached through a symlink out of the config folder is skipped."""
+        # Arrange
+        config_path = tmp_path / "additional_ca"
+        config_path.mkdir()
+        (tmp_path / "outside").mkdir()
+        (tmp_path / "outside" / "outside.crt").write_bytes(b"ca")
+        (config_path / "ca.crt").write_bytes(b"ca")
+        (config_path / "link").symlink_to(tmp_path / "outside")
+
+        # Act & Assert
+        assert relative_glob("**/*") == "**/*"
+        assert discover_ca_files(config_path, "**/*") == ["ca.crt"]
+
+
+class TestMergeDiscoveredCas:
+    """Test cases for get_discovered_ca_key and merge_discovered_cas functions."""
+
+    def test_get_discovered_ca_key(self):
+        """Test the name of a discovered CA is derived from its relative path."""
+        assert get_discovered_ca_key("some folder/ca-2.pem") == "some_folder_ca_2"
+
+    def test_merge_discovered_cas(self):
+        """Test discovered CA are added after the CA of the config, files of the config keep their name."""
+        # Act
+        merged = merge_discovered_cas({"my_ca": "corp/../ca.crt"}, ["ca.crt", "corp/root.pem"])
+
+        # Assert
+        assert merged == {"my_ca": "corp/../ca.crt", "corp_root": "corp/root.pem"}
+
+    @patch("custom_components.additional_ca.discovery.log")
+    def test_merge_discovered_cas_name_conflict(self, mock_log):
+        """Test a discovered CA whose name is already used is skipped."""
+        # Act
+        merged = merge_discovered_cas({"corp_root": "other.crt"}, ["corp/root.pem", "hot_reload.crt"])
+
+        # Assert
+        assert merged == {"corp_root": "other.crt"}
+        assert mock_log.warning.call_count == 2
+
+
+class TestScanCacheStorage:
+    """Test cases for async_load_scan_cache function."""
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.discovery.Store")
+    async def test_async_load_scan_cache_empty(self, mock_store):
+        """Test an empty cache is returned on first run."""
+        # Arrange
+        mock_store.return_value.async_load = AsyncMock(return_value=None)
+        hass = MagicMock(spec=HomeAssistant)
+
+        # Act
+        scan_cache = await async_load_scan_cache(hass)
+
+        # Assert
+        assert scan_cache == {}
+        mock_store.assert_called_once_with(hass, SCAN_CACHE_STORAGE_VERSION, SCAN_CACHE_STORAGE_KEY)
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.discovery.Store")
+    async def test_async_load_scan_cache_other_version(self, mock_store):
+        """Test a cache saved with another format version is discarded instead of failing the run."""
+        # Arrange
+        mock_store.return_value.async_load = AsyncMock(side_effect=NotImplementedError)
+        hass = MagicMock(spec=HomeAssistant)
+
+        # Act
+        scan_cache = await async_load_scan_cache(hass)
+
+        # Assert
+        assert scan_cache == {}
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.discovery.Store")
+    async def test_async_load_scan_cache_damaged_entries(self, mock_store):
+        """Test damaged entries are left out, so their CA files are parsed again."""
+        # Arrange
+        entry = {"stat": [1, 2, 3], "sha256": "abc", "certs": [{"fingerprint": "def"}]}
+        mock_store.return_value.async_load = AsyncMock(
+            return_value={
+                "/config/additional_ca/ca.crt": entry,
+                "/config/additional_ca/no_stat.crt": {"sha256": "abc", "certs": []},
+                "/config/additional_ca/old.crt": {"stat": [1, 2, 3], "sha256": "abc", "certs": [{"common_name": "Old CA"}]},
+            }
+        )
+        hass = MagicMock(spec=HomeAssistant)
+
+        # Act
+        scan_cache = await async_load_scan_cache(hass)
+
+        # Assert
+        assert scan_cache == {"/config/additional_ca/ca.crt": entry}
@@ -0,0 +1,652 @@
+"""Unit tests for __init__.py module."""
+
+import asyncio
+import copy
+import hashlib
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.additional_ca import (
+    async_load_last_applied_cas,
+    async_register_services,
+    async_setup,
+    async_setup_entry,
+    plan_ca_certificates,
+    update_ca_certificates,
+)
+from custom_components.additional_ca.backends import NativeBackend
+from custom_components.additional_ca.const import (
+    APPLIED_CONFIG_KEY,
+    AUTO_DISCOVERY,
+    CA_METADATA_KEY,
+    DOMAIN,
+    HOT_RELOAD,
+    MANIFEST_STORAGE_KEY,
+    MINIMAL_TRUST,
+    RUN_STATS_KEY,
+    SERVICE_PLAN,
+    SERVICE_RELOAD,
+    SERVICE_VERIFY,
+    TRANSACTION_DIRNAME,
+)
+from custom_components.additional_ca.exceptions import TrustStoreException
+from custom_components.additional_ca.stats import RunStats
+
+
+@pytest.fixture
+def entry():
+    """Return a mocked config entry of Additional CA."""
+    entry = MagicMock(spec=ConfigEntry)
+    entry.entry_id = "entry_id"
+    entry.data = {}
+    return entry
+
+
+@pytest.fixture
+def hass(hass, tmp_path):
+    """Return a hass mock with a config folder and config entries."""
+    hass.config = MagicMock()
+    hass.config.path = lambda *path: str(tmp_path.joinpath(*path))
+    hass.config_entries = MagicMock()
+    hass.config_entries.async_forward_entry_setups = AsyncMock()
+    return hass
+
+
+class TestAsyncSetupEntry:
+    """Test cases for async_setup_entry function."""
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.async_start_watcher")
+    @patch("custom_components.additional_ca.get_ca_config", return_value={DOMAIN: {HOT_RELOAD: True, "ca": "ca.crt"}})
+    async def test_async_setup_entry_watcher_stopped_on_unload(self, mock_config, mock_watcher, hass, entry):
+        """Test the watcher of option 'hot_reload' is stopped when the entry is unloaded."""
+        # Arrange
+        stop_watching = MagicMock()
+        mock_watcher.return_value = stop_watching
+
+        # Act
+        await async_setup_entry(hass, entry)
+
+        # Assert
+        mock_watcher.assert_awaited_once()
+        entry.async_on_unload.assert_any_call(stop_watching)
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.async_start_watcher")
+    @patch("custom_components.additional_ca.get_ca_config", return_value={DOMAIN: {"ca": "ca.crt"}})
+    async def test_async_setup_entry_without_hot_reload(self, mock_config, mock_watcher, hass, entry):
+        """Test no watcher is started without option 'hot_reload'."""
+        # Act
+        await async_setup_entry(hass, entry)
+
+        # Assert
+        mock_watcher.assert_not_called()
+
+
+class TestAsyncSetup:
+    """Test cases for async_setup function."""
+
+    @pytest.fixture
+    def setup(self, hass, tmp_path):
+        """Create the config folder without CA managed in the UI, and patch the services and the backend of the setup."""
+        (tmp_path / "additional_ca").mkdir()
+        hass.config_entries.async_entries.return_value = []
+        with patch("custom_components.additional_ca.async_register_services") as mock_register, patch(
+            "custom_components.additional_ca.async_get_backend", new_callable=AsyncMock
+        ), patch("custom_components.additional_ca.verify_hass_ssl_context", new_callable=AsyncMock) as mock_verify, patch(
+            "custom_components.additional_ca.async_dispatcher_send"
+        ):
+            yield {"register": mock_register, "verify": mock_verify}
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.update_ca_certificates", new_callable=AsyncMock)
+    @patch("custom_components.additional_ca.async_load_last_applied_cas", new_callable=AsyncMock, return_value={"ca.crt": {"common_name": "CA"}})
+    async def test_async_setup_fast_path(self, mock_load, mock_update, hass, setup):
+        """Test the CA of the last run are trusted right away, and the CA files are checked in a background task."""
+        # Act
+        result = await async_setup(hass, {DOMAIN: {"ca": "ca.crt"}})
+
+        # Assert
+        assert result is True
+        assert hass.data[CA_METADATA_KEY] == {"ca.crt": {"common_name": "CA"}}
+        assert hass.data[APPLIED_CONFIG_KEY] == {"ca": "ca.crt"}
+        assert "fast_path" in hass.data[RUN_STATS_KEY].phases
+        mock_update.assert_not_called()
+        setup["verify"].assert_not_called()
+        setup["register"].assert_called_once_with(hass)
+        hass.async_create_background_task.assert_called_once()
+        hass.async_create_background_task.call_args.args[0].close()
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.update_ca_certificates", new_callable=AsyncMock, return_value={"ca.crt": {"common_name": "CA"}})
+    @patch("custom_components.additional_ca.async_load_last_applied_cas", new_callable=AsyncMock, return_value=None)
+    async def test_async_setup_without_fast_path(self, mock_load, mock_update, hass, setup):
+        """Test the CA files are processed and the SSL context of Home Assistant verified when the last run cannot be trusted as is."""
+        # Act
+        result = await async_setup(hass, {DOMAIN: {"ca": "ca.crt"}})
+
+        # Assert
+        assert result is True
+        assert hass.data[CA_METADATA_KEY] == {"ca.crt": {"common_name": "CA"}}
+        assert hass.data[APPLIED_CONFIG_KEY] == {"ca": "ca.crt"}
+        mock_update.assert_awaited_once_with(hass, {DOMAIN: {"ca": "ca.crt"}}, hass.data[RUN_STATS_KEY])
+        setup["verify"].assert_awaited_once()
+        setup["register"].assert_called_once_with(hass)
+        hass.async_create_background_task.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.update_ca_certificates", new_callable=AsyncMock, side_effect=TrustStoreException("rebuild failed"))
+    @patch("custom_components.additional_ca.async_load_last_applied_cas", new_callable=AsyncMock, return_value={"ca.crt": {"common_name": "CA"}})
+    async def test_async_setup_background_check_failure(self, mock_load, mock_update, hass, setup):
+        """Test a failed background check is logged and kept for diagnostics, and the CA of the last run stay trusted."""
+        # Arrange
+        await async_setup(hass, {DOMAIN: {"ca": "ca.crt"}})
+        background_check = hass.async_create_background_task.call_args.args[0]
+
+        # Act
+        await background_check
+
+        # Assert
+        mock_update.assert_awaited_once()
+        assert hass.data[RUN_STATS_KEY].trigger == "background"
+        assert hass.data[RUN_STATS_KEY].error == "rebuild failed"
+        assert hass.data[CA_METADATA_KEY] == {"ca.crt": {"common_name": "CA"}}
+        setup["verify"].assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_async_setup_without_config_folder(self, hass):
+        """Test the setup fails without the config folder."""
+        # Arrange
+        hass.config_entries.async_entries.return_value = []
+
+        # Act
+        result = await async_setup(hass, {DOMAIN: {"ca": "ca.crt"}})
+
+        # Assert
+        assert result is False
+
+
+class TestAsyncLoadLastAppliedCas:
+    """Test cases for async_load_last_applied_cas function."""
+
+    @pytest.fixture
+    def backend(self, tmp_path):
+        """Return a native backend with the system CA bundle of the last run, patched as the backend of the config."""
+        backend = NativeBackend(tmp_path / "ca-certificates", tmp_path / "ca-certificates.crt")
+        backend.bundle_path.write_bytes(b"bundle")
+        with patch("custom_components.additional_ca.async_get_backend", AsyncMock(return_value=backend)):
+            yield backend
+
+    @pytest.fixture
+    def last_run(self, tmp_path, backend):
+        """Patch the manifest and the scan cache of a last run which installed 'corp', and skipped 'public' already trusted by the system."""
+        config_path = tmp_path / "additional_ca"
+        manifest = {
+            "cas": {"corp_corp.crt": {"source": "corp.crt", "sha256": "a"}},
+            "bundle_sha256": hashlib.sha256(b"bundle").hexdigest(),
+            "owned": ["corp_corp.crt"],
+            "system_fingerprints": ["public_fp"],
+        }
+        scan_cache = {
+            str(config_path / "corp.crt"): {"stat": [1, 2, 3], "sha256": "a", "certs": [{"fingerprint": "corp_fp", "common_name": "Corp"}]},
+            str(config_path / "public.crt"): {"stat": [4, 5, 6], "sha256": "b", "certs": [{"fingerprint": "public_fp", "common_name": "Public"}]},
+        }
+        with patch("custom_components.additional_ca.async_load_manifest", AsyncMock(return_value=manifest)), patch(
+            "custom_components.additional_ca.async_load_scan_cache", AsyncMock(return_value=scan_cache)
+        ), patch("custom_components.additional_ca.refresh_hass_ssl_contexts", new_callable=AsyncMock) as mock_refresh:
+            yield {"manifest": manifest, "refresh": mock_refresh}
+
+    @pytest.mark.asyncio
+    async def test_async_load_last_applied_cas(self, hass, backend, last_run):
+        """Test the CA of the last run are loaded from the cache, without parsing the CA files of the system."""
+        # Arrange
+        config = {DOMAIN: {"corp": "corp.crt", "public": "public.crt"}}
+
+        # Act
+        with patch.object(backend, "get_system_fingerprints") as mock_system_fingerprints:
+            result = await async_load_last_applied_cas(hass, config)
+
+        # Assert
+        assert set(result) == {"corp.crt", "public.crt"}
+        mock_system_fingerprints.assert_not_called()
+        last_run["refresh"].assert_awaited_once_with(hass, result, backend.bundle_path, backend.capath)
+
+    @pytest.mark.asyncio
+    async def test_async_load_last_applied_cas_bundle_changed(self, hass, backend, last_run):
+        """Test the CA files are processed first when the system CA bundle changed since the last run."""
+        # Arrange
+        backend.bundle_path.write_bytes(b"rebuilt by another tool")
+
+        # Act
+        result = await async_load_last_applied_cas(hass, {DOMAIN: {"corp": "corp.crt", "public": "public.crt"}})
+
+        # Assert
+        assert result is None
+        last_run["refresh"].assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_async_load_last_applied_cas_config_changed(self, hass, backend, last_run):
+        """Test the CA files are processed first when the config wants CA files the last run did not install, or the system no longer trusts a skipped CA."""
+        # Act
+        new_ca = await async_load_last_applied_cas(hass, {DOMAIN: {"corp": "corp.crt", "other": "other.crt"}})
+        renamed_system_ca = await async_load_last_applied_cas(hass, {DOMAIN: {"corp": "corp.crt", "public_copy": "public.crt"}})
+        last_run["manifest"]["system_fingerprints"] = []
+        system_changed = await async_load_last_applied_cas(hass, {DOMAIN: {"corp": "corp.crt", "public": "public.crt"}})
+
+        # Assert
+        assert new_ca is None
+        assert renamed_system_ca is not None
+        assert system_changed is None
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.use_minimal_trust_bundle")
+    async def test_async_load_last_applied_cas_minimal_trust(self, mock_use, hass, backend, last_run, tmp_path):
+        """Test HA loads the CA bundle of option 'minimal_trust' of the last run, which is processed first if the bundle is gone."""
+        # Arrange
+        config = {DOMAIN: {MINIMAL_TRUST: True, "corp": "corp.crt", "public": "public.crt"}}
+        last_run["manifest"]["trust_policy"] = {"allow": []}
+        minimal_trust_bundle_path = tmp_path / ".storage" / "additional_ca.minimal_trust.crt"
+
+        # Act
+        without_bundle = await async_load_last_applied_cas(hass, config)
+        minimal_trust_bundle_path.parent.mkdir()
+        minimal_trust_bundle_path.write_bytes(b"minimal bundle")
+        result = await async_load_last_applied_cas(hass, config)
+
+        # Assert
+        assert without_bundle is None
+        assert set(result) == {"corp.crt", "public.crt"}
+        mock_use.assert_called_once_with(minimal_trust_bundle_path)
+        last_run["refresh"].assert_awaited_once_with(hass, result, minimal_trust_bundle_path, None)
+
+    @pytest.mark.asyncio
+    async def test_async_load_last_applied_cas_auto_discovery(self, hass, backend, last_run):
+        """Test the CA files are processed first with option 'auto_discovery', they are only known once the folder is scanned."""
+        # Act
+        result = await async_load_last_applied_cas(hass, {DOMAIN: {AUTO_DISCOVERY: True, "corp": "corp.crt"}})
+
+        # Assert
+        assert result is None
+
+
+class TestServices:
+    """Test cases for the actions registered by async_register_services function."""
+
+    @pytest.fixture
+    def services(self, hass):
+        """Register the actions on a hass mock running tasks in the event loop, and return their handlers by name."""
+        hass.services = MagicMock()
+        hass.async_create_task = lambda coro, *args, **kwargs: asyncio.get_running_loop().create_task(coro)
+        async_register_services(hass)
+        return {call.args[1]: call.args[2] for call in hass.services.async_register.call_args_list}
+
+    @pytest.fixture(autouse=True)
+    def config(self):
+        """Patch the config and the backend of the actions."""
+        with patch("custom_components.additional_ca.get_ca_config", return_value={DOMAIN: {"ca": "ca.crt"}}), patch(
+            "custom_components.additional_ca.async_get_backend", new_callable=AsyncMock
+        ), patch("custom_components.additional_ca.verify_hass_ssl_context", new_callable=AsyncMock), patch(
+            "custom_components.additional_ca.async_dispatcher_send"
+        ):
+            yield
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.update_ca_certificates", new_callable=AsyncMock)
+    async def test_reload_single_flight(self, mock_update, services):
+        """Test calls made during a reload wait for it instead of starting another one, and a later call reloads again."""
+        # Arrange
+        release = asyncio.Event()
+
+        async def slow_update(*args):
+            await release.wait()
+            return {}
+
+        mock_update.side_effect = slow_update
+
+        # Act
+        calls = [asyncio.ensure_future(services[SERVICE_RELOAD](MagicMock())) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*calls)
+        calls_in_flight = mock_update.await_count
+        await services[SERVICE_RELOAD](MagicMock())
+
+        # Assert
+        assert calls_in_flight == 1
+        assert mock_update.await_count == 2
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.update_ca_certificates", new_callable=AsyncMock, side_effect=Exception("rebuild failed"))
+    async def test_reload_failure(self, mock_update, hass, services):
+        """Test the action fails when the reload failed, and the error is kept for diagnostics."""
+        # Act & Assert
+        with pytest.raises(HomeAssistantError, match="rebuild failed"):
+            await services[SERVICE_RELOAD](MagicMock())
+        assert hass.data[RUN_STATS_KEY].error == "rebuild failed"
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.check_hass_ssl_context", new_callable=AsyncMock, return_value=["b.crt"])
+    async def test_verify(self, mock_check, hass, services):
+        """Test the action lists the CA checked in the SSL context of Home Assistant, and the missing ones."""
+        # Arrange
+        hass.data[CA_METADATA_KEY] = {"b.crt": {}, "a.crt": {}}
+
+        # Act
+        result = await services[SERVICE_VERIFY](MagicMock())
+
+        # Assert
+        assert result == {"checked": ["a.crt", "b.crt"], "missing": ["b.crt"]}
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.plan_ca_certificates", new_callable=AsyncMock, return_value={"rebuild": False})
+    async def test_plan(self, mock_plan, hass, services):
+        """Test the action returns the plan of the config in effect."""
+        # Act
+        result = await services[SERVICE_PLAN](MagicMock())
+
+        # Assert
+        assert result == {"rebuild": False}
+        mock_plan.assert_awaited_once_with(hass, {DOMAIN: {"ca": "ca.crt"}})
+
+
+class TestPlanCaCertificates:
+    """Test cases for plan_ca_certificates function."""
+
+    @pytest.fixture
+    def backend(self, tmp_path):
+        """Return a native backend without system CA, patched as the backend of the config."""
+        backend = NativeBackend(tmp_path / "ca-certificates", tmp_path / "ca-certificates.crt")
+        backend.ca_path.mkdir()
+        with patch("custom_components.additional_ca.async_get_backend", AsyncMock(return_value=backend)), patch.object(
+            backend, "get_system_fingerprints", return_value=set()
+        ), patch("custom_components.additional_ca.async_load_scan_cache", AsyncMock(return_value={})):
+            yield backend
+
+    @pytest.fixture
+    def ca_pem(self, tmp_path, make_ca_pem):
+        """Write the CA file 'ca.crt' in the config folder."""
+        ca_pem = make_ca_pem("Plan CA")
+        (tmp_path / "additional_ca").mkdir()
+        (tmp_path / "additional_ca" / "ca.crt").write_bytes(ca_pem)
+        return ca_pem
+
+    def applied(self, backend, ca_pem, **manifest) -> dict:
+        """Install the CA file and the bundle like a last run did, and return its manifest."""
+        (backend.ca_path / "ca_ca.crt").write_bytes(ca_pem)
+        backend.bundle_path.write_bytes(ca_pem)
+        sha256 = hashlib.sha256(ca_pem).hexdigest()
+        return {"cas": {"ca_ca.crt": {"source": "ca.crt", "sha256": sha256}}, "bundle_sha256": sha256, "owned": ["ca_ca.crt"], **manifest}
+
+    async def plan(self, hass, manifest: dict, config: dict) -> dict:
+        """Plan the config against a manifest."""
+        with patch("custom_components.additional_ca.async_load_manifest", AsyncMock(return_value=manifest)):
+            return await plan_ca_certificates(hass, {DOMAIN: config})
+
+    @pytest.mark.asyncio
+    async def test_plan_first_run(self, hass, backend, ca_pem):
+        """Test a CA file never installed is added, and the system CA trust store rebuilt."""
+        # Act
+        plan = await self.plan(hass, {"cas": {}, "bundle_sha256": None, "owned": []}, {"ca": "ca.crt"})
+
+        # Assert
+        assert plan["add"] == ["ca_ca.crt"]
+        assert plan["rebuild"] is True
+
+    @pytest.mark.asyncio
+    async def test_plan_up_to_date(self, hass, backend, ca_pem):
+        """Test nothing is rebuilt when the CA files and the bundle are the ones of the last run."""
+        # Act
+        plan = await self.plan(hass, self.applied(backend, ca_pem), {"ca": "ca.crt"})
+
+        # Assert
+        assert plan["unchanged"] == ["ca_ca.crt"]
+        assert plan["rebuild"] is False
+
+    @pytest.mark.asyncio
+    async def test_plan_rebuild_reasons(self, hass, backend, ca_pem):
+        """Test the system CA trust store is rebuilt for a removed CA or a bundle changed by another tool, not for a changed trust policy."""
+        # Act
+        removed = await self.plan(hass, self.applied(backend, ca_pem, owned=["ca_ca.crt", "old_old.crt"]), {"ca": "ca.crt"})
+        policy_changed = await self.plan(hass, self.applied(backend, ca_pem, trust_policy={"allow": []}), {"ca": "ca.crt"})
+        manifest = self.applied(backend, ca_pem)
+        backend.bundle_path.write_bytes(b"rebuilt by another tool")
+        bundle_changed = await self.plan(hass, manifest, {"ca": "ca.crt"})
+
+        # Assert
+        assert removed["remove"] == ["old_old.crt"]
+        assert removed["rebuild"] is True
+        assert policy_changed["rebuild"] is False
+        assert bundle_changed["rebuild"] is True
+
+    @pytest.mark.asyncio
+    async def test_plan_deduplicated(self, hass, backend, ca_pem):
+        """Test a CA file already trusted by the system is neither added nor rebuilt."""
+        # Arrange
+        fingerprint = x509.load_pem_x509_certificate(ca_pem).fingerprint(hashes.SHA256()).hex()
+        backend.get_system_fingerprints.return_value = {fingerprint}
+        backend.bundle_path.write_bytes(b"system bundle")
+
+        # Act
+        plan = await self.plan(hass, {"cas": {}, "bundle_sha256": hashlib.sha256(b"system bundle").hexdigest(), "owned": []}, {"ca": "ca.crt"})
+
+        # Assert
+        assert plan["deduplicated"] == {"ca": "system"}
+        assert plan["add"] == []
+        assert plan["rebuild"] is False
+
+
+class TestUpdateCaCertificates:
+    """Test cases for update_ca_certificates function, against a trust store in a temporary folder."""
+
+    @pytest.fixture
+    def system_pem(self, make_ca_pem):
+        """Return the CA trusted by the system."""
+        return make_ca_pem("System CA")
+
+    @pytest.fixture
+    def backend(self, make_memory_backend, system_pem):
+        """Return a memory backend with a system CA, patched as the backend of the config."""
+        backend = make_memory_backend(system_pem)
+        with patch("custom_components.additional_ca.async_get_backend", AsyncMock(return_value=backend)):
+            yield backend
+
+    @pytest.fixture(autouse=True)
+    def storage(self):
+        """Patch the HA storage of the manifest and the scan cache with a dict."""
+        data = {}
+
+        class DictStore:
+            def __init__(self, hass, version, key):
+                self.key = key
+
+            async def async_load(self):
+                return copy.deepcopy(data.get(self.key))
+
+            async def async_save(self, value):
+                data[self.key] = copy.deepcopy(value)
+
+        with patch("custom_components.additional_ca.manifest.Store", DictStore), patch("custom_components.additional_ca.discovery.Store", DictStore):
+            yield data
+
+    @pytest.fixture
+    def write_ca(self, tmp_path, make_ca_pem):
+        """Return a factory writing a CA file in the config folder."""
+        config_path = tmp_path / "additional_ca"
+        config_path.mkdir()
+
+        def _write_ca(filename: str, ca_pem: bytes | None = None) -> bytes:
+            ca_pem = ca_pem or make_ca_pem(filename)
+            (config_path / filename).write_bytes(ca_pem)
+            return ca_pem
+
+        return _write_ca
+
+    @pytest.mark.asyncio
+    async def test_update_add(self, hass, backend, storage, system_pem, write_ca, fingerprint):
+        """Test a new CA file is installed and rebuilt into the bundle, after the CA of the system."""
+        # Arrange
+        ca_pem = write_ca("ca.crt")
+
+        # Act
+        ca_files = await update_ca_certificates(hass, {DOMAIN: {"ca": "ca.crt"}})
+
+        # Assert
+        assert list(ca_files) == ["ca.crt"]
+        assert backend.cas == {"ca_ca.crt": ca_pem}
+        assert backend.read_bundle() == system_pem + ca_pem
+        assert backend.rebuilds == 1
+        assert storage[MANIFEST_STORAGE_KEY]["owned"] == ["ca_ca.crt"]
+        assert storage[MANIFEST_STORAGE_KEY]["bundle_sha256"] == hashlib.sha256(system_pem + ca_pem).hexdigest()
+        assert ca_files["ca.crt"]["fingerprint"] == fingerprint(ca_pem)
+
+    @pytest.mark.asyncio
+    async def test_update_up_to_date(self, hass, backend, write_ca):
+        """Test a second run with the same CA files rebuilds nothing."""
+        # Arrange
+        write_ca("ca.crt")
+        await update_ca_certificates(hass, {DOMAIN: {"ca": "ca.crt"}})
+        stats = RunStats()
+
+        # Act
+        ca_files = await update_ca_certificates(hass, {DOMAIN: {"ca": "ca.crt"}}, stats)
+
+        # Assert
+        assert list(ca_files) == ["ca.crt"]
+        assert backend.rebuilds == 1
+        assert stats.cache["trust_store"] == {"hits": 1, "misses": 0}
+        assert stats.cache["scan"] == {"hits": 1, "misses": 0}
+
+    @pytest.mark.asyncio
+    async def test_update_deduplicated(self, hass, backend, storage, system_pem, write_ca, fingerprint):
+        """Test a CA already trusted by the system, or by a CA file earlier in the config, is not installed."""
+        # Arrange
+        ca_pem = write_ca("ca.crt")
+        write_ca("copy.crt", ca_pem)
+        write_ca("system.crt", system_pem)
+        stats = RunStats()
+
+        # Act
+        ca_files = await update_ca_certificates(hass, {DOMAIN: {"ca": "ca.crt", "copy": "copy.crt", "system": "system.crt"}}, stats)
+
+        # Assert
+        assert stats.deduplicated == {"copy": "ca", "system": "system"}
+        assert backend.cas == {"ca_ca.crt": ca_pem}
+        assert backend.read_bundle() == system_pem + ca_pem
+        assert set(ca_files) == {"ca.crt", "copy.crt", "system.crt"}
+        assert storage[MANIFEST_STORAGE_KEY]["system_fingerprints"] == [fingerprint(system_pem)]
+
+    @pytest.mark.asyncio
+    async def test_update_deduplicated_once_shipped_by_system(self, hass, backend, storage, system_pem, write_ca):
+        """Test a CA installed by a previous run is removed from the trust store once the system ships it, and still checked."""
+        # Arrange
+        ca_pem = write_ca("ca.crt")
+        await update_ca_certificates(hass, {DOMAIN: {"ca": "ca.crt"}})
+        backend.base_bundle = system_pem + ca_pem
+        stats = RunStats()
+
+        # Act
+        ca_files = await update_ca_certificates(hass, {DOMAIN: {"ca": "ca.crt"}}, stats)
+
+        # Assert
+        assert stats.deduplicated == {"ca": "system"}
+        assert backend.cas == {}
+        assert backend.read_bundle() == system_pem + ca_pem
+        assert list(ca_files) == ["ca.crt"]
+        assert storage[MANIFEST_STORAGE_KEY]["owned"] == []
+        assert storage[MANIFEST_STORAGE_KEY]["cas"] == {}
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.use_minimal_trust_bundle")
+    async def test_update_minimal_trust(self, mock_use, hass, backend, storage, system_pem, write_ca, tmp_path):
+        """Test option 'minimal_trust' writes a reduced copy of the system CA bundle for HA, leaves the system CA bundle untouched,
+        and is turned off without rebuilding the system CA trust store.
+        """
+        # Arrange
+        ca_pem = write_ca("ca.crt")
+        minimal_trust_bundle_path = tmp_path / ".storage" / "additional_ca.minimal_trust.crt"
+
+        # Act
+        await update_ca_certificates(hass, {DOMAIN: {MINIMAL_TRUST: True, "ca": "ca.crt"}})
+        minimal_bundle = minimal_trust_bundle_path.read_bytes()
+        mock_use.assert_called_once_with(minimal_trust_bundle_path)
+        await update_ca_certificates(hass, {DOMAIN: {"ca": "ca.crt"}})
+
+        # Assert
+        assert minimal_bundle == ca_pem
+        assert backend.read_bundle() == system_pem + ca_pem
+        assert not minimal_trust_bundle_path.exists()
+        mock_use.assert_called_with(None)
+        assert backend.rebuilds == 1
+        assert "trust_policy" not in storage[MANIFEST_STORAGE_KEY]
+
+    @pytest.mark.asyncio
+    async def test_update_rollback(self, hass, backend, storage, system_pem, write_ca):
+        """Test a failed rebuild restores the CA files and the bundle of the last run, and keeps its manifest."""
+        # Arrange
+        ca_pem = write_ca("ca.crt")
+        await update_ca_certificates(hass, {DOMAIN: {"ca": "ca.crt"}})
+        manifest = copy.deepcopy(storage[MANIFEST_STORAGE_KEY])
+        write_ca("ca.crt")
+        write_ca("new.crt")
+        backend.rebuild_error = Exception("rebuild failed")
+
+        # Act
+        with pytest.raises(Exception, match="rebuild failed"):
+            await update_ca_certificates(hass, {DOMAIN: {"ca": "ca.crt", "new": "new.crt"}})
+
+        # Assert
+        assert backend.cas == {"ca_ca.crt": ca_pem}
+        assert backend.read_bundle() == system_pem + ca_pem
+        assert not (backend.ca_path / TRANSACTION_DIRNAME).exists()
+        assert storage[MANIFEST_STORAGE_KEY] == manifest
+
+    @pytest.mark.asyncio
+    async def test_update_invalid_ca(self, hass, backend, storage, system_pem, write_ca):
+        """Test an invalid CA among valid ones is found by bisection and left out, the valid ones are loaded and the error names the invalid one only."""
+        # Arrange
+        ca_pem = write_ca("ca.crt")
+        await update_ca_certificates(hass, {DOMAIN: {"ca": "ca.crt"}})
+        a_pem = write_ca("a.crt")
+        bad_pem = write_ca("bad.crt")
+        c_pem = write_ca("c.crt")
+        d_pem = write_ca("d.crt")
+        rebuild = backend.async_rebuild
+
+        async def async_rebuild(hass, timeout):
+            if bad_pem in backend.cas.values():
+                raise Exception("rejected by the system")
+            await rebuild(hass, timeout)
+
+        backend.async_rebuild = async_rebuild
+
+        # Act
+        with pytest.raises(TrustStoreException, match=r"^Unable to load CA\(s\): bad.crt$"):
+            await update_ca_certificates(hass, {DOMAIN: {"ca": "ca.crt", "a": "a.crt", "bad": "bad.crt", "c": "c.crt", "d": "d.crt"}})
+
+        # Assert
+        assert backend.cas == {"a_a.crt": a_pem, "c_c.crt": c_pem, "ca_ca.crt": ca_pem, "d_d.crt": d_pem}
+        assert backend.read_bundle() == system_pem + a_pem + c_pem + ca_pem + d_pem
+        assert not (backend.ca_path / TRANSACTION_DIRNAME).exists()
+        assert sorted(storage[MANIFEST_STORAGE_KEY]["cas"]) == ["a_a.crt", "c_c.crt", "ca_ca.crt", "d_d.crt"]
+
+    @pytest.mark.asyncio
+    async def test_update_remove(self, hass, backend, storage, system_pem, write_ca):
+        """Test a CA file removed from the config is removed from the trust store and the bundle."""
+        # Arrange
+        ca_pem = write_ca("ca.crt")
+        write_ca("old.crt")
+        await update_ca_certificates(hass, {DOMAIN: {"ca": "ca.crt", "old": "old.crt"}})
+
+        # Act
+        ca_files = await update_ca_certificates(hass, {DOMAIN: {"ca": "ca.crt"}})
+
+        # Assert
+        assert list(ca_files) == ["ca.crt"]
+        assert backend.cas == {"ca_ca.crt": ca_pem}
+        assert backend.read_bundle() == system_pem + ca_pem
+        assert storage[MANIFEST_STORAGE_KEY]["owned"] == ["ca_ca.crt"]
@@ -0,0 +1,124 @@
+"""Unit tests for manifest.py module."""
+
+import hashlib
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.additional_ca.manifest import (
+    async_load_manifest,
+    async_save_manifest,
+    file_sha256,
+)
+from custom_components.additional_ca.const import MANIFEST_STORAGE_KEY, MANIFEST_STORAGE_VERSION
+
+
+class TestFileSha256:
+    """Test cases for file_sha256 function."""
+
+    def test_file_sha256_existing_file(self, tmp_path):
+        """Test digest of an existing file."""
+        # Arrange
+        path = tmp_path / "ca.crt"
+        path.write_bytes(b"certificate")
+
+        # Act & Assert
+        assert file_sha256(path) == hashlib.sha256(b"certificate").hexdigest()
+
+    def test_file_sha256_missing_file(self, tmp_path):
+        """Test digest of a missing file."""
+        assert file_sha256(tmp_path / "missing.crt") is None
+
+
+class TestManifestStorage:
+    """Test cases for async_load_manifest and async_save_manifest functions."""
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.manifest.Store")
+    async def test_async_load_manifest_empty(self, mock_store):
+        """Test that an empty manifest is returned on first run."""
+        # Arrange
+        hass = MagicMock(spec=HomeAssistant)
+        mock_store.return_value.async_load = AsyncMock(return_value=None)
+
+        # Act
+        result = await async_load_manifest(hass)
+
+        # Assert
+        assert result == {"cas": {}, "bundle_sha256": None, "owned": []}
+        mock_store.assert_called_once_with(hass, MANIFEST_STORAGE_VERSION, MANIFEST_STORAGE_KEY)
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.manifest.Store")
+    async def test_async_save_manifest(self, mock_store):
+        """Test that the manifest is saved with the bundle digest."""
+        # Arrange
+        hass = MagicMock(spec=HomeAssistant)
+        mock_store.return_value.async_save = AsyncMock()
+        cas = {"my_ca_ca.crt": {"source": "ca.crt", "sha256": "abc"}}
+
+        # Act
+        await async_save_manifest(hass, cas, "def")
+
+        # Assert
+        mock_store.return_value.async_save.assert_called_once_with({"cas": cas, "bundle_sha256": "def", "owned": ["my_ca_ca.crt"]})
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.manifest.Store")
+    async def test_async_save_manifest_owned(self, mock_store):
+        """Test that the owned files are saved sorted."""
+        # Arrange
+        hass = MagicMock(spec=HomeAssistant)
+        mock_store.return_value.async_save = AsyncMock()
+
+        # Act
+        await async_save_manifest(hass, {}, None, owned={"b.crt", "a.crt"})
+
+        # Assert
+        mock_store.return_value.async_save.assert_called_once_with({"cas": {}, "bundle_sha256": None, "owned": ["a.crt", "b.crt"]})
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.manifest.Store")
+    async def test_async_save_manifest_trust_policy(self, mock_store):
+        """Test that the trust policy of the bundle is saved when the bundle is reduced."""
+        # Arrange
+        hass = MagicMock(spec=HomeAssistant)
+        mock_store.return_value.async_save = AsyncMock()
+
+        # Act
+        await async_save_manifest(hass, {}, "def", owned=set(), trust_policy={"allow": ["ISRG Root X1"]})
+
+        # Assert
+        mock_store.return_value.async_save.assert_called_once_with(
+            {"cas": {}, "bundle_sha256": "def", "owned": [], "trust_policy": {"allow": ["ISRG Root X1"]}}
+        )
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.manifest.Store")
+    async def test_async_save_manifest_system_fingerprints(self, mock_store):
+        """Test that the fingerprints of the configured CA trusted by the system are saved sorted."""
+        # Arrange
+        hass = MagicMock(spec=HomeAssistant)
+        mock_store.return_value.async_save = AsyncMock()
+
+        # Act
+        await async_save_manifest(hass, {}, "def", owned=set(), system_fingerprints={"b", "a"})
+
+        # Assert
+        mock_store.return_value.async_save.assert_called_once_with({"cas": {}, "bundle_sha256": "def", "owned": [], "system_fingerprints": ["a", "b"]})
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.manifest.Store")
+    async def test_async_load_manifest_without_owned(self, mock_store):
+        """Test that a manifest saved before ownership tracking owns its installed CA."""
+        # Arrange
+        hass = MagicMock(spec=HomeAssistant)
+        cas = {"my_ca_ca.crt": {"source": "ca.crt", "sha256": "abc"}}
+        mock_store.return_value.async_load = AsyncMock(return_value={"cas": cas, "bundle_sha256": "def"})
+
+        # Act
+        result = await async_load_manifest(hass)
+
+        # Assert
+        assert result["owned"] == ["my_ca_ca.crt"]
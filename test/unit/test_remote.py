@@ -0,0 +1,298 @@
+"""Unit tests for remote.py module."""
+
+import hashlib
+
+import aiohttp
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from custom_components.additional_ca.bundle import pem_to_der
+from custom_components.additional_ca.remote import (
+    async_fetch_remote_ca,
+    async_fetch_remote_cas,
+    get_ca_filename,
+    get_ca_src_path,
+    get_remote_ca_path,
+    get_remote_ca_pins,
+    is_remote_ca,
+    is_secure_remote_ca,
+    remove_stale_remote_cas,
+)
+from custom_components.additional_ca.stats import RunStats
+
+
+@pytest_asyncio.fixture
+async def ca_server(make_ca_pem):
+    """Serve a CA over HTTP with an ETag, answering 304 to a matching conditional request."""
+    state = {"pem": make_ca_pem("Remote CA"), "etag": '"v1"', "requests": []}
+
+    async def handle(request: web.Request) -> web.Response:
+        state["requests"].append(dict(request.headers))
+        if request.headers.get(aiohttp.hdrs.IF_NONE_MATCH) == state["etag"]:
+            return web.Response(status=304)
+        return web.Response(body=state["pem"], headers={aiohttp.hdrs.ETAG: state["etag"]})
+
+    app = web.Application()
+    app.router.add_get("/pki/root.crt", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    state["url"] = f"http://127.0.0.1:{port}/pki/root.crt"
+    yield state
+    await runner.cleanup()
+
+
+class TestRemoteCaPaths:
+    """Test cases for is_remote_ca, get_ca_filename and get_ca_src_path functions."""
+
+    def test_is_remote_ca(self):
+        """Test only HTTP(S) URLs are remote CA."""
+        assert is_remote_ca("https://pki.example.com/root.crt") is True
+        assert is_remote_ca("http://pki.example.com/root.crt") is True
+        assert is_remote_ca("corp/root.crt") is False
+
+    def test_get_ca_filename(self):
+        """Test the file name of a CA is the last segment of its URL, if it is a CA file name."""
+        assert get_ca_filename("corp/root.crt") == "root.crt"
+        assert get_ca_filename("https://pki.example.com/pki/root.pem?v=2") == "root.pem"
+        assert get_ca_filename("https://pki.example.com/ca?id=1") == "ca.crt"
+
+    def test_get_ca_src_path(self, tmp_path):
+        """Test a URL is loaded from its cached copy, a file from the config folder."""
+        url = "https://pki.example.com/root.crt"
+        assert get_ca_src_path(tmp_path / "config", tmp_path / "remote", "ca.crt") == tmp_path / "config" / "ca.crt"
+        assert get_ca_src_path(tmp_path / "config", tmp_path / "remote", url) == get_remote_ca_path(tmp_path / "remote", url)
+        assert get_remote_ca_path(tmp_path / "remote", url).parent.parent == tmp_path / "remote"
+
+
+class TestRemoteCaPins:
+    """Test cases for get_remote_ca_pins and is_secure_remote_ca functions."""
+
+    def test_get_remote_ca_pins(self):
+        """Test the fingerprints pinned in the fragment of a URL are lowercased and stripped of colons."""
+        fingerprint = "ab" * 32
+        assert get_remote_ca_pins(f"http://pki.example.com/root.crt#sha256={fingerprint}") == {fingerprint}
+        assert get_remote_ca_pins(f"http://pki.example.com/root.crt#sha256={':'.join(['AB'] * 32)},{'cd' * 32}") == {fingerprint, "cd" * 32}
+        assert get_remote_ca_pins("http://pki.example.com/root.crt#sha256=abcd") == set()
+        assert get_remote_ca_pins("http://pki.example.com/root.crt") == set()
+
+    def test_is_secure_remote_ca(self):
+        """Test only HTTPS URLs, or HTTP URLs with a pin, are trusted."""
+        assert is_secure_remote_ca("https://pki.example.com/root.crt") is True
+        assert is_secure_remote_ca(f"http://pki.example.com/root.crt#sha256={'ab' * 32}") is True
+        assert is_secure_remote_ca("http://pki.example.com/root.crt") is False
+        assert is_secure_remote_ca("http://pki.example.com/root.crt#sha256=abcd") is False
+
+
+class TestAsyncFetchRemoteCa:
+    """Test cases for async_fetch_remote_ca function, against a local HTTP server."""
+
+    @pytest.mark.asyncio
+    async def test_fetch_then_revalidate(self, hass, ca_server, tmp_path):
+        """Test a CA is fetched once, then revalidated with a conditional request without rewriting the cached copy."""
+        # Arrange
+        ca_path = get_remote_ca_path(tmp_path, ca_server["url"])
+        stats = RunStats()
+
+        # Act
+        async with aiohttp.ClientSession() as session:
+            validators = await async_fetch_remote_ca(hass, session, ca_server["url"], ca_path, None, stats)
+            identity = ca_path.stat().st_mtime_ns
+            revalidated = await async_fetch_remote_ca(hass, session, ca_server["url"], ca_path, validators, stats)
+
+        # Assert
+        assert ca_path.read_bytes() == ca_server["pem"]
+        assert validators == {"etag": '"v1"', "last_modified": None}
+        assert revalidated == validators
+        assert ca_server["requests"][1][aiohttp.hdrs.IF_NONE_MATCH] == '"v1"'
+        assert ca_path.stat().st_mtime_ns == identity
+        assert stats.cache == {"remote": {"hits": 1, "misses": 1}}
+
+    @pytest.mark.asyncio
+    async def test_fetch_changed_ca(self, hass, ca_server, tmp_path, make_ca_pem):
+        """Test a CA changed on the server replaces the cached copy."""
+        # Arrange
+        ca_path = get_remote_ca_path(tmp_path, ca_server["url"])
+        stats = RunStats()
+        async with aiohttp.ClientSession() as session:
+            validators = await async_fetch_remote_ca(hass, session, ca_server["url"], ca_path, None, stats)
+            ca_server["pem"] = make_ca_pem("Rotated CA")
+            ca_server["etag"] = '"v2"'
+
+            # Act
+            validators = await async_fetch_remote_ca(hass, session, ca_server["url"], ca_path, validators, stats)
+
+        # Assert
+        assert ca_path.read_bytes() == ca_server["pem"]
+        assert validators["etag"] == '"v2"'
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.remote.log")
+    async def test_fetch_unreachable_uses_cached_copy(self, mock_log, hass, tmp_path):
+        """Test an unreachable server keeps the cached copy of the CA."""
+        # Arrange
+        url = "http://127.0.0.1:1/root.crt"
+        ca_path = get_remote_ca_path(tmp_path, url)
+        ca_path.parent.mkdir()
+        ca_path.write_bytes(b"cached ca")
+        validators = {"etag": '"v1"', "last_modified": None}
+
+        # Act
+        async with aiohttp.ClientSession() as session:
+            result = await async_fetch_remote_ca(hass, session, url, ca_path, validators, RunStats())
+
+        # Assert
+        assert result == validators
+        assert ca_path.read_bytes() == b"cached ca"
+        mock_log.warning.assert_called_once()
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.remote.log")
+    async def test_fetch_unreachable_without_cached_copy(self, mock_log, hass, tmp_path):
+        """Test a CA never fetched is reported, and has no validators."""
+        # Arrange
+        url = "http://127.0.0.1:1/root.crt"
+
+        # Act
+        async with aiohttp.ClientSession() as session:
+            result = await async_fetch_remote_ca(hass, session, url, get_remote_ca_path(tmp_path, url), None, RunStats())
+
+        # Assert
+        assert result is None
+        mock_log.error.assert_called_once()
+
+
+    @pytest.mark.asyncio
+    async def test_fetch_pinned_ca(self, hass, ca_server, tmp_path):
+        """Test a CA served over HTTP is fetched when it matches the fingerprint pinned in its URL."""
+        # Arrange
+        url = f"{ca_server['url']}#sha256={hashlib.sha256(pem_to_der(ca_server['pem'])).hexdigest()}"
+        ca_path = get_remote_ca_path(tmp_path, url)
+
+        # Act
+        async with aiohttp.ClientSession() as session:
+            validators = await async_fetch_remote_ca(hass, session, url, ca_path, None, RunStats())
+
+        # Assert
+        assert validators == {"etag": '"v1"', "last_modified": None}
+        assert ca_path.read_bytes() == ca_server["pem"]
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.remote.log")
+    async def test_fetch_pinned_ca_mismatch(self, mock_log, hass, ca_server, tmp_path):
+        """Test a CA not matching the fingerprint pinned in its URL is rejected, and the cached copy is kept."""
+        # Arrange
+        url = f"{ca_server['url']}#sha256={'ab' * 32}"
+        ca_path = get_remote_ca_path(tmp_path, url)
+        ca_path.parent.mkdir()
+        ca_path.write_bytes(b"cached ca")
+        validators = {"etag": '"v0"', "last_modified": None}
+
+        # Act
+        async with aiohttp.ClientSession() as session:
+            result = await async_fetch_remote_ca(hass, session, url, ca_path, validators, RunStats())
+
+        # Assert
+        assert result == validators
+        assert ca_path.read_bytes() == b"cached ca"
+        mock_log.warning.assert_called_once()
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.remote.REMOTE_CA_MAX_SIZE", 64)
+    @patch("custom_components.additional_ca.remote.log")
+    async def test_fetch_too_large_ca(self, mock_log, hass, ca_server, tmp_path):
+        """Test a CA larger than the maximum size is rejected."""
+        # Arrange
+        ca_path = get_remote_ca_path(tmp_path, ca_server["url"])
+
+        # Act
+        async with aiohttp.ClientSession() as session:
+            result = await async_fetch_remote_ca(hass, session, ca_server["url"], ca_path, None, RunStats())
+
+        # Assert
+        assert result is None
+        assert not ca_path.exists()
+        mock_log.error.assert_called_once()
+
+
+class TestAsyncFetchRemoteCas:
+    """Test cases for async_fetch_remote_cas function."""
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.remote.async_get_clientsession")
+    @patch("custom_components.additional_ca.remote.async_fetch_remote_ca", new_callable=AsyncMock)
+    @patch("custom_components.additional_ca.remote.Store")
+    @patch("custom_components.additional_ca.remote.log")
+    async def test_insecure_url_not_fetched(self, mock_log, mock_store, mock_fetch, mock_session, hass, tmp_path):
+        """Test an HTTP URL without a pin is not fetched, and its cached copy is removed."""
+        # Arrange
+        url = "http://pki.example.com/root.crt"
+        hass.config = MagicMock()
+        hass.config.path = lambda *path: str(tmp_path.joinpath(*path))
+        remote_cache_path = tmp_path / ".storage" / "additional_ca.remote"
+        ca_path = get_remote_ca_path(remote_cache_path, url)
+        ca_path.parent.mkdir(parents=True)
+        ca_path.write_bytes(b"cached ca")
+        mock_store.return_value.async_load = AsyncMock(return_value={url: {"etag": '"v1"', "last_modified": None}})
+        mock_store.return_value.async_save = AsyncMock()
+
+        # Act
+        await async_fetch_remote_cas(hass, {"corp_root": url}, 4, RunStats())
+
+        # Assert
+        mock_fetch.assert_not_called()
+        mock_log.error.assert_called_once()
+        assert not remote_cache_path.exists()
+        mock_store.return_value.async_save.assert_awaited_once_with({})
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.remote.Store")
+    async def test_no_remote_ca(self, mock_store, hass, tmp_path):
+        """Test nothing is loaded when there is no CA given by URL and no cached copy."""
+        # Arrange
+        hass.config = MagicMock()
+        hass.config.path = lambda *path: str(tmp_path.joinpath(*path))
+
+        # Act
+        await async_fetch_remote_cas(hass, {}, 4, RunStats())
+
+        # Assert
+        mock_store.assert_not_called()
+
+
+class TestRemoveStaleRemoteCas:
+    """Test cases for remove_stale_remote_cas function."""
+
+    def test_remove_stale_remote_cas(self, tmp_path):
+        """Test the cached copies of URLs no longer in the config are removed."""
+        # Arrange
+        kept = get_remote_ca_path(tmp_path, "https://pki.example.com/kept.crt")
+        stale = get_remote_ca_path(tmp_path, "https://pki.example.com/stale.crt")
+        for ca_path in (kept, stale):
+            ca_path.parent.mkdir()
+            ca_path.write_bytes(b"ca")
+
+        # Act
+        remove_stale_remote_cas(tmp_path, ["https://pki.example.com/kept.crt"])
+
+        # Assert
+        assert kept.exists()
+        assert not stale.parent.exists()
+
+    def test_remove_stale_remote_cas_without_url(self, tmp_path):
+        """Test the cache folder is removed once the last URL is removed from the config."""
+        # Arrange
+        remote_cache_path = tmp_path / "remote"
+        ca_path = get_remote_ca_path(remote_cache_path, "https://pki.example.com/stale.crt")
+        ca_path.parent.mkdir(parents=True)
+        ca_path.write_bytes(b"ca")
+
+        # Act
+        remove_stale_remote_cas(remote_cache_path, [])
+
+        # Assert
+        assert not remote_cache_path.exists()
@@ -0,0 +1,267 @@
+"""Unit tests for sensor.py module."""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from custom_components.additional_ca.const import CA_METADATA_KEY, EXPIRY_NOTIF_ID, SIGNAL_CA_UPDATED
+from custom_components.additional_ca.sensor import CaExpirySensor, ExpiryScheduler, async_setup_entry
+
+NOW = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def make_metadata(fingerprint: str, not_after: datetime) -> dict[str, str]:
+    """Return the metadata of a CA expiring at not_after."""
+    return {
+        "serial_number": "0ABC",
+        "common_name": f"CA {fingerprint}",
+        "fingerprint": fingerprint,
+        "not_after": not_after.isoformat(),
+    }
+
+
+@pytest.fixture
+def hass():
+    """Return a mocked hass object."""
+    return MagicMock(spec=HomeAssistant)
+
+
+@pytest.fixture
+def make_sensor(hass):
+    """Return a factory of expiry sensors computed at NOW, attached to hass."""
+
+    def _make_sensor(scheduler, fingerprint: str, not_after: datetime) -> CaExpirySensor:
+        with patch("custom_components.additional_ca.sensor.dt_util.utcnow", return_value=NOW):
+            sensor = CaExpirySensor(scheduler, f"additional_ca_{fingerprint}", f"{fingerprint}.crt", make_metadata(fingerprint, not_after))
+        sensor.hass = hass
+        sensor.async_write_ha_state = MagicMock()
+        return sensor
+
+    return _make_sensor
+
+
+class TestAsyncSetupEntry:
+    """Test cases for async_setup_entry function of the sensor platform."""
+
+    NOT_AFTER = datetime(2040, 1, 1, tzinfo=timezone.utc)
+
+    @pytest.fixture
+    def platform(self, hass):
+        """Set the platform up with a mocked entity registry, and return the mocks and the dispatcher callback once set up."""
+        hass.data = {}
+        entry = MagicMock(spec=ConfigEntry)
+        entry.entry_id = "entry_id"
+        registry = MagicMock()
+        registry.async_get_entity_id.return_value = None
+        platform = {"entry": entry, "registry": registry, "registry_entries": [], "add_entities": MagicMock()}
+
+        async def setup() -> None:
+            await async_setup_entry(hass, entry, platform["add_entities"])
+            platform["update"] = mock_connect.call_args.args[2]
+
+        platform["setup"] = setup
+        with patch("custom_components.additional_ca.sensor.er.async_get", return_value=registry), patch(
+            "custom_components.additional_ca.sensor.er.async_entries_for_config_entry", side_effect=lambda *args: platform["registry_entries"]
+        ), patch("custom_components.additional_ca.sensor.async_dispatcher_connect") as mock_connect:
+            platform["connect"] = mock_connect
+            yield platform
+
+    def added(self, platform) -> dict[str, CaExpirySensor]:
+        """Return the sensors added to hass so far, by unique ID."""
+        return {sensor.unique_id: sensor for call in platform["add_entities"].call_args_list for sensor in call.args[0]}
+
+    @pytest.mark.asyncio
+    async def test_add(self, hass, platform):
+        """Test a sensor is added for each CA at setup, a CA loaded twice gets a single sensor, and a CA loaded by a reload gets a new sensor."""
+        # Arrange
+        hass.data[CA_METADATA_KEY] = {"a.crt": make_metadata("aa", self.NOT_AFTER), "a_copy.crt": make_metadata("aa", self.NOT_AFTER)}
+
+        # Act
+        await platform["setup"]()
+        hass.data[CA_METADATA_KEY] = {**hass.data[CA_METADATA_KEY], "b.crt": make_metadata("bb", self.NOT_AFTER)}
+        platform["update"]()
+
+        # Assert
+        assert platform["add_entities"].call_count == 2
+        assert [sensor.unique_id for sensor in platform["add_entities"].call_args_list[1].args[0]] == ["additional_ca_bb"]
+        assert set(self.added(platform)) == {"additional_ca_aa", "additional_ca_bb"}
+        platform["connect"].assert_called_once_with(hass, SIGNAL_CA_UPDATED, platform["update"])
+        platform["entry"].async_on_unload.assert_any_call(platform["connect"].return_value)
+
+    @pytest.mark.asyncio
+    async def test_rename(self, hass, platform):
+        """Test a renamed CA file keeps its sensor, updated with the new name."""
+        # Arrange
+        hass.data[CA_METADATA_KEY] = {"old.crt": make_metadata("aa", self.NOT_AFTER)}
+        await platform["setup"]()
+
+        # Act
+        hass.data[CA_METADATA_KEY] = {"new.crt": make_metadata("aa", self.NOT_AFTER)}
+        platform["update"]()
+
+        # Assert
+        platform["add_entities"].assert_called_once()
+        assert self.added(platform)["additional_ca_aa"].extra_state_attributes["ca_name"] == "new.crt"
+        platform["registry"].async_remove.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_remove(self, hass, platform):
+        """Test the sensor of a CA no longer loaded is removed from the entity registry, or from hass if it is not registered."""
+        # Arrange
+        hass.data[CA_METADATA_KEY] = {"a.crt": make_metadata("aa", self.NOT_AFTER), "b.crt": make_metadata("bb", self.NOT_AFTER)}
+        await platform["setup"]()
+        platform["registry"].async_get_entity_id.side_effect = lambda domain, platform_name, unique_id: "sensor.a" if unique_id == "additional_ca_aa" else None
+        unregistered = self.added(platform)["additional_ca_bb"]
+
+        # Act
+        hass.data[CA_METADATA_KEY] = {}
+        with patch.object(unregistered, "async_remove", new_callable=MagicMock) as mock_remove:
+            platform["update"]()
+
+        # Assert
+        platform["registry"].async_remove.assert_called_once_with("sensor.a")
+        mock_remove.assert_called_once()
+        hass.async_create_task.assert_called_once_with(mock_remove.return_value)
+
+    @pytest.mark.asyncio
+    async def test_remove_while_unloaded(self, hass, platform):
+        """Test the sensors of CA removed while the entry was not loaded are removed from the entity registry at setup."""
+        # Arrange
+        hass.data[CA_METADATA_KEY] = {"a.crt": make_metadata("aa", self.NOT_AFTER)}
+        platform["registry_entries"] = [
+            MagicMock(domain="sensor", unique_id="additional_ca_aa", entity_id="sensor.a"),
+            MagicMock(domain="sensor", unique_id="additional_ca_gone", entity_id="sensor.gone"),
+        ]
+
+        # Act
+        await platform["setup"]()
+
+        # Assert
+        platform["registry"].async_remove.assert_called_once_with("sensor.gone")
+
+
+class TestCaExpirySensor:
+    """Test cases for CaExpirySensor class."""
+
+    def test_days_to_expiry_and_next_deadline(self, make_sensor):
+        """Test the days to expiry, and the deadline when they decrease."""
+        # Act
+        sensor = make_sensor(MagicMock(), "aa", NOW + timedelta(days=10, hours=6))
+
+        # Assert
+        assert sensor.native_value == 10
+        assert sensor.next_deadline == NOW + timedelta(hours=6)
+        assert sensor.extra_state_attributes["issuer_common_name"] == "CA aa"
+
+    def test_next_deadline_exactly_on_boundary(self, make_sensor):
+        """Test the next deadline is in the future when computed exactly on a boundary."""
+        # Act
+        sensor = make_sensor(MagicMock(), "aa", NOW + timedelta(days=3))
+
+        # Assert
+        assert sensor.native_value == 3
+        assert sensor.next_deadline == NOW + timedelta(days=1)
+
+    @patch("custom_components.additional_ca.sensor.persistent_notification")
+    def test_notification_on_threshold(self, mock_notification, make_sensor, hass):
+        """Test a notification is created when the CA reaches a warning threshold."""
+        # Arrange
+        sensor = make_sensor(MagicMock(), "aa", NOW + timedelta(days=8, hours=6))
+
+        # Act
+        sensor.async_handle_deadline(NOW + timedelta(hours=6, seconds=1))
+
+        # Assert
+        assert sensor.native_value == 7
+        mock_notification.async_create.assert_called_once_with(
+            hass,
+            message="CA 'aa.crt' with Common Name 'CA aa' expires in 7 day(s).",
+            title="Additional CA (custom integration)",
+            notification_id=f"aa_{EXPIRY_NOTIF_ID}",
+        )
+        sensor.async_write_ha_state.assert_called_once()
+
+    @patch("custom_components.additional_ca.sensor.persistent_notification")
+    def test_no_notification_between_thresholds(self, mock_notification, make_sensor):
+        """Test no notification is created between warning thresholds."""
+        # Arrange
+        sensor = make_sensor(MagicMock(), "aa", NOW + timedelta(days=20, hours=6))
+
+        # Act
+        sensor.async_handle_deadline(NOW + timedelta(hours=6, seconds=1))
+
+        # Assert
+        assert sensor.native_value == 19
+        mock_notification.async_create.assert_not_called()
+
+
+class TestExpiryScheduler:
+    """Test cases for ExpiryScheduler class."""
+
+    @patch("custom_components.additional_ca.sensor.async_track_point_in_time")
+    def test_single_timer_at_earliest_deadline(self, mock_track, hass, make_sensor):
+        """Test a single timer is armed, at the earliest deadline of all sensors."""
+        # Arrange
+        scheduler = ExpiryScheduler(hass)
+        sensors = [make_sensor(scheduler, f"ca{i}", NOW + timedelta(days=100, hours=i + 1)) for i in range(5)]
+
+        # Act
+        for sensor in reversed(sensors):
+            scheduler.async_schedule(sensor)
+
+        # Assert
+        deadlines = [c.args[2] for c in mock_track.call_args_list]
+        assert deadlines[-1] == NOW + timedelta(hours=1)
+        assert len(deadlines) == 5
+
+    @patch("custom_components.additional_ca.sensor.async_track_point_in_time")
+    def test_only_due_sensors_refreshed(self, mock_track, hass, make_sensor):
+        """Test only the sensors past their deadline are refreshed, and rescheduled."""
+        # Arrange
+        scheduler = ExpiryScheduler(hass)
+        soon = make_sensor(scheduler, "soon", NOW + timedelta(days=50, hours=1))
+        later = make_sensor(scheduler, "later", NOW + timedelta(days=50, hours=5))
+        scheduler.async_schedule(soon)
+        scheduler.async_schedule(later)
+        handle_deadline = mock_track.call_args.args[1]
+
+        # Act
+        handle_deadline(NOW + timedelta(hours=1, seconds=1))
+
+        # Assert
+        soon.async_write_ha_state.assert_called_once()
+        later.async_write_ha_state.assert_not_called()
+        assert soon.native_value == 49
+        assert mock_track.call_args.args[2] == NOW + timedelta(hours=5)
+
+    @patch("custom_components.additional_ca.sensor.async_track_point_in_time")
+    def test_unscheduled_sensor_skipped(self, mock_track, hass, make_sensor):
+        """Test a removed sensor is not refreshed."""
+        # Arrange
+        scheduler = ExpiryScheduler(hass)
+        sensor = make_sensor(scheduler, "aa", NOW + timedelta(days=50, hours=1))
+        scheduler.async_schedule(sensor)
+        handle_deadline = mock_track.call_args.args[1]
+        scheduler.async_unschedule(sensor)
+
+        # Act
+        handle_deadline(NOW + timedelta(hours=1, seconds=1))
+
+        # Assert
+        sensor.async_write_ha_state.assert_not_called()
+
+    @patch("custom_components.additional_ca.sensor.async_track_point_in_time")
+    def test_stop_cancels_timer(self, mock_track, hass, make_sensor):
+        """Test stopping the scheduler cancels its timer."""
+        # Arrange
+        scheduler = ExpiryScheduler(hass)
+        scheduler.async_schedule(make_sensor(scheduler, "aa", NOW + timedelta(days=50)))
+
+        # Act
+        scheduler.async_stop()
+
+        # Assert
+        mock_track.return_value.assert_called_once()
@@ -0,0 +1,66 @@
+"""Unit tests for stats.py module."""
+
+import pytest
+from unittest.mock import patch
+
+from custom_components.additional_ca.stats import RunStats
+
+
+class TestRunStats:
+    """Test cases for RunStats class."""
+
+    @patch("custom_components.additional_ca.stats.time.perf_counter")
+    def test_run_stats_phases(self, mock_perf_counter):
+        """Test phases are summed in total and per CA."""
+        # Arrange
+        mock_perf_counter.side_effect = [0.0, 1.0, 1.5, 2.0, 2.25, 3.0, 3.5, 4.0]
+        stats = RunStats("setup")
+
+        # Act
+        with stats.phase("config"):
+            pass
+        with stats.phase("parse", "ca1"):
+            pass
+        with stats.phase("parse", "ca2"):
+            pass
+        stats.finish()
+        result = stats.as_dict()
+
+        # Assert
+        assert result["trigger"] == "setup"
+        assert result["duration_ms"] == 4000.0
+        assert result["phases_ms"] == {"config": 500.0, "parse": 750.0}
+        assert result["cas_ms"] == {"ca1": {"parse": 250.0}, "ca2": {"parse": 500.0}}
+        assert result["error"] is None
+
+    def test_run_stats_phase_on_error(self):
+        """Test a phase interrupted by an error is still timed."""
+        # Arrange
+        stats = RunStats()
+
+        # Act
+        with pytest.raises(ValueError):
+            with stats.phase("update_system_ca"):
+                raise ValueError("boom")
+        stats.finish(ValueError("boom"))
+
+        # Assert
+        assert "update_system_ca" in stats.as_dict()["phases_ms"]
+        assert stats.as_dict()["error"] == "boom"
+
+    def test_run_stats_cache(self):
+        """Test cache hits and misses are counted per cache."""
+        # Arrange
+        stats = RunStats()
+
+        # Act
+        stats.cache_hit("ca_copy")
+        stats.cache_hit("ca_copy")
+        stats.cache_miss("ca_copy")
+        stats.cache_miss("trust_store")
+
+        # Assert
+        assert stats.as_dict()["cache"] == {
+            "ca_copy": {"hits": 2, "misses": 1},
+            "trust_store": {"hits": 0, "misses": 1},
+        }
@@ -0,0 +1,122 @@
+"""Unit tests for transaction.py module."""
+
+import pytest
+from unittest.mock import patch
+
+from custom_components.additional_ca.backends import NativeBackend
+from custom_components.additional_ca.transaction import TrustStoreTransaction
+
+
+@pytest.fixture
+def trust_store(tmp_path):
+    """Return a CA_SYSPATH with an installed CA, and a system CA bundle."""
+    syspath = tmp_path / "ca-certificates"
+    syspath.mkdir()
+    (syspath / "ca1_ca1.crt").write_bytes(b"old ca1")
+    (syspath / "ca2_ca2.crt").write_bytes(b"ca2")
+    bundle = tmp_path / "ca-certificates.crt"
+    bundle.write_bytes(b"old bundle")
+    return syspath, bundle
+
+
+def apply_changes(transaction: TrustStoreTransaction, syspath, bundle) -> None:
+    """Stage a new version of ca1 and a new ca3, remove ca2, and rebuild the bundle."""
+    (transaction.staging_path / "ca1_ca1.crt").write_bytes(b"new ca1")
+    (transaction.staging_path / "ca3_ca3.crt").write_bytes(b"ca3")
+    transaction.snapshot(["ca1_ca1.crt", "ca2_ca2.crt", "ca3_ca3.crt"])
+    transaction.swap()
+    (syspath / "ca2_ca2.crt").unlink()
+    bundle.write_bytes(b"new bundle")
+
+
+class TestTrustStoreTransaction:
+    """Test cases for TrustStoreTransaction class."""
+
+    def test_commit(self, trust_store):
+        """Test a committed transaction keeps the changes, and leaves no file behind."""
+        # Arrange
+        syspath, bundle = trust_store
+        transaction = TrustStoreTransaction(NativeBackend(syspath, bundle))
+        transaction.begin()
+        apply_changes(transaction, syspath, bundle)
+
+        # Act
+        transaction.commit()
+
+        # Assert
+        assert sorted(f.name for f in syspath.iterdir()) == ["ca1_ca1.crt", "ca3_ca3.crt"]
+        assert (syspath / "ca1_ca1.crt").read_bytes() == b"new ca1"
+        assert sorted(f.name for f in bundle.parent.iterdir()) == ["ca-certificates", "ca-certificates.crt"]
+
+    def test_rollback(self, trust_store):
+        """Test a rolled back transaction restores the CA files and the bundle, without rebuilding."""
+        # Arrange
+        syspath, bundle = trust_store
+        transaction = TrustStoreTransaction(NativeBackend(syspath, bundle))
+        transaction.begin()
+        apply_changes(transaction, syspath, bundle)
+
+        # Act
+        transaction.rollback()
+
+        # Assert
+        assert sorted(f.name for f in syspath.iterdir()) == ["ca1_ca1.crt", "ca2_ca2.crt"]
+        assert (syspath / "ca1_ca1.crt").read_bytes() == b"old ca1"
+        assert bundle.read_bytes() == b"old bundle"
+        assert sorted(f.name for f in bundle.parent.iterdir()) == ["ca-certificates", "ca-certificates.crt"]
+
+    def test_rollback_before_swap(self, trust_store):
+        """Test a transaction rolled back before the swap leaves CA_SYSPATH untouched."""
+        # Arrange
+        syspath, bundle = trust_store
+        transaction = TrustStoreTransaction(NativeBackend(syspath, bundle))
+        transaction.begin()
+        (transaction.staging_path / "ca3_ca3.crt").write_bytes(b"ca3")
+
+        # Act
+        transaction.rollback()
+
+        # Assert
+        assert sorted(f.name for f in syspath.iterdir()) == ["ca1_ca1.crt", "ca2_ca2.crt"]
+        assert bundle.read_bytes() == b"old bundle"
+
+    def test_select(self, trust_store):
+        """Test held CA files are installed in their new or previous version on demand, and still rolled back."""
+        # Arrange
+        syspath, bundle = trust_store
+        transaction = TrustStoreTransaction(NativeBackend(syspath, bundle))
+        transaction.begin()
+        apply_changes(transaction, syspath, bundle)
+        transaction.hold(["ca1_ca1.crt", "ca3_ca3.crt"])
+
+        # Act
+        transaction.select(["ca3_ca3.crt"])
+        selected = {f.name: f.read_bytes() for f in syspath.iterdir() if f.is_file()}
+        transaction.select(["ca1_ca1.crt"])
+        reselected = {f.name: f.read_bytes() for f in syspath.iterdir() if f.is_file()}
+        transaction.rollback()
+
+        # Assert
+        assert selected == {"ca1_ca1.crt": b"old ca1", "ca3_ca3.crt": b"ca3"}
+        assert reselected == {"ca1_ca1.crt": b"new ca1"}
+        assert sorted(f.name for f in syspath.iterdir()) == ["ca1_ca1.crt", "ca2_ca2.crt"]
+        assert (syspath / "ca1_ca1.crt").read_bytes() == b"old ca1"
+
+    @patch("custom_components.additional_ca.transaction.log")
+    def test_begin_recovers_interrupted_transaction(self, mock_log, trust_store):
+        """Test a transaction interrupted by a crash is rolled back by the next one."""
+        # Arrange
+        syspath, bundle = trust_store
+        interrupted = TrustStoreTransaction(NativeBackend(syspath, bundle))
+        interrupted.begin()
+        apply_changes(interrupted, syspath, bundle)
+
+        # Act
+        TrustStoreTransaction(NativeBackend(syspath, bundle)).begin()
+
+        # Assert
+        assert (syspath / "ca1_ca1.crt").read_bytes() == b"old ca1"
+        assert (syspath / "ca2_ca2.crt").exists()
+        assert not (syspath / "ca3_ca3.crt").exists()
+        assert bundle.read_bytes() == b"old bundle"
+        mock_log.warning.assert_called_once_with("Rolling back an interrupted update of the system CA trust store.")
@@ -1,84 +1,136 @@
 """Unit tests for utils.py module."""
 
+import asyncio
+import os
 import pytest
 import ssl
 import subprocess
 from pathlib import Path
-from unittest.mock import AsyncMock, MagicMock, patch, call
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from cryptography import x509
-from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes
 from homeassistant.core import HomeAssistant
+from homeassistant.util import ssl as ssl_util
+from homeassistant.util.ssl import client_context, get_default_context
 
 from custom_components.additional_ca.utils import (
-    remove_additional_ca,
+    get_ca_changes,
+    get_ca_config,
+    get_ca_names,
     copy_ca_to_system,
+    copy_changed_ca_file,
+    scan_ca_file,
+    find_duplicate_cas,
+    get_ca_fingerprints,
+    get_trust_policy,
+    get_hass_ca_bundle,
+    use_minimal_trust_bundle,
+    _minimal_trust,
     update_system_ca,
+    build_ssl_context_index,
     check_hass_ssl_context,
-    check_ssl_context_by_serial_number,
-    get_issuer_common_name,
-    get_serial_number_from_cert,
+    get_hass_client_contexts,
+    get_ssl_context_index,
+    refresh_hass_ssl_contexts,
+    ssl_context_index_contains,
+    format_serial_number,
+    get_ca_metadata,
+    load_ca_metadata,
     validate_serial_number,
+    remove_ca_files,
     remove_unused_certs,
 )
+from custom_components.additional_ca.backends import CapathBackend, NativeBackend
+from custom_components.additional_ca.capath import rehash_capath
 from custom_components.additional_ca.exceptions import SerialNumberException
+from custom_components.additional_ca.stats import RunStats
 from custom_components.additional_ca.const import (
     CA_SYSPATH,
-    UPDATE_CA_SYSCMD,
+    CONF_CAS,
+    DEDUP_SYSTEM,
+    DOMAIN,
+    MINIMAL_TRUST,
+    MINIMAL_TRUST_ALLOW,
+    YAML_CONFIG_KEY,
     UPDATE_CA_SYSCMD_OPTIONS,
     NEEDS_RESTART_NOTIF_ID,
 )
 
 
-class TestRemoveAdditionalCa:
-    """Test cases for remove_additional_ca function."""
+class TestGetCaConfig:
+    """Test cases for get_ca_config function."""
 
-    @patch("custom_components.additional_ca.utils.Path")
-    def test_remove_additional_ca_success(self, mock_path):
-        """Test successful removal of CA file."""
+    def test_get_ca_config_yaml_only(self):
+        """Test the YAML config is applied when no CA file is managed in the UI."""
         # Arrange
-        mock_ca_file = MagicMock()
-        mock_path.return_value = mock_ca_file
-        ca_filename = "test_ca.crt"
+        hass = MagicMock(spec=HomeAssistant)
+        hass.data = {YAML_CONFIG_KEY: {"hot_reload": True, "ca1": "ca1.crt"}}
+        hass.config_entries.async_entries.return_value = [MagicMock(options={})]
+
+        # Act & Assert
+        assert get_ca_config(hass) == {DOMAIN: {"hot_reload": True, "ca1": "ca1.crt"}}
+
+    def test_get_ca_config_ui_cas(self):
+        """Test the CA files managed in the UI replace the CA files of the YAML config, options are kept."""
+        # Arrange
+        hass = MagicMock(spec=HomeAssistant)
+        hass.data = {YAML_CONFIG_KEY: {"hot_reload": True, "ca1": "ca1.crt"}}
+        hass.config_entries.async_entries.return_value = [MagicMock(options={CONF_CAS: {"ca2": "ca2.crt"}})]
+
+        # Act & Assert
+        assert get_ca_config(hass) == {DOMAIN: {"hot_reload": True, "ca2": "ca2.crt"}}
 
+
+class TestGetCaNames:
+    """Test cases for get_ca_names function."""
+
+    def test_get_ca_names_single_certificate(self):
+        """Test a file with a single certificate is named after the file."""
+        assert get_ca_names("ca.crt", [{"common_name": "CA"}]) == {"ca.crt": {"common_name": "CA"}}
+
+    def test_get_ca_names_several_certificates(self):
+        """Test the certificates of a bundle file are numbered."""
         # Act
-        remove_additional_ca(ca_filename)
+        names = get_ca_names("chain.pem", [{"common_name": "Intermediate"}, {"common_name": "Root"}])
 
         # Assert
-        mock_path.assert_called_once_with(CA_SYSPATH, ca_filename)
-        mock_ca_file.unlink.assert_called_once()
+        assert names == {"chain.pem #1": {"common_name": "Intermediate"}, "chain.pem #2": {"common_name": "Root"}}
 
-    @patch("custom_components.additional_ca.utils.Path")
-    @patch("custom_components.additional_ca.utils.log")
-    def test_remove_additional_ca_file_not_found(self, mock_log, mock_path):
-        """Test removal when file doesn't exist."""
-        # Arrange
-        mock_ca_file = MagicMock()
-        mock_ca_file.unlink.side_effect = FileNotFoundError("File not found")
-        mock_path.return_value = mock_ca_file
-        ca_filename = "nonexistent.crt"
+    def test_get_ca_names_pinned_url(self):
+        """Test a CA given by URL is named without the pins of the URL."""
+        url = f"http://pki.example.com/root.crt#sha256={'ab' * 32}"
+        assert get_ca_names(url, [{"common_name": "CA"}]) == {"http://pki.example.com/root.crt": {"common_name": "CA"}}
 
-        # Act & Assert
-        with pytest.raises(FileNotFoundError):
-            remove_additional_ca(ca_filename)
 
-        mock_log.error.assert_called_once()
+class TestGetCaChanges:
+    """Test cases for get_ca_changes function."""
 
-    @patch("custom_components.additional_ca.utils.Path")
-    @patch("custom_components.additional_ca.utils.log")
-    def test_remove_additional_ca_permission_error(self, mock_log, mock_path):
-        """Test removal with permission error."""
+    def test_get_ca_changes(self, tmp_path):
+        """Test each CA file of the config is compared with the CA file installed in CA_SYSPATH."""
         # Arrange
-        mock_ca_file = MagicMock()
-        mock_ca_file.unlink.side_effect = PermissionError("Permission denied")
-        mock_path.return_value = mock_ca_file
-        ca_filename = "test_ca.crt"
+        config_path = tmp_path / "config"
+        syspath = tmp_path / "ca-certificates"
+        config_path.mkdir()
+        syspath.mkdir()
+        for name in ("new", "changed", "same"):
+            (config_path / f"{name}.crt").write_bytes(b"ca")
+        (syspath / "changed_changed.crt").write_bytes(b"old ca")
+        (syspath / "same_same.crt").write_bytes(b"ca")
+        config = {"new": "new.crt", "changed": "changed.crt", "same": "same.crt", "gone": "gone.crt"}
 
-        # Act & Assert
-        with pytest.raises(PermissionError):
-            remove_additional_ca(ca_filename)
+        # Act
+        with patch("custom_components.additional_ca.utils.CA_SYSPATH", str(syspath)):
+            changes = get_ca_changes(config, config_path, tmp_path / "remote")
 
-        mock_log.error.assert_called_once()
+        # Assert
+        assert changes == {
+            "add": ["new_new.crt"],
+            "update": ["changed_changed.crt"],
+            "unchanged": ["same_same.crt"],
+            "missing": ["gone.crt"],
+        }
+        assert sorted(f.name for f in syspath.iterdir()) == ["changed_changed.crt", "same_same.crt"]
 
 
 class TestCopyCarToSystem:
@@ -125,427 +177,793 @@ class TestCopyCarToSystem:
         mock_log.error.assert_called_once()
 
 
+class TestScanCaFile:
+    """Test cases for scan_ca_file function."""
+
+    @pytest.mark.asyncio
+    async def test_scan_ca_file(self, hass, tmp_path, make_ca_pem):
+        """Test a CA file is parsed, timed and counted as a scan cache miss."""
+        # Arrange
+        ca_path = tmp_path / "ca.crt"
+        ca_path.write_bytes(make_ca_pem("New CA"))
+        stats = RunStats()
+
+        # Act
+        result = await scan_ca_file(hass, asyncio.Semaphore(1), "my_ca", ca_path, stats=stats)
+
+        # Assert
+        assert result["certs"][0]["common_name"] == "New CA"
+        assert set(stats.as_dict()["cas_ms"]["my_ca"]) == {"stat", "hash", "parse"}
+        assert stats.as_dict()["cache"] == {"scan": {"hits": 0, "misses": 1}}
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.utils.get_ca_metadata")
+    async def test_scan_ca_file_scan_cache_hit(self, mock_get_metadata, hass, tmp_path, make_ca_pem):
+        """Test a CA file unchanged since the last run is not parsed again."""
+        # Arrange
+        ca_path = tmp_path / "ca.crt"
+        ca_path.write_bytes(make_ca_pem())
+        first = await scan_ca_file(hass, asyncio.Semaphore(1), "my_ca", ca_path, scan_cache={})
+        scan_cache = {str(ca_path): {"stat": first["stat"], "sha256": first["sha256"], "certs": [{"common_name": "Cached CA"}]}}
+        stats = RunStats()
+
+        # Act
+        result = await scan_ca_file(hass, asyncio.Semaphore(1), "my_ca", ca_path, stats=stats, scan_cache=scan_cache)
+
+        # Assert
+        mock_get_metadata.assert_called_once()
+        assert result["certs"] == [{"common_name": "Cached CA"}]
+        assert stats.as_dict()["cache"]["scan"] == {"hits": 1, "misses": 0}
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.utils.log")
+    async def test_scan_ca_file_not_found(self, mock_log, hass, tmp_path):
+        """Test a missing CA file is skipped."""
+        # Act
+        result = await scan_ca_file(hass, asyncio.Semaphore(1), "my_ca", tmp_path / "missing.crt")
+
+        # Assert
+        assert result is None
+        mock_log.warning.assert_called_once_with(f"my_ca: {tmp_path / 'missing.crt'} not found.")
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.utils.get_ca_metadata")
+    async def test_scan_ca_file_bounded_concurrency(self, mock_get_metadata, hass, tmp_path):
+        """Test no more CA files than the semaphore allows are processed at the same time."""
+        # Arrange
+        running = 0
+        max_running = 0
+
+        async def get_metadata(_hass, _path):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            raise SerialNumberException
+
+        mock_get_metadata.side_effect = get_metadata
+        ca_paths = []
+        for i in range(6):
+            ca_paths.append(tmp_path / f"ca{i}.crt")
+            ca_paths[-1].write_text("")
+        semaphore = asyncio.Semaphore(2)
+
+        # Act
+        results = await asyncio.gather(*(scan_ca_file(hass, semaphore, "ca", path) for path in ca_paths))
+
+        # Assert
+        assert results == [None] * 6
+        assert max_running == 2
+
+
+class TestCopyChangedCaFile:
+    """Test cases for copy_changed_ca_file function."""
+
+    @pytest.fixture
+    def folders(self, tmp_path):
+        """Return the staging folder and the folder of installed CA files."""
+        folders = {"staging": tmp_path / "staged", "ca": tmp_path / "ca-certificates"}
+        for path in folders.values():
+            path.mkdir()
+        return folders
+
+    @pytest.mark.asyncio
+    async def test_copy_changed_ca_file_new_ca(self, hass, tmp_path, make_ca_pem, folders):
+        """Test a new CA file is copied into the staging folder, timed and counted as a copy cache miss."""
+        # Arrange
+        ca_path = tmp_path / "ca.crt"
+        ca_path.write_bytes(make_ca_pem("New CA"))
+        scanned = await scan_ca_file(hass, asyncio.Semaphore(1), "my_ca", ca_path)
+        stats = RunStats()
+
+        # Act
+        result = await copy_changed_ca_file(hass, asyncio.Semaphore(1), "my_ca", ca_path, scanned, stats=stats, staging_path=folders["staging"], ca_path=folders["ca"])
+
+        # Assert
+        assert result["ca_id"] == "my_ca_ca.crt"
+        assert result["staged"] is True
+        assert (folders["staging"] / "my_ca_ca.crt").read_bytes() == ca_path.read_bytes()
+        assert not (folders["ca"] / "my_ca_ca.crt").exists()
+        assert set(stats.as_dict()["cas_ms"]["my_ca"]) == {"hash", "copy"}
+        assert stats.as_dict()["cache"] == {"ca_copy": {"hits": 0, "misses": 1}}
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.utils.copy_ca_to_system")
+    async def test_copy_changed_ca_file_unchanged_ca(self, mock_copy, hass, tmp_path, make_ca_pem, folders):
+        """Test a CA file installed unchanged by a previous run is not copied again."""
+        # Arrange
+        ca_path = tmp_path / "ca.crt"
+        ca_path.write_bytes(make_ca_pem())
+        (folders["ca"] / "my_ca_ca.crt").write_bytes(ca_path.read_bytes())
+        scanned = await scan_ca_file(hass, asyncio.Semaphore(1), "my_ca", ca_path)
+
+        # Act
+        result = await copy_changed_ca_file(hass, asyncio.Semaphore(1), "my_ca", ca_path, scanned, staging_path=folders["staging"], ca_path=folders["ca"])
+
+        # Assert
+        assert result["staged"] is False
+        mock_copy.assert_not_called()
+
+
+class TestFindDuplicateCas:
+    """Test cases for find_duplicate_cas function."""
+
+    def test_find_duplicate_cas_across_keys(self):
+        """Test a CA file with the certificates of an earlier CA file of the config is deduplicated."""
+        # Act
+        result = find_duplicate_cas({"ca1": ["a"], "ca2": ["b"], "ca3": ["a"], "ca4": ["a", "c"]}, set())
+
+        # Assert
+        assert result == {"ca3": "ca1"}
+
+    def test_find_duplicate_cas_shipped_by_system(self):
+        """Test a CA file with certificates all shipped by the system is deduplicated, even if it comes first."""
+        # Act
+        result = find_duplicate_cas({"ca1": ["a"], "ca2": ["a", "b"], "ca3": ["b"]}, {"a"})
+
+        # Assert
+        assert result == {"ca1": DEDUP_SYSTEM, "ca3": "ca2"}
+
+    def test_find_duplicate_cas_without_certificate(self):
+        """Test a CA file without certificate is never deduplicated."""
+        assert find_duplicate_cas({"ca1": [], "ca2": []}, set()) == {}
+
+
+class TestGetCaFingerprints:
+    """Test cases for get_ca_fingerprints function."""
+
+    @patch("custom_components.additional_ca.utils.load_ca_metadata")
+    def test_get_ca_fingerprints(self, mock_load_metadata, tmp_path, make_ca_pem):
+        """Test fingerprints come from the scan cache for unchanged files, and missing or invalid files are left out."""
+        # Arrange
+        cached_path = tmp_path / "cached.crt"
+        cached_path.write_bytes(make_ca_pem("Cached CA"))
+        invalid_path = tmp_path / "invalid.crt"
+        invalid_path.write_text("not a certificate")
+        cached_stat = cached_path.stat()
+        scan_cache = {str(cached_path): {"stat": [cached_stat.st_ino, cached_stat.st_mtime_ns, cached_stat.st_size], "certs": [{"fingerprint": "a"}]}}
+        mock_load_metadata.side_effect = ValueError
+
+        # Act
+        result = get_ca_fingerprints({"cached": cached_path, "invalid": invalid_path, "missing": tmp_path / "missing.crt"}, scan_cache)
+
+        # Assert
+        assert result == {"cached": ["a"]}
+        mock_load_metadata.assert_called_once_with(invalid_path)
+
+
+class TestGetTrustPolicy:
+    """Test cases for get_trust_policy function."""
+
+    def test_get_trust_policy(self, tmp_path):
+        """Test the policy holds the sorted allow-list when option 'minimal_trust' is enabled."""
+        # Arrange
+        backend = NativeBackend(tmp_path / "ca-certificates", tmp_path / "ca-certificates.crt")
+
+        # Act & Assert
+        assert get_trust_policy({MINIMAL_TRUST: True, MINIMAL_TRUST_ALLOW: ["b", "a"]}, backend) == {"allow": ["a", "b"]}
+        assert get_trust_policy({MINIMAL_TRUST: True}, backend) == {"allow": []}
+        assert get_trust_policy({MINIMAL_TRUST_ALLOW: ["a"]}, backend) is None
+
+    def test_get_trust_policy_without_bundle(self, tmp_path):
+        """Test there is no policy with a CApath or without a CA bundle file to reduce."""
+        # Arrange
+        options = {MINIMAL_TRUST: True}
+
+        # Act & Assert
+        assert get_trust_policy(options, CapathBackend(tmp_path, tmp_path / "capath.index")) is None
+        assert get_trust_policy(options, NativeBackend(tmp_path, None)) is None
+
+
 class TestUpdateSystemCa:
     """Test cases for update_system_ca function."""
 
-    @patch("custom_components.additional_ca.utils.subprocess")
-    def test_update_system_ca_success(self, mock_subprocess):
+    @pytest.fixture
+    def fake_syscmd(self, tmp_path):
+        """Return a factory creating a fake update-ca-certificates command."""
+
+        def _fake_syscmd(script: str) -> str:
+            cmd = tmp_path / "update-ca-certificates"
+            cmd.write_text(f"#!/bin/sh\n{script}\n")
+            cmd.chmod(0o755)
+            return str(cmd)
+
+        return _fake_syscmd
+
+    @pytest.mark.asyncio
+    async def test_update_system_ca_success(self, fake_syscmd, tmp_path):
         """Test successful system CA update."""
         # Arrange
-        mock_result = MagicMock()
-        mock_result.stderr = b""
-        mock_subprocess.run.return_value = mock_result
+        cmd = fake_syscmd(f'echo "Updating certificates..."; echo "$@" > {tmp_path}/args')
 
         # Act
-        update_system_ca()
+        with patch("custom_components.additional_ca.utils.UPDATE_CA_SYSCMD", cmd):
+            await update_system_ca()
 
         # Assert
-        expected_cmd = [UPDATE_CA_SYSCMD, UPDATE_CA_SYSCMD_OPTIONS]
-        mock_subprocess.run.assert_called_once_with(
-            expected_cmd, capture_output=True, check=True
-        )
+        assert (tmp_path / "args").read_text().strip() == UPDATE_CA_SYSCMD_OPTIONS
 
-    @patch("custom_components.additional_ca.utils.subprocess")
-    def test_update_system_ca_success_with_duplicate_warning(self, mock_subprocess):
+    @pytest.mark.asyncio
+    async def test_update_system_ca_success_with_duplicate_warning(self, fake_syscmd):
         """Test successful system CA update with duplicate certificate warning."""
         # Arrange
-        mock_result = MagicMock()
-        mock_result.stderr = b"Skipping duplicate certificate something.crt"
-        mock_subprocess.run.return_value = mock_result
-
-        # Act
-        update_system_ca()
+        cmd = fake_syscmd('echo "Skipping duplicate certificate something.crt" >&2')
 
-        # Assert
-        mock_subprocess.run.assert_called_once()
+        # Act & Assert (should not raise)
+        with patch("custom_components.additional_ca.utils.UPDATE_CA_SYSCMD", cmd):
+            await update_system_ca()
 
-    @patch("custom_components.additional_ca.utils.subprocess.run")
+    @pytest.mark.asyncio
     @patch("custom_components.additional_ca.utils.log")
-    def test_update_system_ca_called_process_error(self, mock_log, mock_run):
+    async def test_update_system_ca_called_process_error(self, mock_log, fake_syscmd):
         """Test system CA update with CalledProcessError."""
         # Arrange
-        error = subprocess.CalledProcessError(1, "update-ca-certificates")
-        mock_run.side_effect = error
+        cmd = fake_syscmd("exit 1")
 
         # Act & Assert
-        with pytest.raises(subprocess.CalledProcessError):
-            update_system_ca()
+        with patch("custom_components.additional_ca.utils.UPDATE_CA_SYSCMD", cmd):
+            with pytest.raises(subprocess.CalledProcessError):
+                await update_system_ca()
 
         mock_log.error.assert_called_once()
 
-    @patch("custom_components.additional_ca.utils.subprocess.run")
+    @pytest.mark.asyncio
     @patch("custom_components.additional_ca.utils.log")
-    def test_update_system_ca_other_exception(self, mock_log, mock_run):
+    async def test_update_system_ca_other_exception(self, mock_log, tmp_path):
         """Test system CA update with other exception."""
-        # Arrange
-        mock_run.side_effect = OSError("Command not found")
-
         # Act & Assert
-        with pytest.raises(OSError):
-            update_system_ca()
+        with patch("custom_components.additional_ca.utils.UPDATE_CA_SYSCMD", str(tmp_path / "not-found")):
+            with pytest.raises(OSError):
+                await update_system_ca()
 
         mock_log.error.assert_called_once()
 
-    @patch("custom_components.additional_ca.utils.subprocess.run")
-    def test_update_system_ca_stderr_error(self, mock_run):
+    @pytest.mark.asyncio
+    async def test_update_system_ca_stderr_error(self, fake_syscmd):
         """Test system CA update with stderr error."""
         # Arrange
-        mock_result = MagicMock()
-        mock_result.stderr = b"Some error occurred"
-        mock_run.return_value = mock_result
+        cmd = fake_syscmd('echo "Some error occurred" >&2')
+
+        # Act & Assert
+        with patch("custom_components.additional_ca.utils.UPDATE_CA_SYSCMD", cmd):
+            with pytest.raises(Exception, match="status returned an error -> Some error occurred"):
+                await update_system_ca()
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.utils.log")
+    async def test_update_system_ca_timeout(self, mock_log, fake_syscmd, tmp_path):
+        """Test that the command is killed on timeout."""
+        # Arrange
+        cmd = fake_syscmd(f"sleep 10; touch {tmp_path}/done")
 
         # Act & Assert
-        with pytest.raises(Exception, match="status returned an error"):
-            update_system_ca()
+        with patch("custom_components.additional_ca.utils.UPDATE_CA_SYSCMD", cmd):
+            with pytest.raises(TimeoutError):
+                await update_system_ca(timeout=0.2)
+
+        mock_log.error.assert_called_once()
+        assert not (tmp_path / "done").exists()
+
+    @pytest.mark.asyncio
+    async def test_update_system_ca_does_not_block_event_loop(self, fake_syscmd):
+        """Test that other tasks run while the command is running."""
+        # Arrange
+        cmd = fake_syscmd("sleep 0.3")
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(1)
+                await asyncio.sleep(0.01)
+
+        # Act
+        ticker_task = asyncio.create_task(ticker())
+        with patch("custom_components.additional_ca.utils.UPDATE_CA_SYSCMD", cmd):
+            await update_system_ca()
+        ticker_task.cancel()
+
+        # Assert
+        assert len(ticks) > 5
+
+    @pytest.mark.asyncio
+    async def test_update_system_ca_cancelled(self, fake_syscmd, tmp_path):
+        """Test that the command is killed when the update is cancelled."""
+        # Arrange
+        cmd = fake_syscmd(f"sleep 10; touch {tmp_path}/done")
+
+        # Act
+        with patch("custom_components.additional_ca.utils.UPDATE_CA_SYSCMD", cmd):
+            task = asyncio.create_task(update_system_ca())
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        # Assert
+        assert not (tmp_path / "done").exists()
+
+
+@pytest.fixture
+def ca_context(tmp_path, make_ca_pem):
+    """Return the metadata of two CA, and an SSL context containing only the first one."""
+    ca_metadata = []
+    for name in ("ca1", "ca2"):
+        cert_path = tmp_path / f"{name}.crt"
+        cert_path.write_bytes(make_ca_pem(f"{name} Common Name"))
+        ca_metadata.extend(load_ca_metadata(cert_path))
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    ctx.load_verify_locations(tmp_path / "ca1.crt")
+    return ctx, ca_metadata
 
 
 class TestCheckHassSslContext:
     """Test cases for check_hass_ssl_context function."""
 
     @pytest.mark.asyncio
-    @patch("custom_components.additional_ca.utils.check_ssl_context_by_serial_number")
+    @patch("custom_components.additional_ca.utils.client_context")
     @patch("custom_components.additional_ca.utils.persistent_notification")
     @patch("custom_components.additional_ca.utils.log")
-    async def test_check_hass_ssl_context_ca_found(self, mock_log, mock_notification, mock_check_ssl):
+    async def test_check_hass_ssl_context_ca_found(self, mock_log, mock_notification, mock_client_context, ca_context):
         """Test SSL context check when CA is found."""
         # Arrange
         hass = MagicMock(spec=HomeAssistant)
-        ca_files = {"test_ca.crt": {
-            "serial_number": "12345678",
-            "common_name": "One Common Name"
-            }
-        }
-        mock_check_ssl.return_value = True
+        ctx, (ca1, _) = ca_context
+        mock_client_context.return_value = ctx
+        ca_files = {"test_ca.crt": ca1}
 
         # Act
         await check_hass_ssl_context(hass, ca_files)
 
         # Assert
-        mock_check_ssl.assert_called_once_with("test_ca.crt", "12345678")
         mock_notification.async_dismiss.assert_called_once_with(
-            hass, f"12345678_{NEEDS_RESTART_NOTIF_ID}"
+            hass, f"{ca1['serial_number']}_{NEEDS_RESTART_NOTIF_ID}"
         )
         mock_log.info.assert_any_call("Finally verifying SSL Context")
         mock_log.info.assert_any_call("Checking SSL Context for Additional CA: test_ca.crt")
 
     @pytest.mark.asyncio
-    @patch("custom_components.additional_ca.utils.check_ssl_context_by_serial_number")
+    @patch("custom_components.additional_ca.utils.client_context")
     @patch("custom_components.additional_ca.utils.persistent_notification")
     @patch("custom_components.additional_ca.utils.log")
-    async def test_check_hass_ssl_context_ca_not_found(self, mock_log, mock_notification, mock_check_ssl):
+    async def test_check_hass_ssl_context_ca_not_found(self, mock_log, mock_notification, mock_client_context, ca_context):
         """Test SSL context check when CA is not found."""
         # Arrange
         hass = MagicMock(spec=HomeAssistant)
-        ca_files = {"test_ca.crt": {
-            "serial_number": "12345678",
-            "common_name": "One Common Name"
-            }
-        }
-        mock_check_ssl.return_value = False
+        ctx, (_, ca2) = ca_context
+        mock_client_context.return_value = ctx
+        ca_files = {"test_ca.crt": ca2}
 
         # Act
         await check_hass_ssl_context(hass, ca_files)
 
         # Assert
-        mock_check_ssl.assert_called_once_with("test_ca.crt", "12345678")
         mock_notification.async_create.assert_called_once_with(
             hass,
-            message="CA 'test_ca.crt' with Common Name 'One Common Name' is missing in SSL Context. Home Assistant needs to be restarted.",
+            message="CA 'test_ca.crt' with Common Name 'ca2 Common Name' is missing in SSL Context. Home Assistant needs to be restarted.",
             title="Additional CA (custom integration)",
-            notification_id=f"12345678_{NEEDS_RESTART_NOTIF_ID}"
+            notification_id=f"{ca2['serial_number']}_{NEEDS_RESTART_NOTIF_ID}"
         )
         mock_log.error.assert_called_once()
 
     @pytest.mark.asyncio
-    @patch("custom_components.additional_ca.utils.check_ssl_context_by_serial_number")
+    @patch("custom_components.additional_ca.utils.build_ssl_context_index")
+    @patch("custom_components.additional_ca.utils.client_context")
     @patch("custom_components.additional_ca.utils.persistent_notification")
-    async def test_check_hass_ssl_context_multiple_cas(self, mock_notification, mock_check_ssl):
-        """Test SSL context check with multiple CAs."""
+    async def test_check_hass_ssl_context_multiple_cas(self, mock_notification, mock_client_context, mock_build_index, ca_context):
+        """Test SSL context check with multiple CAs, indexing the SSL context once."""
         # Arrange
         hass = MagicMock(spec=HomeAssistant)
-        ca_files = {
-            "ca1.crt": {
-                "serial_number": "11111111",
-                "common_name": "One Common Name"
-            },
-            "ca2.crt": {
-                "serial_number": "22222222",
-                "common_name": "Another Common Name"
-            },
-        }
-        mock_check_ssl.side_effect = [True, False]
+        ctx, (ca1, ca2) = ca_context
+        mock_client_context.return_value = ctx
+        mock_build_index.side_effect = build_ssl_context_index
+        ca_files = {"ca1.crt": ca1, "ca2.crt": ca2}
 
         # Act
-        await check_hass_ssl_context(hass, ca_files)
+        missing_cas = await check_hass_ssl_context(hass, ca_files)
 
         # Assert
-        assert mock_check_ssl.call_count == 2
-        mock_check_ssl.assert_any_call("ca1.crt", "11111111")
-        mock_check_ssl.assert_any_call("ca2.crt", "22222222")
+        assert missing_cas == ["ca2.crt"]
+        mock_build_index.assert_called_once_with(ctx)
         mock_notification.async_dismiss.assert_called_once_with(
-            hass, f"11111111_{NEEDS_RESTART_NOTIF_ID}"
+            hass, f"{ca1['serial_number']}_{NEEDS_RESTART_NOTIF_ID}"
         )
         mock_notification.async_create.assert_called_once()
 
-
-class TestCheckSslContextBySerialNumber:
-    """Test cases for check_ssl_context_by_serial_number function."""
-
     @pytest.mark.asyncio
-    @patch("custom_components.additional_ca.utils.validate_serial_number")
     @patch("custom_components.additional_ca.utils.client_context")
-    async def test_check_ssl_context_by_serial_number_found(self, mock_client_context, mock_validate):
-        """Test SSL context check when serial number is found."""
-        # Arrange
-        mock_context = MagicMock()
-        mock_context.get_ca_certs.return_value = [
-            {"serialNumber": "12345678"},
-            {"serialNumber": "87654321"},
-        ]
-        mock_client_context.return_value = mock_context
-        ca_filename = "test_ca.crt"
-        serial_number = "12345678"
+    @patch("custom_components.additional_ca.utils.persistent_notification")
+    async def test_check_hass_ssl_context_invalid_serial_number(self, mock_notification, mock_client_context, ca_context):
+        """Test SSL context check with an empty serial number."""
+        # Arrange
+        hass = MagicMock(spec=HomeAssistant)
+        ctx, (ca1, _) = ca_context
+        mock_client_context.return_value = ctx
+        ca_files = {"test_ca.crt": {**ca1, "serial_number": ""}}
+
+        # Act & Assert
+        with pytest.raises(SerialNumberException):
+            await check_hass_ssl_context(hass, ca_files)
+
+
+class TestSslContextIndex:
+    """Test cases for build_ssl_context_index and ssl_context_index_contains functions."""
+
+    def test_ssl_context_index_by_fingerprint(self, ca_context):
+        """Test lookup by fingerprint without the fallback index."""
+        # Arrange
+        ctx, (ca1, ca2) = ca_context
 
         # Act
-        result = await check_ssl_context_by_serial_number(ca_filename, serial_number)
+        index = build_ssl_context_index(ctx)
 
         # Assert
-        assert result is True
-        mock_validate.assert_called_once_with(ca_filename, serial_number)
+        assert ssl_context_index_contains(index, ca1) is True
+        assert index["serial_numbers"] is None
+        assert ssl_context_index_contains(index, ca2) is False
 
-    @pytest.mark.asyncio
-    @patch("custom_components.additional_ca.utils.validate_serial_number")
-    @patch("custom_components.additional_ca.utils.client_context")
-    async def test_check_ssl_context_by_serial_number_not_found(self, mock_client_context, mock_validate):
-        """Test SSL context check when serial number is not found."""
-        # Arrange
-        mock_context = MagicMock()
-        mock_context.get_ca_certs.return_value = [
-            {"serialNumber": "87654321"},
-            {"serialNumber": "11111111"},
-        ]
-        mock_client_context.return_value = mock_context
-        ca_filename = "test_ca.crt"
-        serial_number = "12345678"
+    def test_ssl_context_index_by_serial_number_and_issuer(self, ca_context):
+        """Test fallback lookup by serial number and issuer."""
+        # Arrange
+        ctx, (ca1, _) = ca_context
+        index = build_ssl_context_index(ctx)
+
+        # Act & Assert
+        assert ssl_context_index_contains(index, {**ca1, "fingerprint": "unknown"}) is True
+        assert ssl_context_index_contains(index, {**ca1, "fingerprint": "unknown", "issuer": "CN=Other"}) is False
+
+    @patch("custom_components.additional_ca.utils.build_ssl_context_index")
+    def test_get_ssl_context_index_cached(self, mock_build_index, ca_context, tmp_path):
+        """Test the index of an SSL context is built again only once CA are loaded into the context."""
+        # Arrange
+        ctx, _ = ca_context
+        mock_build_index.side_effect = build_ssl_context_index
 
         # Act
-        result = await check_ssl_context_by_serial_number(ca_filename, serial_number)
+        first_index = get_ssl_context_index(ctx)
+        second_index = get_ssl_context_index(ctx)
+        ctx.load_verify_locations(tmp_path / "ca2.crt")
+        third_index = get_ssl_context_index(ctx)
 
         # Assert
-        assert result is False
-        mock_validate.assert_called_once_with(ca_filename, serial_number)
+        assert first_index is second_index
+        assert third_index is not first_index
+        assert mock_build_index.call_count == 2
 
-    @pytest.mark.asyncio
-    @patch("custom_components.additional_ca.utils.validate_serial_number")
-    @patch("custom_components.additional_ca.utils.client_context")
-    async def test_check_ssl_context_by_serial_number_empty_certs(self, mock_client_context, mock_validate):
-        """Test SSL context check when no certificates are found."""
+    def test_ssl_context_index_empty_context(self):
+        """Test lookup in an SSL context without CA."""
         # Arrange
-        mock_context = MagicMock()
-        mock_context.get_ca_certs.return_value = []
-        mock_client_context.return_value = mock_context
-        ca_filename = "test_ca.crt"
-        serial_number = "12345678"
+        index = build_ssl_context_index(ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT))
+
+        # Act & Assert
+        assert ssl_context_index_contains(index, {"serial_number": "12345678", "fingerprint": "abc"}) is False
+
+
+class TestUseMinimalTrustBundle:
+    """Test cases for get_hass_ca_bundle and use_minimal_trust_bundle functions."""
+
+    def test_get_hass_ca_bundle(self, tmp_path):
+        """Test HA loads the CA bundle of option 'minimal_trust' if enabled, the system CA bundle otherwise."""
+        # Arrange
+        hass = MagicMock()
+        hass.config.path = lambda *path: str(tmp_path.joinpath(*path))
+        backend = NativeBackend(tmp_path / "ca-certificates", tmp_path / "ca-certificates.crt")
+
+        # Act & Assert
+        assert get_hass_ca_bundle(hass, {MINIMAL_TRUST: True}, backend) == tmp_path / ".storage" / "additional_ca.minimal_trust.crt"
+        assert get_hass_ca_bundle(hass, {}, backend) == backend.bundle_path
+
+    @pytest.fixture
+    def hass_client_contexts(self):
+        """Restore the client SSL Contexts of HA afterwards."""
+        original = (ssl_util._client_context, ssl_util._DEFAULT_SSL_CONTEXT)
+        yield original
+        ssl_util._client_context, ssl_util._DEFAULT_SSL_CONTEXT = original
+        _minimal_trust.clear()
+
+    def test_use_minimal_trust_bundle(self, tmp_path, make_ca_pem, hass_client_contexts, monkeypatch):
+        """Test the client SSL Contexts of HA are replaced by ones loading the reduced CA bundle, without changing the environment, then restored."""
+        # Arrange
+        monkeypatch.delenv("REQUESTS_CA_BUNDLE", raising=False)
+        bundle_path = tmp_path / "minimal.crt"
+        bundle_path.write_bytes(make_ca_pem("Minimal CA"))
+        original_context = client_context()
 
         # Act
-        result = await check_ssl_context_by_serial_number(ca_filename, serial_number)
+        switched = use_minimal_trust_bundle(bundle_path)
+        minimal_contexts = [get_default_context(), *get_hass_client_contexts()]
+        switched_again = use_minimal_trust_bundle(bundle_path)
+        restored = use_minimal_trust_bundle(None)
+        restored_again = use_minimal_trust_bundle(None)
 
         # Assert
-        assert result is False
-        mock_validate.assert_called_once_with(ca_filename, serial_number)
+        assert (switched, switched_again, restored, restored_again) == (True, False, True, False)
+        assert all(ctx.cert_store_stats()["x509_ca"] == 1 for ctx in minimal_contexts)
+        assert "REQUESTS_CA_BUNDLE" not in os.environ
+        assert client_context() is original_context
+        assert get_default_context() is hass_client_contexts[1]
 
+    @patch("custom_components.additional_ca.utils.log")
+    def test_use_minimal_trust_bundle_unsupported(self, mock_log, tmp_path, hass_client_contexts, monkeypatch):
+        """Test the client SSL Contexts are left as they are on a version of HA without the private attributes replaced."""
+        # Arrange
+        monkeypatch.delattr(ssl_util, "_client_context")
+
+        # Act
+        switched = use_minimal_trust_bundle(tmp_path / "minimal.crt")
+
+        # Assert
+        assert switched is False
+        assert get_default_context() is hass_client_contexts[1]
+        mock_log.warning.assert_called_once_with("Option 'minimal_trust' is not supported by this version of Home Assistant, its client SSL Contexts are left as they are.")
 
-class TestGetIssuerCommonName:
-    """Test cases for get_issuer_common_name function."""
+
+class TestRefreshHassSslContexts:
+    """Test cases for get_hass_client_contexts and refresh_hass_ssl_contexts functions."""
+
+    def test_get_hass_client_contexts(self):
+        """Test the cached client contexts of Home Assistant are listed once each."""
+        # Act
+        contexts = get_hass_client_contexts()
+
+        # Assert
+        assert contexts
+        assert len({id(ctx) for ctx in contexts}) == len(contexts)
+        assert all(isinstance(ctx, ssl.SSLContext) for ctx in contexts)
 
     @pytest.mark.asyncio
-    @patch("custom_components.additional_ca.utils.aiofiles.open")
-    @patch("custom_components.additional_ca.utils.x509.load_pem_x509_certificate")
-    async def test_get_issuer_common_name_success(self, mock_load_cert, mock_aiofiles_open):
-        """Test successful extraction of issuer common name."""
+    @patch("custom_components.additional_ca.utils.get_hass_client_contexts")
+    async def test_refresh_hass_ssl_contexts_loads_missing_ca(self, mock_get_contexts, ca_context, tmp_path, monkeypatch):
+        """Test the bundle is loaded in place into the contexts missing a CA."""
         # Arrange
-        cert_path = Path("/test/cert.crt")
-        cert_data = b"fake_cert_data"
-
-        # Mock file operations
-        mock_file = AsyncMock()
-        mock_file.read.return_value = cert_data
-        mock_aiofiles_open.return_value.__aenter__.return_value = mock_file
+        hass = MagicMock(spec=HomeAssistant)
+        hass.async_add_executor_job = AsyncMock(side_effect=lambda func, *args: func(*args))
+        ctx, (ca1, ca2) = ca_context
+        bundle_path = tmp_path / "bundle.crt"
+        bundle_path.write_bytes((tmp_path / "ca1.crt").read_bytes() + (tmp_path / "ca2.crt").read_bytes())
+        up_to_date_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        up_to_date_ctx.load_verify_locations(bundle_path)
+        up_to_date_ctx.load_verify_locations = MagicMock()
+        mock_get_contexts.return_value = [ctx, up_to_date_ctx]
+        monkeypatch.setenv("REQUESTS_CA_BUNDLE", str(bundle_path))
 
-        # Mock certificate parsing
-        mock_cert = MagicMock()
-        mock_attr_org = MagicMock()
-        mock_attr_org.oid = x509.NameOID.ORGANIZATION_NAME
-        mock_attr_org.value = "Test Org"
+        # Act
+        refreshed = await refresh_hass_ssl_contexts(hass, {"ca1.crt": ca1, "ca2.crt": ca2})
 
-        mock_attr_cn = MagicMock()
-        mock_attr_cn.oid = x509.NameOID.COMMON_NAME
-        mock_attr_cn.value = "Test CA"
+        # Assert
+        assert refreshed == 1
+        up_to_date_ctx.load_verify_locations.assert_not_called()
+        assert ssl_context_index_contains(build_ssl_context_index(ctx), ca2) is True
+        assert len(ctx.get_ca_certs()) == 2
 
-        mock_cert.issuer = [mock_attr_org, mock_attr_cn]
-        mock_load_cert.return_value = mock_cert
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.utils.get_hass_client_contexts")
+    async def test_refresh_hass_ssl_contexts_up_to_date(self, mock_get_contexts, ca_context):
+        """Test nothing is loaded when the contexts already contain the CA."""
+        # Arrange
+        hass = MagicMock(spec=HomeAssistant)
+        hass.async_add_executor_job = AsyncMock(side_effect=lambda func, *args: func(*args))
+        ctx, (ca1, _) = ca_context
+        mock_get_contexts.return_value = [ctx]
 
         # Act
-        result = await get_issuer_common_name(cert_path)
+        refreshed = await refresh_hass_ssl_contexts(hass, {"ca1.crt": ca1})
 
         # Assert
-        assert result == "Test CA"
-        mock_aiofiles_open.assert_called_once_with(cert_path, "rb")
-        mock_load_cert.assert_called_once_with(cert_data, default_backend())
+        assert refreshed == 0
+        hass.async_add_executor_job.assert_awaited_once_with(mock_get_contexts)
 
     @pytest.mark.asyncio
-    @patch("custom_components.additional_ca.utils.aiofiles.open")
-    @patch("custom_components.additional_ca.utils.x509.load_pem_x509_certificate")
+    @patch("custom_components.additional_ca.utils.get_hass_client_contexts")
     @patch("custom_components.additional_ca.utils.log")
-    async def test_get_issuer_common_name_no_common_name(self, mock_log, mock_load_cert, mock_aiofiles_open):
-        """Test when certificate has no common name."""
+    async def test_refresh_hass_ssl_contexts_missing_bundle(self, mock_log, mock_get_contexts, ca_context, tmp_path, monkeypatch):
+        """Test a missing bundle is logged and does not raise."""
         # Arrange
-        cert_path = Path("/test/cert.crt")
-        cert_data = b"fake_cert_data"
+        hass = MagicMock(spec=HomeAssistant)
+        hass.async_add_executor_job = AsyncMock(side_effect=lambda func, *args: func(*args))
+        ctx, (_, ca2) = ca_context
+        mock_get_contexts.return_value = [ctx]
+        monkeypatch.setenv("REQUESTS_CA_BUNDLE", str(tmp_path / "missing.crt"))
 
-        # Mock file operations
-        mock_file = AsyncMock()
-        mock_file.read.return_value = cert_data
-        mock_aiofiles_open.return_value.__aenter__.return_value = mock_file
+        # Act
+        refreshed = await refresh_hass_ssl_contexts(hass, {"ca2.crt": ca2})
+
+        # Assert
+        assert refreshed == 0
+        mock_log.warning.assert_called_once()
 
-        # Mock certificate parsing
-        mock_cert = MagicMock()
-        mock_attr_org = MagicMock()
-        mock_attr_org.oid = x509.NameOID.ORGANIZATION_NAME
-        mock_attr_org.value = "Test Org"
 
-        mock_cert.issuer = [mock_attr_org]
-        mock_load_cert.return_value = mock_cert
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.utils.get_hass_client_contexts")
+    @patch("custom_components.additional_ca.utils.persistent_notification")
+    @patch("custom_components.additional_ca.utils.client_context")
+    async def test_refresh_hass_ssl_contexts_capath(self, mock_client_context, mock_notification, mock_get_contexts, ca_context, tmp_path):
+        """Test a CApath folder is registered once per context, and its CA are checked through the hashed links."""
+        # Arrange
+        hass = MagicMock(spec=HomeAssistant)
+        hass.async_add_executor_job = AsyncMock(side_effect=lambda func, *args: func(*args))
+        ctx, (_, ca2) = ca_context
+        capath = tmp_path / "capath"
+        capath.mkdir()
+        (capath / "ca2_ca2.crt").write_bytes((tmp_path / "ca2.crt").read_bytes())
+        rehash_capath(capath)
+        mock_get_contexts.return_value = [ctx]
+        mock_client_context.return_value = ctx
 
         # Act
-        result = await get_issuer_common_name(cert_path)
+        missing_before = await check_hass_ssl_context(hass, {"ca2.crt": ca2}, capath)
+        refreshed = await refresh_hass_ssl_contexts(hass, {"ca2.crt": ca2}, capath=capath)
+        refreshed_again = await refresh_hass_ssl_contexts(hass, {"ca2.crt": ca2}, capath=capath)
+        missing_after = await check_hass_ssl_context(hass, {"ca2.crt": ca2}, capath)
 
         # Assert
-        assert result is None
+        assert missing_before == ["ca2.crt"]
+        assert (refreshed, refreshed_again) == (1, 0)
+        assert missing_after == []
+
+class TestFormatSerialNumber:
+    """Test cases for format_serial_number function."""
+
+    @pytest.mark.parametrize(
+        ("serial_number", "expected"),
+        [(5, "05"), (0x80, "80"), (0xABC, "0ABC"), (2**159 - 1, "7F" + "F" * 38)],
+    )
+    def test_format_serial_number(self, serial_number, expected):
+        """Test the format matches ssl.SSLContext.get_ca_certs()."""
+        assert format_serial_number(serial_number) == expected
+
+    def test_format_serial_number_matches_ssl(self, tmp_path, make_ca_pem):
+        """Test the format against the ssl module."""
+        # Arrange
+        cert_path = tmp_path / "ca.crt"
+        cert_path.write_bytes(make_ca_pem(serial_number=0xABCDE))
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        ctx.load_verify_locations(cert_path)
 
-    @pytest.mark.asyncio
-    @patch("custom_components.additional_ca.utils.aiofiles.open")
-    @patch("custom_components.additional_ca.utils.x509.load_pem_x509_certificate")
-    @patch("custom_components.additional_ca.utils.log")
-    async def test_get_issuer_common_name_invalid_cert(self, mock_log, mock_load_cert, mock_aiofiles_open):
-        """Test with invalid certificate data."""
+        # Act & Assert
+        assert format_serial_number(0xABCDE) == ctx.get_ca_certs()[0]["serialNumber"]
+
+
+class TestLoadCaMetadata:
+    """Test cases for load_ca_metadata function."""
+
+    def test_load_ca_metadata_success(self, tmp_path, make_ca_pem):
+        """Test extraction of every metadata from one parse."""
         # Arrange
-        cert_path = Path("/test/invalid_cert.crt")
-        cert_data = b"invalid_cert_data"
+        cert_data = make_ca_pem("Test CA", serial_number=0x1234, days=30)
+        cert_path = tmp_path / "ca.crt"
+        cert_path.write_bytes(cert_data)
+        cert = x509.load_pem_x509_certificate(cert_data)
 
-        # Mock file operations
-        mock_file = AsyncMock()
-        mock_file.read.return_value = cert_data
-        mock_aiofiles_open.return_value.__aenter__.return_value = mock_file
+        # Act
+        result = load_ca_metadata(cert_path)
 
-        # Mock certificate parsing error
-        mock_load_cert.side_effect = Exception("Invalid certificate")
+        # Assert
+        assert result == [{
+            "serial_number": "1234",
+            "subject": "CN=Test CA",
+            "issuer": "CN=Test CA",
+            "common_name": "Test CA",
+            "fingerprint": cert.fingerprint(hashes.SHA256()).hex(),
+            "not_before": cert.not_valid_before_utc.isoformat(),
+            "not_after": cert.not_valid_after_utc.isoformat(),
+            "key_type": "EC secp256r1",
+        }]
+
+    def test_load_ca_metadata_bundle(self, tmp_path, make_ca_pem):
+        """Test a bundle with several certificates, an invalid one and a duplicate."""
+        # Arrange
+        cert1 = make_ca_pem("Intermediate CA")
+        cert2 = make_ca_pem("Root CA")
+        invalid = b"-----BEGIN CERTIFICATE-----\nAAAA\n-----END CERTIFICATE-----\n"
+        cert_path = tmp_path / "chain.pem"
+        cert_path.write_bytes(b"# chain\n" + cert1 + invalid + cert2 + cert1)
 
         # Act
-        result = await get_issuer_common_name(cert_path)
+        result = load_ca_metadata(cert_path)
 
         # Assert
-        assert result is None
-        mock_log.warning.assert_called_once_with(
-            "Could not get Issuer Common Name from CA 'invalid_cert.crt'."
-        )
+        assert [metadata["common_name"] for metadata in result] == ["Intermediate CA", "Root CA"]
+
+    def test_load_ca_metadata_invalid_cert(self, tmp_path):
+        """Test with invalid certificate data."""
+        # Arrange
+        cert_path = tmp_path / "invalid_cert.crt"
+        cert_path.write_bytes(b"invalid_cert_data")
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            load_ca_metadata(cert_path)
 
 
-class TestGetSerialNumberFromCert:
-    """Test cases for get_serial_number_from_cert function."""
+class TestGetCaMetadata:
+    """Test cases for get_ca_metadata function."""
 
     @pytest.mark.asyncio
-    @patch("custom_components.additional_ca.utils.validate_serial_number")
-    @patch("custom_components.additional_ca.utils.ssl.SSLContext")
-    async def test_get_serial_number_from_cert_success(self, mock_ssl_context, mock_validate):
-        """Test successful extraction of serial number."""
+    async def test_get_ca_metadata_success(self, tmp_path, make_ca_pem):
+        """Test that the file is parsed once in the executor."""
         # Arrange
         hass = MagicMock(spec=HomeAssistant)
-        hass.async_add_executor_job = AsyncMock()
-        cert_path = Path("/test/cert.crt")
-
-        mock_context = MagicMock()
-        mock_ssl_context.return_value = mock_context
-        mock_context.get_ca_certs.return_value = [{"serialNumber": "12345678"}]
+        hass.async_add_executor_job = AsyncMock(side_effect=lambda func, *args: func(*args))
+        cert_path = tmp_path / "cert.crt"
+        cert_path.write_bytes(make_ca_pem("Test CA", serial_number=0x12345678))
 
         # Act
-        result = await get_serial_number_from_cert(hass, cert_path)
+        result = await get_ca_metadata(hass, cert_path)
 
         # Assert
-        assert result == "12345678"
-        mock_ssl_context.assert_called_once_with(ssl.PROTOCOL_TLS_CLIENT)
-        assert hass.async_add_executor_job.call_count == 2
-        hass.async_add_executor_job.assert_any_call(mock_context.load_verify_locations, cert_path)
-        hass.async_add_executor_job.assert_any_call(mock_context.load_default_certs)
-        mock_validate.assert_called_once_with("cert.crt", "12345678")
+        assert [metadata["serial_number"] for metadata in result] == ["12345678"]
+        assert result[0]["common_name"] == "Test CA"
+        hass.async_add_executor_job.assert_called_once_with(load_ca_metadata, cert_path)
 
     @pytest.mark.asyncio
-    @patch("custom_components.additional_ca.utils.validate_serial_number")
-    @patch("custom_components.additional_ca.utils.ssl.SSLContext")
     @patch("custom_components.additional_ca.utils.log")
-    async def test_get_serial_number_from_cert_ssl_error(self, mock_log, mock_ssl_context, mock_validate):
-        """Test with SSL error."""
+    async def test_get_ca_metadata_invalid_cert(self, mock_log, tmp_path):
+        """Test with invalid certificate data."""
         # Arrange
         hass = MagicMock(spec=HomeAssistant)
-        hass.async_add_executor_job = AsyncMock(side_effect=ssl.SSLError("Invalid certificate"))
-        cert_path = Path("/test/invalid_cert.crt")
-
-        mock_context = MagicMock()
-        mock_ssl_context.return_value = mock_context
+        hass.async_add_executor_job = AsyncMock(side_effect=lambda func, *args: func(*args))
+        cert_path = tmp_path / "invalid_cert.crt"
+        cert_path.write_bytes(b"invalid_cert_data")
 
-        # Act
-        result = await get_serial_number_from_cert(hass, cert_path)
+        # Act & Assert
+        with pytest.raises(SerialNumberException):
+            await get_ca_metadata(hass, cert_path)
 
-        # Assert
-        assert result is None
         mock_log.warning.assert_called_once_with(
             "The file 'invalid_cert.crt' appears to be an invalid TLS/SSL certificate."
         )
-        # validate_serial_number is still called with None serial number
-        mock_validate.assert_called_once_with('invalid_cert.crt', None)
 
     @pytest.mark.asyncio
-    @patch("custom_components.additional_ca.utils.validate_serial_number")
-    @patch("custom_components.additional_ca.utils.ssl.SSLContext")
     @patch("custom_components.additional_ca.utils.log")
-    async def test_get_serial_number_from_cert_other_exception(self, mock_log, mock_ssl_context, mock_validate):
+    async def test_get_ca_metadata_other_exception(self, mock_log):
         """Test with other exception."""
         # Arrange
         hass = MagicMock(spec=HomeAssistant)
-        hass.async_add_executor_job = AsyncMock(side_effect=Exception("Unexpected error"))
+        hass.async_add_executor_job = AsyncMock(side_effect=OSError("Unexpected error"))
         cert_path = Path("/test/cert.crt")
 
-        mock_context = MagicMock()
-        mock_ssl_context.return_value = mock_context
-
         # Act & Assert
-        with pytest.raises(Exception, match="Unexpected error"):
-            await get_serial_number_from_cert(hass, cert_path)
+        with pytest.raises(OSError, match="Unexpected error"):
+            await get_ca_metadata(hass, cert_path)
 
-        mock_log.error.assert_called_once_with("Could not get Serial Number from 'cert.crt'.")
-        # validate_serial_number is not called because exception is re-raised
-        mock_validate.assert_not_called()
+        mock_log.error.assert_called_once_with("Could not get metadata from 'cert.crt'.")
 
     @pytest.mark.asyncio
-    @patch("custom_components.additional_ca.utils.validate_serial_number")
-    @patch("custom_components.additional_ca.utils.ssl.SSLContext")
-    async def test_get_serial_number_from_cert_no_certs(self, mock_ssl_context, mock_validate):
-        """Test when no certificates are found."""
+    @patch("custom_components.additional_ca.utils.log")
+    async def test_get_ca_metadata_no_common_name(self, mock_log):
+        """Test when certificate has no issuer common name."""
         # Arrange
         hass = MagicMock(spec=HomeAssistant)
-        hass.async_add_executor_job = AsyncMock()
+        hass.async_add_executor_job = AsyncMock(return_value=[{"serial_number": "12345678", "common_name": None}])
         cert_path = Path("/test/cert.crt")
 
-        mock_context = MagicMock()
-        mock_ssl_context.return_value = mock_context
-        mock_context.get_ca_certs.return_value = []
-
         # Act
-        result = await get_serial_number_from_cert(hass, cert_path)
+        result = await get_ca_metadata(hass, cert_path)
 
         # Assert
-        assert result is None
-        mock_validate.assert_called_once_with("cert.crt", None)
+        assert result[0]["common_name"] is None
+        mock_log.warning.assert_called_once_with("Could not get Issuer Common Name from CA 'cert.crt'.")
 
 
 class TestValidateSerialNumber:
@@ -588,243 +1006,109 @@ class TestValidateSerialNumber:
 
 
 class TestRemoveUnusedCerts:
-    """Test cases for remove_unused_certs function."""
+    """Test cases for remove_unused_certs and remove_ca_files functions."""
 
-    @pytest.mark.asyncio
-    @patch("custom_components.additional_ca.utils.Path")
-    @patch("custom_components.additional_ca.utils.log")
-    async def test_remove_unused_certs_success(self, mock_log, mock_path):
-        """Test successful removal of unused certificates."""
-        # Arrange
-        hass = MagicMock(spec=HomeAssistant)
-        hass.async_add_executor_job = AsyncMock()
-        ca_files = {
-            "ca1": "ca1.crt",
-            "ca2": "ca2.crt"
-        }
-
-        # Mock system files
-        system_file1 = MagicMock()
-        system_file1.name = "ca1_ca1.crt"
-        system_file1.is_file.return_value = True
-        system_file2 = MagicMock()
-        system_file2.name = "ca2_ca2.crt"
-        system_file2.is_file.return_value = True
-        unused_file = MagicMock()
-        unused_file.name = "unused_ca.crt"
-        unused_file.is_file.return_value = True
-
-        # Mock the iterdir return value
-        hass.async_add_executor_job.return_value = [system_file1, system_file2, unused_file]
-
-        # Mock Path objects for different calls
-        mock_ca1_path = MagicMock()
-        mock_ca1_path.name = "ca1.crt"
-        mock_ca2_path = MagicMock()
-        mock_ca2_path.name = "ca2.crt"
-        mock_ca_syspath = MagicMock()
-
-        def path_side_effect(path_arg):
-            if path_arg == "ca1.crt":
-                return mock_ca1_path
-            elif path_arg == "ca2.crt":
-                return mock_ca2_path
-            elif path_arg == CA_SYSPATH:
-                return mock_ca_syspath
-            else:
-                return MagicMock()
-
-        mock_path.side_effect = path_side_effect
-
-        # Act
-        await remove_unused_certs(hass, ca_files)
-
-        # Assert
-        # Path is called multiple times: once for each ca_file value (to get .name) and once for CA_SYSPATH
-        expected_calls = [
-            call("ca1.crt"),
-            call("ca2.crt"),
-            call(CA_SYSPATH)
-        ]
-        mock_path.assert_has_calls(expected_calls, any_order=True)
-        unused_file.unlink.assert_called_once()
-        system_file1.unlink.assert_not_called()
-        system_file2.unlink.assert_not_called()
-        mock_log.info.assert_any_call("Removing unused certificate: unused_ca.crt")
+    @pytest.fixture
+    def syspath(self, tmp_path):
+        """Return a CA_SYSPATH with two installed CA and a CA installed by another tool."""
+        for name in ("ca1_ca1.crt", "ca2_ca2.crt", "other_tool.crt"):
+            (tmp_path / name).write_bytes(b"cert")
+        with patch("custom_components.additional_ca.utils.CA_SYSPATH", str(tmp_path)):
+            yield tmp_path
 
     @pytest.mark.asyncio
-    @patch("custom_components.additional_ca.utils.Path")
     @patch("custom_components.additional_ca.utils.log")
-    async def test_remove_unused_certs_no_unused_files(self, mock_log, mock_path):
-        """Test when no unused certificates exist."""
+    async def test_remove_unused_certs_success(self, mock_log, hass, syspath):
+        """Test only owned certificates no longer in the config are removed."""
         # Arrange
-        hass = MagicMock(spec=HomeAssistant)
-        hass.async_add_executor_job = AsyncMock()
-        ca_files = {
-            "ca1": "ca1.crt"
-        }
+        ca_files = {"ca1": "ca1.crt"}
 
-        # Mock system files - all are in use
-        system_file1 = MagicMock()
-        system_file1.name = "ca1_ca1.crt"
-        system_file1.is_file.return_value = True
+        # Act
+        removed = await remove_unused_certs(hass, ca_files, {"ca1_ca1.crt", "ca2_ca2.crt"})
 
-        # Mock the iterdir return value
-        hass.async_add_executor_job.return_value = [system_file1]
+        # Assert
+        assert removed == ["ca2_ca2.crt"]
+        assert sorted(f.name for f in syspath.iterdir()) == ["ca1_ca1.crt", "other_tool.crt"]
+        mock_log.info.assert_any_call("Removing unused certificate: ca2_ca2.crt")
 
-        # Mock Path objects for different calls
-        mock_ca1_path = MagicMock()
-        mock_ca1_path.name = "ca1.crt"
-        mock_ca_syspath = MagicMock()
+    @pytest.mark.asyncio
+    async def test_remove_unused_certs_no_unused_files(self, hass, syspath):
+        """Test no executor job is run when no owned certificate is stale."""
+        # Arrange
+        ca_files = {"ca1": "ca1.crt", "ca2": "folder/ca2.crt"}
 
-        def path_side_effect(path_arg):
-            if path_arg == "ca1.crt":
-                return mock_ca1_path
-            elif path_arg == CA_SYSPATH:
-                return mock_ca_syspath
-            else:
-                return MagicMock()
+        # Act
+        removed = await remove_unused_certs(hass, ca_files, {"ca1_ca1.crt", "ca2_ca2.crt"})
 
-        mock_path.side_effect = path_side_effect
+        # Assert
+        assert removed == []
+        hass.async_add_executor_job.assert_not_called()
+        assert len(list(syspath.iterdir())) == 3
 
+    @pytest.mark.asyncio
+    async def test_remove_unused_certs_batched(self, hass, syspath):
+        """Test stale certificates are removed in a single executor job."""
         # Act
-        await remove_unused_certs(hass, ca_files)
+        removed = await remove_unused_certs(hass, {}, {"ca1_ca1.crt", "ca2_ca2.crt"})
 
         # Assert
-        # Path is called multiple times: once for each ca_file value (to get .name) and once for CA_SYSPATH
-        expected_calls = [
-            call("ca1.crt"),
-            call(CA_SYSPATH)
-        ]
-        mock_path.assert_has_calls(expected_calls, any_order=True)
-        system_file1.unlink.assert_not_called()
+        assert removed == ["ca1_ca1.crt", "ca2_ca2.crt"]
+        hass.async_add_executor_job.assert_called_once()
+        assert [f.name for f in syspath.iterdir()] == ["other_tool.crt"]
 
     @pytest.mark.asyncio
-    @patch("custom_components.additional_ca.utils.Path")
-    @patch("custom_components.additional_ca.utils.log")
-    async def test_remove_unused_certs_file_not_found(self, mock_log, mock_path):
-        """Test removal when file doesn't exist."""
+    async def test_remove_unused_certs_with_backend(self, hass, tmp_path, make_memory_backend):
+        """Test stale certificates are removed from the trust store of the backend."""
         # Arrange
-        hass = MagicMock(spec=HomeAssistant)
-        hass.async_add_executor_job = AsyncMock()
-        ca_files = {}
-
-        unused_file = MagicMock()
-        unused_file.name = "unused_ca.crt"
-        unused_file.is_file.return_value = True
-        unused_file.unlink.side_effect = FileNotFoundError("File not found")
+        backend = make_memory_backend()
+        for ca_id in ("ca1_ca1.crt", "ca2_ca2.crt"):
+            (tmp_path / ca_id).write_bytes(b"ca")
+            backend.install(ca_id, tmp_path / ca_id)
 
-        # Mock the iterdir return value
-        hass.async_add_executor_job.return_value = [unused_file]
+        # Act
+        removed = await remove_unused_certs(hass, {"ca1": "ca1.crt"}, {"ca1_ca1.crt", "ca2_ca2.crt"}, backend)
 
-        mock_ca_syspath = MagicMock()
-        mock_path.return_value = mock_ca_syspath
+        # Assert
+        assert removed == ["ca2_ca2.crt"]
+        assert list(backend.cas) == ["ca1_ca1.crt"]
 
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.utils.log")
+    async def test_remove_unused_certs_file_not_found(self, mock_log, hass, syspath):
+        """Test removal when an owned file doesn't exist anymore."""
         # Act
-        await remove_unused_certs(hass, ca_files)
+        removed = await remove_unused_certs(hass, {}, {"missing.crt"})
 
         # Assert
-        unused_file.unlink.assert_called_once()
-        mock_log.warning.assert_called_once_with(
-            "Certificate file unused_ca.crt was already removed."
-        )
+        assert removed == []
+        mock_log.warning.assert_called_once_with("Certificate file missing.crt was already removed.")
 
-    @pytest.mark.asyncio
     @patch("custom_components.additional_ca.utils.Path")
     @patch("custom_components.additional_ca.utils.log")
-    async def test_remove_unused_certs_permission_error(self, mock_log, mock_path):
+    def test_remove_ca_files_permission_error(self, mock_log, mock_path):
         """Test removal with permission error."""
         # Arrange
-        hass = MagicMock(spec=HomeAssistant)
-        hass.async_add_executor_job = AsyncMock()
-        ca_files = {}
-
-        unused_file = MagicMock()
-        unused_file.name = "unused_ca.crt"
-        unused_file.is_file.return_value = True
-        unused_file.unlink.side_effect = PermissionError("Permission denied")
-
-        # Mock the iterdir return value
-        hass.async_add_executor_job.return_value = [unused_file]
-
-        mock_ca_syspath = MagicMock()
-        mock_path.return_value = mock_ca_syspath
+        mock_path.return_value.unlink.side_effect = PermissionError("Permission denied")
 
         # Act & Assert
         with pytest.raises(PermissionError):
-            await remove_unused_certs(hass, ca_files)
+            remove_ca_files(["unused_ca.crt"])
 
-        unused_file.unlink.assert_called_once()
         mock_log.error.assert_called_once_with(
             "Permission denied when removing unused certificate file: unused_ca.crt"
         )
 
-    @pytest.mark.asyncio
     @patch("custom_components.additional_ca.utils.Path")
     @patch("custom_components.additional_ca.utils.log")
-    async def test_remove_unused_certs_other_exception(self, mock_log, mock_path):
+    def test_remove_ca_files_other_exception(self, mock_log, mock_path):
         """Test removal with other exception."""
         # Arrange
-        hass = MagicMock(spec=HomeAssistant)
-        hass.async_add_executor_job = AsyncMock()
-        ca_files = {}
-
-        unused_file = MagicMock()
-        unused_file.name = "unused_ca.crt"
-        unused_file.is_file.return_value = True
-        unused_file.unlink.side_effect = OSError("Disk error")
-
-        # Mock the iterdir return value
-        hass.async_add_executor_job.return_value = [unused_file]
-
-        mock_ca_syspath = MagicMock()
-        mock_path.return_value = mock_ca_syspath
+        mock_path.return_value.unlink.side_effect = OSError("Disk error")
 
         # Act & Assert
         with pytest.raises(OSError):
-            await remove_unused_certs(hass, ca_files)
+            remove_ca_files(["unused_ca.crt"])
 
-        unused_file.unlink.assert_called_once()
         mock_log.error.assert_called_once_with(
             "Error removing unused certificate file unused_ca.crt: Disk error"
         )
-
-    @pytest.mark.asyncio
-    @patch("custom_components.additional_ca.utils.Path")
-    async def test_remove_unused_certs_empty_system_directory(self, mock_path):
-        """Test when system directory is empty."""
-        # Arrange
-        hass = MagicMock(spec=HomeAssistant)
-        hass.async_add_executor_job = AsyncMock()
-        ca_files = {
-            "ca1": "ca1.crt"
-        }
-
-        # Mock the iterdir return value as empty
-        hass.async_add_executor_job.return_value = []
-
-        # Mock Path objects for different calls
-        mock_ca1_path = MagicMock()
-        mock_ca1_path.name = "ca1.crt"
-        mock_ca_syspath = MagicMock()
-
-        def path_side_effect(path_arg):
-            if path_arg == "ca1.crt":
-                return mock_ca1_path
-            elif path_arg == CA_SYSPATH:
-                return mock_ca_syspath
-            else:
-                return MagicMock()
-
-        mock_path.side_effect = path_side_effect
-
-        # Act
-        await remove_unused_certs(hass, ca_files)
-
-        # Assert
-        # Path is called multiple times: once for each ca_file value (to get .name) and once for CA_SYSPATH
-        expected_calls = [
-            call("ca1.crt"),
-            call(CA_SYSPATH)
-        ]
-        mock_path.assert_has_calls(expected_calls, any_order=True)
@@ -0,0 +1,79 @@
+"""Unit tests for watcher.py module."""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from custom_components.additional_ca.watcher import (
+    async_start_polling_watcher,
+    async_start_watcher,
+    scan_config_dir,
+)
+
+
+class TestScanConfigDir:
+    """Test cases for scan_config_dir function."""
+
+    def test_scan_config_dir(self, tmp_path):
+        """Test that files of subfolders are listed with their identity."""
+        # Arrange
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "ca.crt").write_bytes(b"ca")
+        (tmp_path / "sub" / "ca2.pem").write_bytes(b"ca2")
+
+        # Act
+        result = scan_config_dir(tmp_path)
+
+        # Assert
+        assert set(result) == {"ca.crt", "sub/ca2.pem"}
+        stat = (tmp_path / "ca.crt").stat()
+        assert result["ca.crt"] == (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+class TestPollingWatcher:
+    """Test cases for async_start_polling_watcher function."""
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.watcher.async_track_time_interval")
+    async def test_polling_watcher_detects_changes(self, mock_track, hass, tmp_path):
+        """Test that a change triggers the debouncer once."""
+        # Arrange
+        (tmp_path / "ca.crt").write_bytes(b"ca")
+        debouncer = MagicMock()
+        await async_start_polling_watcher(hass, tmp_path, debouncer)
+        async_poll = mock_track.call_args[0][1]
+
+        # Act & Assert
+        await async_poll(None)
+        debouncer.async_schedule_call.assert_not_called()
+
+        (tmp_path / "ca.crt").write_bytes(b"new ca")
+        (tmp_path / "ca2.crt").write_bytes(b"ca2")
+        await async_poll(None)
+        debouncer.async_schedule_call.assert_called_once()
+
+        await async_poll(None)
+        debouncer.async_schedule_call.assert_called_once()
+
+
+class TestStartWatcher:
+    """Test cases for async_start_watcher function."""
+
+    @pytest.mark.asyncio
+    @patch("custom_components.additional_ca.watcher.async_start_polling_watcher")
+    @patch("custom_components.additional_ca.watcher.async_start_inotify_watcher")
+    async def test_start_watcher_polling_fallback(self, mock_inotify, mock_polling, hass, tmp_path):
+        """Test that polling is used when watchdog is not installed, and stops with Home Assistant."""
+        # Arrange
+        mock_inotify.side_effect = ImportError("No module named 'watchdog'")
+        stop_polling = MagicMock()
+        mock_polling.return_value = stop_polling
+
+        # Act
+        async_stop = await async_start_watcher(hass, tmp_path, AsyncMock())
+
+        # Assert
+        mock_polling.assert_called_once()
+        hass.bus.async_listen_once.assert_called_once()
+        async_stop()
+        stop_polling.assert_called_once()
+        hass.bus.async_listen_once.return_value.assert_called_once()